@@ -28,7 +28,6 @@ DJANGO_ENV = config('DJANGO_ENV', default='development')
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
-print(BASE_DIR)
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
@@ -49,9 +48,6 @@ THIRD_PARTY_CHECKOUT_URL = config(
     default='https://shop.kihoko.com/shops/kihoo-base-shop/checkout/edit/'
 )
 
-
-print(f'DEBUG: {DEBUG}')
-print(f'DJANGO_ENV: {DJANGO_ENV}')
 # Application definition
 
 INSTALLED_APPS = [
@@ -70,6 +66,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'portfolio.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', 
@@ -82,6 +79,18 @@ MIDDLEWARE = [
     'django.middleware.locale.LocaleMiddleware',
 ]
 
+CACHES = {
+    # Per-process cache for data each worker can rebuild on its own
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared between workers: the public page cache and its regeneration locks
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'portfolio_page_cache',
+    },
+}
+
 LOCALE_PATHS = (
     os.path.join(BASE_DIR, 'locale'),
 )
@@ -251,6 +260,66 @@ AZURE_ACCOUNT_NAME = config('AZURE_ACCOUNT_NAME', default='')
 AZURE_ACCOUNT_KEY = config('AZURE_ACCOUNT_KEY', default='')
 AZURE_CONTAINER = config('AZURE_CONTAINER', 'media')
 AZURE_CUSTOM_DOMAIN = f'{AZURE_ACCOUNT_NAME}.blob.core.windows.net' if AZURE_ACCOUNT_NAME else None
+# Check (and create) the portfolio container on first use of the Azure client;
+# turn off where the container is provisioned ahead of deployment
+AZURE_ENSURE_CONTAINER = config('AZURE_ENSURE_CONTAINER', default=True, cast=bool)
+
+# Portfolio image URLs: optional CDN/custom domain in front of the portfolio container
+PORTFOLIO_IMAGES_CONTAINER = 'portfolio-images'
+PORTFOLIO_IMAGE_HOST = config('PORTFOLIO_IMAGE_HOST', default='')
+# Private container: image URLs carry SAS tokens, reused within expiry buckets
+PORTFOLIO_IMAGES_PRIVATE = config('PORTFOLIO_IMAGES_PRIVATE', default=False, cast=bool)
+PORTFOLIO_IMAGE_SAS_HOURS = 24
+AZURE_SAS_BUCKET_SECONDS = 3600
+AZURE_SAS_CACHE_SIZE = 10000
+# Streaming block uploads: peak memory is roughly block size * (concurrency + 1)
+AZURE_UPLOAD_BLOCK_SIZE = 4 * 1024 * 1024
+AZURE_UPLOAD_CONCURRENCY = 4
+AZURE_UPLOAD_BLOCK_RETRIES = 3
+# Blob storage for portfolio images: 'azure', or 'local' (files under
+# PORTFOLIO_BLOB_ROOT) / 'memory' (per process) for offline runs and
+# profiling, which this site serves under PORTFOLIO_BLOB_URL
+PORTFOLIO_BLOB_BACKEND = config('PORTFOLIO_BLOB_BACKEND', default='azure')
+PORTFOLIO_BLOB_ROOT = config('PORTFOLIO_BLOB_ROOT', default=os.path.join(BASE_DIR, 'blobs'))
+PORTFOLIO_BLOB_URL = '/blobs/'
+# Widths (px) of the responsive derivatives generated for each upload
+PORTFOLIO_DERIVATIVE_WIDTHS = (320, 640, 1024, 1600)
+# Rendered flash grid fragments; the cache key already changes with the data
+FLASH_GALLERY_CACHE_TIMEOUT = 60 * 60 * 24
+# Public HTML pages: fresh for PAGE_CACHE_TIMEOUT seconds or until the catalog
+# changes, then served stale while one worker re-renders. The entries and the
+# regeneration lock must live in a cache every worker shares (the database
+# cache here; run `manage.py createcachetable` when deploying)
+PAGE_CACHE_ALIAS = 'pages'
+PAGE_CACHE_TIMEOUT = 300
+PAGE_CACHE_LOCK_TIMEOUT = 30
+# Query parameters that change what a cached page renders; any others are
+# left out of the cache key so junk query strings cannot add entries
+PAGE_CACHE_QUERY_PARAMS = ()
+# Precompressed static JSON copies of the catalog APIs (publish_snapshots):
+# written to a directory if set, otherwise to the blob container
+PORTFOLIO_SNAPSHOT_DIR = config('PORTFOLIO_SNAPSHOT_DIR', default='')
+PORTFOLIO_SNAPSHOT_CONTAINER = config('PORTFOLIO_SNAPSHOT_CONTAINER', default='portfolio-api')
+PORTFOLIO_SNAPSHOT_PUBLISH_ON_CHANGE = config('PORTFOLIO_SNAPSHOT_PUBLISH_ON_CHANGE', default=False, cast=bool)
+PORTFOLIO_SNAPSHOT_PUBLISH_DELAY = 5.0
+# Request metrics served at /api/v2/metrics/ (staff only). With several
+# worker processes, point this at a directory they share so each scrape
+# sums every worker. Exited workers are folded into archive.json there;
+# keep it local to the host and delete it to reset the counters
+PORTFOLIO_METRICS_DIR = config('PORTFOLIO_METRICS_DIR', default='')
+PORTFOLIO_METRICS_FLUSH_SECONDS = config('PORTFOLIO_METRICS_FLUSH_SECONDS', default=5.0, cast=float)
+# Cold-start budget enforced by `manage.py startup_budget` (milliseconds)
+STARTUP_IMPORT_BUDGET_MS = config('STARTUP_IMPORT_BUDGET_MS', default=1500, cast=float)
+STARTUP_FIRST_RESPONSE_BUDGET_MS = config('STARTUP_FIRST_RESPONSE_BUDGET_MS', default=1000, cast=float)
+# Modules only the rarely used upload/auth routes need; loading any of them
+# before the first such request counts against the budget
+STARTUP_DEFERRED_MODULES = (
+    'portfolio.upload_api_views',
+    'portfolio.auth_api_views',
+    'portfolio.image_pipeline',
+    'PIL.Image',
+    'azure.storage.blob',
+)
 
 # Modern Django 4.2+ STORAGES configuration
 if DJANGO_ENV == 'production' and AZURE_ACCOUNT_NAME:
@@ -279,9 +348,6 @@ else:
 
 # Add this after your MEDIA_ROOT configuration
 if DEBUG:
-    print(f"MEDIA_ROOT: {MEDIA_ROOT}")
-    print(f"MEDIA_URL: {MEDIA_URL}")
-    
     # Add file upload debugging
     LOGGING['loggers']['django.request'] = {
         'handlers': ['file'],
@@ -289,15 +355,6 @@ if DEBUG:
         'propagate': True,
     }
 
-# Add this after your MEDIA_ROOT configuration
-if DJANGO_ENV == 'development':
-    # Ensure media directory exists with correct permissions
-    for dir_name in ['projects', 'merchandise', 'misc']:  # Match the original paths
-        dir_path = os.path.join(MEDIA_ROOT, dir_name)
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path)
-            print(f"Created media directory: {dir_path}")
-
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -1,9 +1,28 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { View, Image, StyleSheet, TouchableOpacity } from 'react-native';
 import { Ionicons } from '@expo/vector-icons';
 
+const API_BASE_URL = process.env.EXPO_PUBLIC_API_URL || 'https://kihoko.com';
+
 export default function ArtDetailScreen({ route, navigation }) {
-  const { item } = route.params;
+  const [item, setItem] = useState(route.params.item);
+  // Neighbor ids come from the detail endpoint; each step is a single request
+  const [neighbors, setNeighbors] = useState({ previous: null, next: null });
+
+  const load = async (id) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/artwork/${id}/`);
+      const artwork = await response.json();
+      setItem({ id: String(artwork.id), title: artwork.title, image: { uri: artwork.image_url } });
+      setNeighbors({ previous: artwork.previous_id, next: artwork.next_id });
+    } catch (err) {
+      console.error('Failed to fetch artwork:', err);
+    }
+  };
+
+  useEffect(() => {
+    load(route.params.item.id);
+  }, [route.params.item.id]);
 
   return (
     <View style={styles.container}>
@@ -11,6 +30,16 @@ export default function ArtDetailScreen({ route, navigation }) {
       <TouchableOpacity style={styles.back} onPress={() => navigation.goBack()}>
         <Ionicons name="arrow-back" size={32} color="#fff" />
       </TouchableOpacity>
+      {neighbors.previous != null && (
+        <TouchableOpacity style={[styles.arrow, styles.previous]} onPress={() => load(neighbors.previous)}>
+          <Ionicons name="chevron-back" size={40} color="#fff" />
+        </TouchableOpacity>
+      )}
+      {neighbors.next != null && (
+        <TouchableOpacity style={[styles.arrow, styles.next]} onPress={() => load(neighbors.next)}>
+          <Ionicons name="chevron-forward" size={40} color="#fff" />
+        </TouchableOpacity>
+      )}
     </View>
   );
 }
@@ -31,4 +60,15 @@ const styles = StyleSheet.create({
     top: 40,
     left: 20,
   },
+  arrow: {
+    position: 'absolute',
+    top: '50%',
+    marginTop: -20,
+  },
+  previous: {
+    left: 10,
+  },
+  next: {
+    right: 10,
+  },
 });
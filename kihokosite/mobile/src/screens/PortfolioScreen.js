@@ -1,26 +1,43 @@
-import React from 'react';
-import { View, FlatList, StyleSheet } from 'react-native';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
+import { View, FlatList, ActivityIndicator, StyleSheet } from 'react-native';
 import ArtCard from '../components/ArtCard';
 
-const DATA = [
-  {
-    id: '1',
-    title: 'Project One',
-    image: { uri: 'https://placekitten.com/300/300' },
-  },
-  {
-    id: '2',
-    title: 'Project Two',
-    image: { uri: 'https://placekitten.com/301/301' },
-  },
-  {
-    id: '3',
-    title: 'Project Three',
-    image: { uri: 'https://placekitten.com/302/302' },
-  },
-];
+const API_BASE_URL = process.env.EXPO_PUBLIC_API_URL || 'https://kihoko.com';
+const FIRST_PAGE_URL = `${API_BASE_URL}/api/v2/artworks/?page_size=30`;
+
+const toItem = (artwork) => ({
+  id: String(artwork.id),
+  title: artwork.title,
+  image: { uri: artwork.image_url },
+});
 
 export default function PortfolioScreen({ navigation }) {
+  const [items, setItems] = useState([]);
+  const [loading, setLoading] = useState(false);
+  // Cursor URL for the next page; null once the last page has been loaded
+  const nextUrl = useRef(FIRST_PAGE_URL);
+
+  const loadMore = useCallback(async () => {
+    if (loading || !nextUrl.current) {
+      return;
+    }
+    setLoading(true);
+    try {
+      const response = await fetch(nextUrl.current);
+      const page = await response.json();
+      nextUrl.current = page.next;
+      setItems((current) => current.concat(page.results.map(toItem)));
+    } catch (err) {
+      console.error('Failed to fetch artworks:', err);
+    } finally {
+      setLoading(false);
+    }
+  }, [loading]);
+
+  useEffect(() => {
+    loadMore();
+  }, []);
+
   const renderItem = ({ item }) => (
     <ArtCard
       title={item.title}
@@ -32,11 +49,14 @@ export default function PortfolioScreen({ navigation }) {
   return (
     <View style={styles.container}>
       <FlatList
-        data={DATA}
+        data={items}
         numColumns={2}
         keyExtractor={(item) => item.id}
         renderItem={renderItem}
         contentContainerStyle={styles.list}
+        onEndReached={loadMore}
+        onEndReachedThreshold={0.5}
+        ListFooterComponent={loading ? <ActivityIndicator style={styles.loader} /> : null}
       />
     </View>
   );
@@ -50,4 +70,7 @@ const styles = StyleSheet.create({
   list: {
     padding: 16,
   },
+  loader: {
+    marginVertical: 16,
+  },
 });
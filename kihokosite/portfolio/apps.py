@@ -7,3 +7,6 @@ class PortfolioConfig(AppConfig):
     
     def ready(self):
         import portfolio.api_config  # Import API configuration
+        import portfolio.catalog  # Catalog version signals
+        import portfolio.blob_outbox  # Blob deletion outbox signals
+        import portfolio.snapshot_publisher  # Publish static API snapshots on change
@@ -0,0 +1,83 @@
+"""
+Token authentication API for the mobile app
+
+Imported by the URLconf on first use, so the token model and user
+serializers stay out of the startup import path.
+"""
+
+import logging
+
+from django.contrib.auth import authenticate
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .serializers import UserRegistrationSerializer, UserSerializer
+
+logger = logging.getLogger('django')
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def api_user_login(request):
+    """API endpoint for user login"""
+    try:
+        username = request.data.get('username')
+        password = request.data.get('password')
+        
+        if not username or not password:
+            return Response({'error': 'Username and password are required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        user = authenticate(username=username, password=password)
+        if user:
+            token, created = Token.objects.get_or_create(user=user)
+            user_serializer = UserSerializer(user)
+            return Response({
+                'token': token.key,
+                'user': user_serializer.data,
+                'message': 'Login successful'
+            })
+        else:
+            return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+    except Exception as e:
+        logger.error(f"Error in api_user_login: {e}")
+        return Response({'error': 'Login failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def api_user_signup(request):
+    """API endpoint for user signup"""
+    try:
+        serializer = UserRegistrationSerializer(data=request.data)
+        if serializer.is_valid():
+            user = serializer.save()
+            token, created = Token.objects.get_or_create(user=user)
+            user_serializer = UserSerializer(user)
+            return Response({
+                'token': token.key,
+                'user': user_serializer.data,
+                'message': 'Account created successfully'
+            }, status=status.HTTP_201_CREATED)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error in api_user_signup: {e}")
+        return Response({'error': 'Signup failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+def api_user_logout(request):
+    """API endpoint for user logout"""
+    try:
+        if request.user.is_authenticated:
+            # Delete the user's token
+            Token.objects.filter(user=request.user).delete()
+            return Response({'message': 'Logged out successfully'})
+        else:
+            return Response({'error': 'User not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
+    except Exception as e:
+        logger.error(f"Error in api_user_logout: {e}")
+        return Response({'error': 'Logout failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
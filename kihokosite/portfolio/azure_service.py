@@ -3,90 +3,240 @@ Azure Blob Storage service for portfolio images
 Handles direct blob operations for better performance and scalability
 """
 
+import hashlib
 import os
-import uuid
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Iterable, List, Dict, Optional, Union
 from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
-from azure.core.exceptions import ResourceNotFoundError
 from django.conf import settings
 import logging
 
+from .blob_backends import AzureBlobBackend, BlobBackend, LocalBlobBackend, get_backend_class
+from .image_urls import get_container_name, get_public_url_resolver
+from .metrics import timed_blob_operation
+
 logger = logging.getLogger(__name__)
 
+# Blob names are content-addressed, so every blob can be cached for a year
+CACHE_CONTROL = 'public, max-age=31536000'
+
+
+class SasTokenCache:
+    """
+    LRU cache of SAS tokens keyed by blob name, permission and expiry.
+
+    Expiries are rounded up to fixed buckets, so every request inside a bucket
+    gets the same token (and the same cacheable URL) instead of a fresh HMAC.
+    """
+
+    def __init__(self, max_entries: int = 10000, bucket_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+        self._tokens: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def expiry_for(self, lifetime: timedelta, now: Optional[datetime] = None) -> datetime:
+        """Round ``now + lifetime`` up to the next bucket boundary"""
+        now = now or datetime.now(timezone.utc)
+        target = int((now + lifetime).timestamp())
+        bucket = -(-target // self.bucket_seconds) * self.bucket_seconds
+        return datetime.fromtimestamp(bucket, tz=timezone.utc)
+
+    def get(self, key):
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is not None:
+                self._tokens.move_to_end(key)
+            return token
+
+    def put(self, key, token: str):
+        with self._lock:
+            self._tokens[key] = token
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def __len__(self):
+        return len(self._tokens)
+
+
 class AzureBlobService:
-    """Service for managing portfolio images in Azure Blob Storage"""
+    """
+    Service for managing portfolio images in blob storage
+    
+    Blobs live in Azure Blob Storage unless PORTFOLIO_BLOB_BACKEND selects
+    the local-disk or in-memory backend (see blob_backends).
+    
+    Constructing the service is cheap and never touches the network. The
+    BlobServiceClient and the container check are created on first use of
+    ``client`` and memoized per process; a forked worker notices the PID
+    change and builds its own client instead of sharing the parent's
+    connection pool.
+    """
     
     def __init__(self):
         self.account_name = settings.AZURE_ACCOUNT_NAME
         self.account_key = settings.AZURE_ACCOUNT_KEY
-        self.container_name = 'portfolio-images'  # Dedicated container for portfolio images
-        
+        self.container_name = get_container_name()  # Dedicated container for portfolio images
+        self.ensure_container = getattr(settings, 'AZURE_ENSURE_CONTAINER', True)
+        self.backend_name = getattr(settings, 'PORTFOLIO_BLOB_BACKEND', 'azure')
+        # Streaming uploads hold at most (concurrency + 1) blocks in memory
+        self.block_size = getattr(settings, 'AZURE_UPLOAD_BLOCK_SIZE', 4 * 1024 * 1024)
+        self.block_concurrency = getattr(settings, 'AZURE_UPLOAD_CONCURRENCY', 4)
+        self.block_retries = getattr(settings, 'AZURE_UPLOAD_BLOCK_RETRIES', 3)
+        self.sas_cache = SasTokenCache(
+            max_entries=getattr(settings, 'AZURE_SAS_CACHE_SIZE', 10000),
+            bucket_seconds=getattr(settings, 'AZURE_SAS_BUCKET_SECONDS', 3600),
+        )
+        # Seconds spent creating the client and checking the container
+        self.cold_start_timings: Dict[str, float] = {}
+        self._client = None
+        self._client_pid = None
+        self._init_lock = threading.Lock()
+        self._backend = None
+
+    @property
+    def client(self) -> Optional[BlobServiceClient]:
+        """The process's BlobServiceClient, or None if Azure is unavailable"""
+        if self._client_pid != os.getpid():
+            with self._init_lock:
+                if self._client_pid != os.getpid():
+                    self._client = self._create_client()
+                    self._client_pid = os.getpid()
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+        self._client_pid = os.getpid()
+
+    def reset(self):
+        """Drop the memoized client; the next use creates a new one"""
+        with self._init_lock:
+            self._client = None
+            self._client_pid = None
+
+    def _after_fork(self):
+        # The parent may have forked while another thread held the lock
+        self._init_lock = threading.Lock()
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def backend(self) -> Optional[BlobBackend]:
+        """Storage backend for the portfolio container, or None if unavailable"""
+        if self.backend_name != 'azure':
+            if self._backend is None:
+                self._backend = self._create_local_backend()
+            return self._backend
+
+        client = self.client
+        if client is None:
+            return None
+        # Rebuilt whenever the client is (after a fork or a reset)
+        if self._backend is None or self._backend.client is not client:
+            self._backend = AzureBlobBackend(
+                client, self.container_name,
+                block_size=self.block_size,
+                block_concurrency=self.block_concurrency,
+                block_retries=self.block_retries,
+            )
+        return self._backend
+
+    def _create_local_backend(self) -> BlobBackend:
+        backend_class = get_backend_class(self.backend_name)
+        if backend_class is LocalBlobBackend:
+            return LocalBlobBackend(
+                os.path.join(settings.PORTFOLIO_BLOB_ROOT, self.container_name),
+                chunk_size=self.block_size,
+            )
+        return backend_class()
+
+    def _create_client(self) -> Optional[BlobServiceClient]:
         if not all([self.account_name, self.account_key]):
             logger.warning("Azure credentials not configured")
-            self.client = None
-            return
+            return None
             
         try:
-            self.client = BlobServiceClient(
+            started = time.perf_counter()
+            client = BlobServiceClient(
                 account_url=f"https://{self.account_name}.blob.core.windows.net",
                 credential=self.account_key
             )
-            self._ensure_container_exists()
+            self.cold_start_timings['client'] = time.perf_counter() - started
+            if self.ensure_container:
+                started = time.perf_counter()
+                self._ensure_container_exists(client)
+                self.cold_start_timings['container_check'] = time.perf_counter() - started
         except Exception as e:
             logger.error(f"Failed to initialize Azure Blob Service: {e}")
-            self.client = None
+            return None
+
+        logger.info(
+            "Azure Blob Service ready in "
+            + ", ".join(f"{step} {seconds * 1000:.1f}ms" for step, seconds in self.cold_start_timings.items())
+        )
+        return client
     
-    def _ensure_container_exists(self):
+    def _ensure_container_exists(self, client: BlobServiceClient):
         """Ensure the portfolio images container exists"""
         try:
-            container_client = self.client.get_container_client(self.container_name)
+            container_client = client.get_container_client(self.container_name)
             if not container_client.exists():
                 container_client.create_container(public_access='blob')
                 logger.info(f"Created container: {self.container_name}")
         except Exception as e:
             logger.error(f"Failed to ensure container exists: {e}")
     
-    def upload_image(self, file_data: bytes, filename: str, project_slug: str = None) -> Optional[str]:
+    @timed_blob_operation('upload')
+    def upload_image(self, file_data: Union[bytes, BinaryIO], filename: str, project_slug: str = None) -> Optional[str]:
         """
-        Upload an image to Azure Blob Storage
+        Upload an image to Azure Blob Storage under a content-addressed name
+        
+        The blob is named after the SHA-256 of its contents, so uploading the
+        same bytes twice yields the same name and the second upload is skipped
+        once the blob is found to exist.
         
         Args:
-            file_data: Image file data as bytes
+            file_data: Image file data as bytes, or a seekable file-like object
+                that is hashed and then streamed as staged blocks without being
+                read fully into memory
             filename: Original filename
             project_slug: Optional project slug for organization
             
         Returns:
             Blob name if successful, None if failed
         """
-        if not self.client:
-            logger.error("Azure client not initialized")
+        backend = self.backend
+        if backend is None:
+            logger.error("Blob storage not configured")
             return None
             
         try:
-            # Generate unique blob name
             file_ext = os.path.splitext(filename)[1].lower()
-            unique_id = str(uuid.uuid4())
+            digest = self._content_digest(file_data)
             
             if project_slug:
-                blob_name = f"projects/{project_slug}/{unique_id}{file_ext}"
+                blob_name = f"projects/{project_slug}/{digest}{file_ext}"
             else:
-                blob_name = f"images/{unique_id}{file_ext}"
+                blob_name = f"images/{digest}{file_ext}"
             
-            # Upload the blob
-            blob_client = self.client.get_blob_client(
-                container=self.container_name, 
-                blob=blob_name
-            )
+            if backend.exists(blob_name):
+                logger.info(f"Blob already stored, skipping upload: {blob_name}")
+                return blob_name
             
-            blob_client.upload_blob(
-                file_data, 
-                overwrite=True,
-                content_settings={
-                    'content_type': self._get_content_type(file_ext),
-                    'cache_control': 'public, max-age=31536000'  # 1 year cache
-                }
-            )
+            content_type = self._get_content_type(file_ext)
+            if isinstance(file_data, (bytes, bytearray)):
+                backend.upload(blob_name, file_data, content_type, CACHE_CONTROL)
+            else:
+                backend.upload_stream(blob_name, file_data, content_type, CACHE_CONTROL)
             
             logger.info(f"Successfully uploaded blob: {blob_name}")
             return blob_name
@@ -94,28 +244,165 @@ class AzureBlobService:
         except Exception as e:
             logger.error(f"Failed to upload image: {e}")
             return None
+
+    def _content_digest(self, file_data: Union[bytes, BinaryIO]) -> str:
+        """
+        SHA-256 hex digest of the upload
+        
+        Streams are read block by block and rewound to where they started, so
+        the upload that follows sees the same bytes.
+        """
+        if isinstance(file_data, (bytes, bytearray)):
+            return hashlib.sha256(file_data).hexdigest()
+
+        start = file_data.tell()
+        digest = hashlib.sha256()
+        while True:
+            chunk = file_data.read(self.block_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+        file_data.seek(start)
+        return digest.hexdigest()
+
+    @timed_blob_operation('upload_derivatives')
+    def upload_derivatives(self, blob_name: str, file_data) -> List[Dict]:
+        """
+        Generate and upload responsive derivatives for an uploaded original
+        
+        Args:
+            blob_name: Blob name of the original; derivatives are stored next to it
+            file_data: Original image as bytes or a seekable file-like object
+            
+        Returns:
+            Derivative records (blob, width, height, format) that were uploaded
+        """
+        backend = self.backend
+        if backend is None:
+            return []
+
+        from .image_pipeline import generate_derivatives
+
+        try:
+            derivatives = generate_derivatives(file_data, blob_name)
+        except Exception as e:
+            logger.error(f"Failed to generate derivatives for {blob_name}: {e}")
+            return []
+
+        records = []
+        for derivative in derivatives:
+            try:
+                backend.upload(derivative.blob_name, derivative.data, derivative.content_type, CACHE_CONTROL)
+                records.append(derivative.as_record())
+            except Exception as e:
+                logger.error(f"Failed to upload derivative {derivative.blob_name}: {e}")
+
+        logger.info(f"Uploaded {len(records)} derivatives for blob: {blob_name}")
+        return records
     
+    @timed_blob_operation('download')
+    def download_image(self, blob_name: str) -> Optional[bytes]:
+        """Download a blob's contents, or None if it cannot be read"""
+        backend = self.backend
+        if backend is None:
+            return None
+
+        try:
+            return backend.download(blob_name)
+        except Exception as e:
+            logger.error(f"Failed to download image {blob_name}: {e}")
+            return None
+
+    @timed_blob_operation('exists')
+    def missing_blobs(self, blob_names: Iterable[str]) -> List[str]:
+        """Names among ``blob_names`` that are not in storage"""
+        backend = self.backend
+        if backend is None:
+            return []
+        return [name for name in blob_names if not backend.exists(name)]
+
+    @timed_blob_operation('delete')
     def delete_image(self, blob_name: str) -> bool:
-        """Delete an image from Azure Blob Storage"""
-        if not self.client:
+        """Delete an image; a blob that is already gone counts as deleted"""
+        backend = self.backend
+        if backend is None:
             return False
             
         try:
-            blob_client = self.client.get_blob_client(
-                container=self.container_name, 
-                blob=blob_name
-            )
-            blob_client.delete_blob()
+            backend.delete(blob_name)
             logger.info(f"Successfully deleted blob: {blob_name}")
             return True
             
-        except ResourceNotFoundError:
-            logger.warning(f"Blob not found for deletion: {blob_name}")
-            return True  # Consider it successful if already gone
         except Exception as e:
             logger.error(f"Failed to delete image: {e}")
             return False
     
+    @timed_blob_operation('delete_batch')
+    def delete_images(self, blob_names: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Delete up to 256 blobs in a single batch request
+        
+        Returns:
+            Mapping of blob name to an error message, or None if the blob is
+            gone (already-missing blobs count as deleted)
+        """
+        if not blob_names:
+            return {}
+        backend = self.backend
+        if backend is None:
+            return {name: "Blob storage not configured" for name in blob_names}
+
+        try:
+            results = backend.delete_many(blob_names)
+            logger.info(f"Batch deleted {sum(1 for e in results.values() if e is None)} blobs")
+            return results
+        except Exception as e:
+            logger.error(f"Failed to batch delete blobs: {e}")
+            return {name: str(e) for name in blob_names}
+
+    def get_sas_token(self, blob_name: str, permission: str = 'r', expiry_hours: int = 24) -> Optional[str]:
+        """Return a cached SAS token for a blob, signing only on a cache miss"""
+        return self.get_sas_tokens([blob_name], permission=permission, expiry_hours=expiry_hours)[0]
+
+    def get_sas_tokens(self, blob_names: Iterable[str], permission: str = 'r',
+                       expiry_hours: int = 24) -> List[Optional[str]]:
+        """
+        Bulk SAS signing for list endpoints
+        
+        All tokens share one bucketed expiry, so a page of N images costs at
+        most N HMACs the first time and none until the bucket rolls over.
+        """
+        blob_names = list(blob_names)
+        if not self.account_key:
+            return [None] * len(blob_names)
+
+        expiry = self.sas_cache.expiry_for(timedelta(hours=expiry_hours))
+        sas_permission = BlobSasPermissions.from_string(permission)
+        tokens = []
+        for blob_name in blob_names:
+            if not blob_name:
+                tokens.append(None)
+                continue
+            key = (blob_name, permission, expiry)
+            token = self.sas_cache.get(key)
+            if token is None:
+                token = generate_blob_sas(
+                    account_name=self.account_name,
+                    container_name=self.container_name,
+                    blob_name=blob_name,
+                    account_key=self.account_key,
+                    permission=sas_permission,
+                    expiry=expiry
+                )
+                self.sas_cache.put(key, token)
+            tokens.append(token)
+        return tokens
+
+    def get_sas_valid_until(self, expiry_hours: int = 24) -> datetime:
+        """Time at which newly issued tokens stop matching the ones issued now"""
+        lifetime = timedelta(hours=expiry_hours)
+        return self.sas_cache.expiry_for(lifetime) - lifetime
+
     def get_image_url(self, blob_name: str, use_sas: bool = False, expiry_hours: int = 24) -> Optional[str]:
         """
         Get the URL for an image
@@ -123,55 +410,53 @@ class AzureBlobService:
         Args:
             blob_name: Name of the blob
             use_sas: Whether to generate a SAS URL for private access
-            expiry_hours: Hours until SAS token expires
+            expiry_hours: Minimum hours until SAS token expires
             
         Returns:
             Image URL or None if failed
         """
         if not blob_name:
             return None
-            
-        if not self.client:
-            # Fallback to direct URL if client not available
-            return f"https://{self.account_name}.blob.core.windows.net/{self.container_name}/{blob_name}"
-        
+        return self.get_image_urls([blob_name], use_sas=use_sas, expiry_hours=expiry_hours)[0]
+
+    def get_image_urls(self, blob_names: Iterable[str], use_sas: bool = False,
+                       expiry_hours: int = 24) -> List[Optional[str]]:
+        """Bulk version of get_image_url, preserving order"""
+        blob_names = list(blob_names)
+        urls = get_public_url_resolver().resolve_many(blob_names)
+        if not use_sas or self.backend_name != 'azure' or not self.client:
+            # Public URL (container must have public read access); also the
+            # fallback when the client is not available
+            return urls
+
         try:
-            if use_sas:
-                # Generate SAS URL for private access
-                sas_token = generate_blob_sas(
-                    account_name=self.account_name,
-                    container_name=self.container_name,
-                    blob_name=blob_name,
-                    account_key=self.account_key,
-                    permission=BlobSasPermissions(read=True),
-                    expiry=datetime.utcnow() + timedelta(hours=expiry_hours)
-                )
-                return f"https://{self.account_name}.blob.core.windows.net/{self.container_name}/{blob_name}?{sas_token}"
-            else:
-                # Public URL (container must have public read access)
-                return f"https://{self.account_name}.blob.core.windows.net/{self.container_name}/{blob_name}"
-                
+            tokens = self.get_sas_tokens(blob_names, expiry_hours=expiry_hours)
+            return [
+                f"{url}?{token}" if url and token else url
+                for url, token in zip(urls, tokens)
+            ]
         except Exception as e:
             logger.error(f"Failed to generate image URL: {e}")
-            return None
+            return [None] * len(blob_names)
     
+    @timed_blob_operation('list')
     def list_project_images(self, project_slug: str) -> List[Dict]:
         """List all images for a specific project"""
-        if not self.client:
+        backend = self.backend
+        if backend is None:
             return []
             
         try:
-            container_client = self.client.get_container_client(self.container_name)
-            blobs = container_client.list_blobs(name_starts_with=f"projects/{project_slug}/")
-            
+            resolver = get_public_url_resolver()
             images = []
-            for blob in blobs:
-                images.append({
-                    'blob_name': blob.name,
-                    'url': self.get_image_url(blob.name),
-                    'size': blob.size,
-                    'last_modified': blob.last_modified,
-                })
+            for blobs, _ in backend.list_pages(prefix=f"projects/{project_slug}/"):
+                for blob in blobs:
+                    images.append({
+                        'blob_name': blob.name,
+                        'url': resolver.resolve(blob.name),
+                        'size': blob.size,
+                        'last_modified': blob.last_modified,
+                    })
             
             return images
             
@@ -179,6 +464,21 @@ class AzureBlobService:
             logger.error(f"Failed to list project images: {e}")
             return []
     
+    def iter_blob_pages(self, prefix: Optional[str] = None, page_size: int = 5000,
+                        continuation_token: Optional[str] = None):
+        """
+        Stream the container listing one page at a time
+        
+        Yields:
+            (blobs, next_token) tuples; pass next_token back in to resume a
+            listing after the page it belongs to. next_token is None at the end.
+        """
+        backend = self.backend
+        if backend is None:
+            return
+
+        yield from backend.list_pages(prefix=prefix, page_size=page_size, continuation_token=continuation_token)
+
     def _get_content_type(self, file_ext: str) -> str:
         """Get content type based on file extension"""
         content_types = {
@@ -187,9 +487,12 @@ class AzureBlobService:
             '.png': 'image/png',
             '.gif': 'image/gif',
             '.webp': 'image/webp',
+            '.avif': 'image/avif',
             '.svg': 'image/svg+xml',
         }
         return content_types.get(file_ext.lower(), 'application/octet-stream')
 
-# Global instance
-azure_blob_service = AzureBlobService() 
\ No newline at end of file
+# Global instance; the Azure client itself is created lazily on first use
+azure_blob_service = AzureBlobService()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=azure_blob_service._after_fork)
\ No newline at end of file
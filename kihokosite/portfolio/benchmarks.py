@@ -0,0 +1,278 @@
+"""
+Seeded catalog benchmarks
+
+``seed_catalog`` fills the database with a deterministic synthetic catalog
+(projects, images, flash designs, merchandise and carts) and
+``run_benchmarks`` requests each catalog endpoint through the full Django
+stack, recording latency percentiles, cold and warm query counts, response
+size and peak Python memory. The ``benchmark_catalog`` command runs both against a
+throwaway test database and saves the results as JSON, so runs at 10k or
+100k images can be compared side by side.
+"""
+
+import base64
+import platform
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import django
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .catalog import CATALOG_KEY, MERCHANDISE_KEY, bump_catalog_version, catalog_store
+from .models import Cart, CartItem, FlashDesign, Merchandise, MerchandiseImage, Project, ProjectImage
+
+BATCH_SIZE = 2000
+DERIVATIVE_WIDTHS = (320, 640, 1024, 1600)
+DERIVATIVE_FORMATS = ('avif', 'webp', 'jpg')
+WORDS = ('ink', 'koi', 'peony', 'tiger', 'wave', 'crane', 'dragon', 'moth', 'snake', 'lotus',
+         'dagger', 'swallow', 'skull', 'rose', 'oni', 'hannya', 'maple', 'pine', 'moon', 'fern')
+
+
+@dataclass
+class DatasetSize:
+    projects: int = 50
+    images: int = 10000
+    flash: int = 500
+    merchandise: int = 100
+    carts: int = 200
+
+
+@dataclass
+class EndpointResult:
+    path: str
+    status: int
+    samples: int
+    first_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    first_queries: int
+    queries: int  # most of any timed request
+    bytes: int
+    peak_memory_kib: float
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of unsorted samples"""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _title(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).title()
+
+
+def _image_fields(rng: random.Random, blob_name: str) -> Dict:
+    width = rng.choice((1200, 1600, 2400, 3000))
+    height = int(width * rng.choice((0.75, 1.0, 1.333, 1.5)))
+    stem = blob_name.rsplit('.', 1)[0]
+    derivatives = [
+        {'blob': f"{stem}.w{w}.{fmt}", 'width': w, 'height': int(height * w / width), 'format': fmt}
+        for w in DERIVATIVE_WIDTHS if w < width
+        for fmt in DERIVATIVE_FORMATS
+    ]
+    return {
+        'image_blob': blob_name,
+        'derivatives': derivatives,
+        'width': width,
+        'height': height,
+        # Same order of size as a real 16px JPEG placeholder
+        'placeholder': 'data:image/jpeg;base64,' + base64.b64encode(rng.randbytes(450)).decode(),
+        'dominant_color': '#%06x' % rng.randrange(0x1000000),
+    }
+
+
+def seed_catalog(size: DatasetSize, seed: int = 0) -> Dict[str, int]:
+    """
+    Insert a synthetic catalog of ``size`` with bulk inserts.
+
+    The same seed always produces the same rows. Images are spread over
+    projects with a long tail, so one project holds far more than the
+    average, as real portfolios do.
+    """
+    rng = random.Random(seed)
+
+    projects = Project.objects.bulk_create([
+        Project(
+            title=f"{_title(rng)} {index}",
+            description=' '.join(rng.choice(WORDS) for _ in range(60)),
+            slug=f"project-{index}",
+            featured_image_blob=f"projects/project-{index}/featured.jpg",
+        )
+        for index in range(size.projects)
+    ], batch_size=BATCH_SIZE)
+
+    weights = [1 / (rank + 1) for rank in range(len(projects))]
+    owners = rng.choices(projects, weights=weights, k=size.images) if projects else []
+    ProjectImage.objects.bulk_create([
+        ProjectImage(
+            project=project,
+            title=_title(rng),
+            description=rng.choice(('', ' '.join(rng.choice(WORDS) for _ in range(20)))),
+            order=rng.randrange(100),
+            **_image_fields(rng, f"projects/{project.slug}/{rng.getrandbits(128):032x}.jpg"),
+        )
+        for project in owners
+    ], batch_size=BATCH_SIZE)
+
+    FlashDesign.objects.bulk_create([
+        FlashDesign(
+            title=_title(rng),
+            is_available=rng.random() < 0.7,
+            order=rng.randrange(100),
+            **_image_fields(rng, f"flash/{rng.getrandbits(128):032x}.png"),
+        )
+        for _ in range(size.flash)
+    ], batch_size=BATCH_SIZE)
+
+    merchandise = Merchandise.objects.bulk_create([
+        Merchandise(
+            title=_title(rng)[:100],
+            description=' '.join(rng.choice(WORDS) for _ in range(30)),
+            price=Decimal(rng.randrange(500, 20000)) / 100,
+            stock=rng.randrange(50),
+        )
+        for _ in range(size.merchandise)
+    ], batch_size=BATCH_SIZE)
+    MerchandiseImage.objects.bulk_create([
+        MerchandiseImage(merchandise=item, image=f"merchandise/{item.pk}-{n}.jpg")
+        for item in merchandise
+        for n in range(rng.randint(1, 4))
+    ], batch_size=BATCH_SIZE)
+
+    carts = Cart.objects.bulk_create([Cart() for _ in range(size.carts)], batch_size=BATCH_SIZE)
+    if merchandise:
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, merchandise=item, quantity=rng.randint(1, 3))
+            for cart in carts
+            for item in rng.sample(merchandise, min(len(merchandise), rng.randint(1, 5)))
+        ], batch_size=BATCH_SIZE)
+
+    # Bulk inserts skip the signals that advance the catalog versions
+    bump_catalog_version(CATALOG_KEY)
+    bump_catalog_version(MERCHANDISE_KEY)
+    return {
+        'projects': Project.objects.count(),
+        'images': ProjectImage.objects.count(),
+        'flash': FlashDesign.objects.count(),
+        'merchandise': Merchandise.objects.count(),
+        'carts': Cart.objects.count(),
+        'cart_items': CartItem.objects.count(),
+    }
+
+
+def default_endpoints() -> Dict[str, str]:
+    """Endpoint name -> path, pointing detail pages at the largest project"""
+    largest = Project.objects.annotate(image_count=Count('images')).order_by('-image_count', 'pk').first()
+    image_ids = ProjectImage.objects.order_by('pk').values_list('pk', flat=True)
+    total = image_ids.count()
+    middle_id = image_ids[total // 2] if total else 0
+    slug = largest.slug if largest else 'missing'
+    return {
+        'api_v2_artworks': '/api/v2/artworks/',
+        'api_v2_projects': '/api/v2/projects/',
+        'api_v2_project_detail': f'/api/v2/project/{slug}/',
+        'project_detail': f'/project/{slug}/',
+        'art_detail': f'/art_detail/{middle_id}/',
+        'flash_gallery': '/flash/',
+        'api_merchandise': '/api/merchandise/',
+    }
+
+
+def _reset_caches():
+    for cache in caches.all():
+        cache.clear()
+    catalog_store.reset()
+
+
+def measure_endpoint(client: Client, path: str, iterations: int, uncached: bool = False) -> EndpointResult:
+    """
+    Time ``iterations`` GETs of ``path`` after one cold request.
+
+    The cold request runs with empty caches and no catalog snapshot. With
+    ``uncached`` every timed request starts that way too; otherwise they
+    measure the steady state. Memory is traced in a separate request so
+    tracing overhead does not skew the timings. ``status`` is the first
+    non-2xx status of any request, or that of the last one.
+    """
+    _reset_caches()
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(path)
+    first_ms = (time.perf_counter() - started) * 1000
+    # Read now: the next request clears the connection's query log
+    first_queries = len(queries)
+    statuses = [response.status_code]
+
+    timings = []
+    query_counts = []
+    for _ in range(iterations):
+        if uncached:
+            _reset_caches()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+        statuses.append(response.status_code)
+
+    if uncached:
+        _reset_caches()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        client.get(path)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    timings = timings or [first_ms]
+    return EndpointResult(
+        path=path,
+        status=next((status for status in statuses if not 200 <= status < 300), statuses[-1]),
+        samples=len(timings),
+        first_ms=round(first_ms, 3),
+        p50_ms=round(percentile(timings, 50), 3),
+        p95_ms=round(percentile(timings, 95), 3),
+        p99_ms=round(percentile(timings, 99), 3),
+        mean_ms=round(sum(timings) / len(timings), 3),
+        first_queries=first_queries,
+        queries=max(query_counts, default=first_queries),
+        bytes=len(response.content),
+        peak_memory_kib=round(peak / 1024, 1),
+    )
+
+
+def run_benchmarks(endpoints: Dict[str, str], iterations: int = 50, uncached: bool = False) -> Dict:
+    client = Client()
+    results = {}
+    for name, path in endpoints.items():
+        results[name] = asdict(measure_endpoint(client, path, iterations, uncached=uncached))
+    return results
+
+
+def environment_info(dataset: Dict[str, int], seed: int, iterations: int, uncached: bool,
+                     label: Optional[str] = None) -> Dict:
+    return {
+        'label': label,
+        'created_at': timezone.now().isoformat(),
+        'seed': seed,
+        'dataset': dataset,
+        'iterations': iterations,
+        'uncached': uncached,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
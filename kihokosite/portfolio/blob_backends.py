@@ -0,0 +1,402 @@
+"""
+Storage backends behind AzureBlobService
+
+A backend stores the blobs of one container: uploads from bytes or streams,
+reads, single and batch deletes, and paged listings with continuation
+tokens, and the public URL prefix of its blobs. AzureBlobService picks one
+from PORTFOLIO_BLOB_BACKEND: ``azure`` in production, ``local`` (a directory
+tree) or ``memory`` (per process) to run the upload pipeline, the derivative
+and orphan jobs and image-heavy pages without an Azure account. The
+non-Azure backends are served under PORTFOLIO_BLOB_URL by
+``blob_views.serve_blob``.
+"""
+
+import base64
+import bisect
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from itertools import takewhile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils._os import safe_join
+
+logger = logging.getLogger(__name__)
+
+
+class BlobInfo(NamedTuple):
+    """Listing entry; Azure's BlobProperties expose the same attributes"""
+    name: str
+    size: int
+    last_modified: datetime
+
+
+class BlobBackend:
+    """Interface shared by the Azure, local and in-memory backends"""
+
+    @classmethod
+    def base_url(cls, container_name: str) -> str:
+        """
+        URL prefix the container's blobs are publicly served under. Built
+        from settings alone, so resolving URLs never connects to storage.
+        """
+        raise NotImplementedError
+
+    def exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def upload(self, name: str, data: bytes, content_type: str, cache_control: str):
+        raise NotImplementedError
+
+    def upload_stream(self, name: str, stream: BinaryIO, content_type: str, cache_control: str):
+        """Upload a file-like object without reading it fully into memory"""
+        raise NotImplementedError
+
+    def download(self, name: str) -> bytes:
+        """Contents of ``name``; raises if it does not exist"""
+        raise NotImplementedError
+
+    def open(self, name: str) -> BinaryIO:
+        """Readable file object for serving ``name``; FileNotFoundError if missing"""
+        return io.BytesIO(self.download(name))
+
+    def delete(self, name: str):
+        """Delete ``name``; a missing blob is not an error"""
+        raise NotImplementedError
+
+    def delete_many(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """Blob name -> error message, or None once the blob is gone"""
+        results = {}
+        for name in names:
+            try:
+                self.delete(name)
+                results[name] = None
+            except Exception as e:
+                results[name] = str(e)
+        return results
+
+    def list_pages(self, prefix: Optional[str] = None, page_size: int = 5000,
+                   continuation_token: Optional[str] = None) -> Iterator[Tuple[List, Optional[str]]]:
+        """
+        Yield (blobs, next_token) pages in name order; next_token resumes the
+        listing after that page and is None on the last one.
+        """
+        raise NotImplementedError
+
+
+def _paged(names_after: Iterable[str], describe, page_size: int):
+    """Page a sorted name iterator, using the last name of a page as its token"""
+    page = []
+    for name in names_after:
+        page.append(describe(name))
+        if len(page) == page_size:
+            yield page, name
+            page = []
+    if page:
+        yield page, None
+
+
+class LocalBlobBackend(BlobBackend):
+    """
+    Blobs as files under ``root``, with blob name separators as directories.
+
+    Writes go to a temporary file that is renamed into place, so readers
+    never see a partial blob. ``open`` returns a real file, which
+    FileResponse hands to the server's sendfile support.
+    """
+
+    def __init__(self, root: str, chunk_size: int = 4 * 1024 * 1024):
+        self.root = root
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def base_url(cls, container_name: str) -> str:
+        # Served by this site (blob_views.serve_blob)
+        return settings.PORTFOLIO_BLOB_URL
+
+    def _path(self, name: str) -> str:
+        # Raises SuspiciousFileOperation for names escaping the root
+        return safe_join(self.root, *name.split('/'))
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(self._path(name))
+
+    def _write(self, name: str, fill):
+        path = self._path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                fill(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def upload(self, name: str, data: bytes, content_type: str, cache_control: str):
+        self._write(name, lambda f: f.write(data))
+
+    def upload_stream(self, name: str, stream: BinaryIO, content_type: str, cache_control: str):
+        self._write(name, lambda f: shutil.copyfileobj(stream, f, self.chunk_size))
+
+    def download(self, name: str) -> bytes:
+        with open(self._path(name), 'rb') as f:
+            # One allocation of the final size instead of growing a buffer
+            data = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(data)
+        return bytes(data)
+
+    def open(self, name: str) -> BinaryIO:
+        return open(self._path(name), 'rb')
+
+    def delete(self, name: str):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def _walk(self, directory: str, parts: tuple, after: Optional[tuple]) -> Iterator[str]:
+        """
+        Blob names below ``directory`` in depth-first, sorted order, which is
+        the order of their path-component tuples. Subtrees that sort wholly
+        before ``after`` are skipped without being listed.
+        """
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.name.startswith('.upload-'):
+                continue
+            key = parts + (entry.name,)
+            if entry.is_dir():
+                if after is None or key >= after[:len(key)]:
+                    yield from self._walk(entry.path, key, after)
+            elif after is None or key > after:
+                yield '/'.join(key)
+
+    def list_pages(self, prefix=None, page_size=5000, continuation_token=None):
+        prefix = prefix or ''
+        # Only walk the directory the prefix points into
+        base = prefix.rsplit('/', 1)[0] if '/' in prefix else ''
+        parts = tuple(base.split('/')) if base else ()
+        after = tuple(continuation_token.split('/')) if continuation_token else None
+        names = (
+            name for name in self._walk(self._path(base) if base else self.root, parts, after)
+            if name.startswith(prefix)
+        )
+
+        def describe(name):
+            stat = os.stat(self._path(name))
+            return BlobInfo(name, stat.st_size, datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc))
+
+        yield from _paged(names, describe, page_size)
+
+
+class InMemoryBlobBackend(BlobBackend):
+    """Blobs held in a dict for the life of the process, for tests and profiling"""
+
+    def __init__(self):
+        self._blobs: Dict[str, Tuple[bytes, datetime]] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def base_url(cls, container_name: str) -> str:
+        # Served by this site (blob_views.serve_blob)
+        return settings.PORTFOLIO_BLOB_URL
+
+    def exists(self, name: str) -> bool:
+        return name in self._blobs
+
+    def upload(self, name: str, data: bytes, content_type: str, cache_control: str):
+        with self._lock:
+            if name not in self._blobs:
+                bisect.insort(self._names, name)
+            self._blobs[name] = (bytes(data), datetime.now(timezone.utc))
+
+    def upload_stream(self, name: str, stream: BinaryIO, content_type: str, cache_control: str):
+        self.upload(name, stream.read(), content_type, cache_control)
+
+    def download(self, name: str) -> bytes:
+        try:
+            return self._blobs[name][0]
+        except KeyError:
+            raise FileNotFoundError(name) from None
+
+    def delete(self, name: str):
+        with self._lock:
+            if self._blobs.pop(name, None) is not None:
+                del self._names[bisect.bisect_left(self._names, name)]
+
+    def list_pages(self, prefix=None, page_size=5000, continuation_token=None):
+        prefix = prefix or ''
+        with self._lock:
+            names = self._names
+            # Names sharing the prefix are contiguous in sorted order
+            start = bisect.bisect_left(names, prefix)
+            if continuation_token:
+                start = max(start, bisect.bisect_right(names, continuation_token))
+            # Copied under the lock, so a concurrent delete cannot break the listing
+            entries = {
+                name: self._blobs[name]
+                for name in takewhile(lambda name: name.startswith(prefix), names[start:])
+            }
+
+        def describe(name):
+            data, last_modified = entries[name]
+            return BlobInfo(name, len(data), last_modified)
+
+        yield from _paged(iter(entries), describe, page_size)
+
+
+class AzureBlobBackend(BlobBackend):
+    """
+    Blobs in an Azure Storage container, via a shared BlobServiceClient.
+
+    The SDK is imported by the methods that need it, so building image URLs
+    does not load azure.storage.blob.
+    """
+
+    def __init__(self, client, container_name: str, block_size: int = 4 * 1024 * 1024,
+                 block_concurrency: int = 4, block_retries: int = 3):
+        self.client = client
+        self.container_name = container_name
+        self.block_size = block_size
+        self.block_concurrency = block_concurrency
+        self.block_retries = block_retries
+
+    @classmethod
+    def base_url(cls, container_name: str) -> str:
+        """
+        PORTFOLIO_IMAGE_HOST replaces the storage account host (e.g. a CDN
+        endpoint or custom domain); PORTFOLIO_IMAGE_SCHEME defaults to https.
+        """
+        host = getattr(settings, 'PORTFOLIO_IMAGE_HOST', None) or (
+            f"{settings.AZURE_ACCOUNT_NAME}.blob.core.windows.net"
+        )
+        scheme = getattr(settings, 'PORTFOLIO_IMAGE_SCHEME', 'https')
+        return f"{scheme}://{host}/{container_name}/"
+
+    def _blob_client(self, name: str):
+        return self.client.get_blob_client(container=self.container_name, blob=name)
+
+    def _container_client(self):
+        return self.client.get_container_client(self.container_name)
+
+    def exists(self, name: str) -> bool:
+        return self._blob_client(name).exists()
+
+    def upload(self, name: str, data: bytes, content_type: str, cache_control: str):
+        from azure.storage.blob import ContentSettings
+
+        self._blob_client(name).upload_blob(
+            data,
+            overwrite=True,
+            content_settings=ContentSettings(content_type=content_type, cache_control=cache_control)
+        )
+
+    def upload_stream(self, name: str, stream: BinaryIO, content_type: str, cache_control: str):
+        """
+        Upload a file-like object as a block blob with bounded memory
+        
+        Blocks are read sequentially and staged in parallel; no more than
+        ``block_concurrency`` blocks are in flight, so peak memory is
+        independent of the file size. The blob only becomes visible once the
+        block list is committed.
+        """
+        from azure.storage.blob import BlobBlock, ContentSettings
+
+        blob_client = self._blob_client(name)
+        block_ids = []
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.block_concurrency) as executor:
+            while True:
+                chunk = stream.read(self.block_size)
+                if not chunk:
+                    break
+                # Block IDs must all have the same length within a blob
+                block_id = base64.b64encode(f"{len(block_ids):08d}".encode()).decode()
+                block_ids.append(block_id)
+                pending.add(executor.submit(self._stage_block, blob_client, block_id, chunk))
+                del chunk
+
+                if len(pending) >= self.block_concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+
+            for future in pending:
+                future.result()
+
+        blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in block_ids],
+            content_settings=ContentSettings(content_type=content_type, cache_control=cache_control)
+        )
+
+    def _stage_block(self, blob_client, block_id: str, data: bytes):
+        """Stage one block, retrying with exponential backoff"""
+        for attempt in range(self.block_retries):
+            try:
+                blob_client.stage_block(block_id=block_id, data=data, length=len(data))
+                return
+            except Exception as e:
+                if attempt == self.block_retries - 1:
+                    raise
+                logger.warning(f"Retrying block {block_id} after error: {e}")
+                time.sleep(0.5 * 2 ** attempt)
+
+    def download(self, name: str) -> bytes:
+        return self._blob_client(name).download_blob().readall()
+
+    def delete(self, name: str):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            self._blob_client(name).delete_blob()
+        except ResourceNotFoundError:
+            logger.warning(f"Blob not found for deletion: {name}")
+
+    def delete_many(self, names: List[str]) -> Dict[str, Optional[str]]:
+        """One batch request for up to 256 blobs; already-missing blobs count as deleted"""
+        responses = self._container_client().delete_blobs(*names, raise_on_any_failure=False)
+        results = {}
+        for name, response in zip(names, responses):
+            if response.status_code in (202, 404):
+                results[name] = None
+            else:
+                results[name] = f"HTTP {response.status_code}: {response.reason}"
+        return results
+
+    def list_pages(self, prefix=None, page_size=5000, continuation_token=None):
+        pages = self._container_client().list_blobs(
+            name_starts_with=prefix,
+            results_per_page=page_size
+        ).by_page(continuation_token=continuation_token)
+        for page in pages:
+            blobs = list(page)
+            yield blobs, pages.continuation_token
+
+
+BACKENDS = {
+    'azure': AzureBlobBackend,
+    'local': LocalBlobBackend,
+    'memory': InMemoryBlobBackend,
+}
+
+
+def get_backend_class(name: str) -> type:
+    """Backend class for a PORTFOLIO_BLOB_BACKEND value"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown PORTFOLIO_BLOB_BACKEND: {name!r}") from None
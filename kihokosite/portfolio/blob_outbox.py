@@ -0,0 +1,136 @@
+"""
+Transactional outbox for blob deletions
+
+Deleting a row (directly, through a queryset or by cascade) records the blobs
+it owned in BlobDeletion inside the same transaction. A worker drains the
+outbox with Azure batch deletes, so request latency never depends on Azure and
+rolled-back deletes never lose a blob that is still referenced.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .blob_refs import still_referenced
+from .models import BlobDeletion, FlashDesign, Project, ProjectImage
+
+logger = logging.getLogger(__name__)
+
+# Azure rejects batch requests with more than 256 sub-requests
+MAX_BATCH_SIZE = 256
+
+# How long a drain owns the rows it claimed; longer than any storage call takes
+CLAIM_DURATION = timedelta(minutes=10)
+
+
+class BlobDeletionInProgress(Exception):
+    """A drain is deleting a blob that a new row wants to reference"""
+
+
+def enqueue_blob_deletions(blob_names: Iterable[str]):
+    """Schedule blobs for deletion as part of the current transaction"""
+    rows = [BlobDeletion(blob_name=name) for name in dict.fromkeys(blob_names) if name]
+    if rows:
+        BlobDeletion.objects.bulk_create(rows)
+
+
+def cancel_blob_deletions(blob_names: Iterable[str]) -> int:
+    """
+    Withdraw queued deletions of blobs a row is about to reference again.
+
+    Call inside the transaction that saves the referencing row. Uploads are
+    content-addressed, so re-uploading deleted bytes reuses a blob that may
+    still be queued; without this a drain could remove it once the row
+    exists. Raises BlobDeletionInProgress if a drain has claimed one of the
+    rows: the blob may be gone by the time the row commits, so the upload
+    should be retried once the drain is done.
+    """
+    names = [name for name in dict.fromkeys(blob_names) if name]
+    if not names:
+        return 0
+    rows = list(
+        BlobDeletion.objects.select_for_update().filter(blob_name__in=names).values_list('pk', 'claimed_until')
+    )
+    now = timezone.now()
+    claimed = sorted({pk for pk, claimed_until in rows if claimed_until and claimed_until > now})
+    if claimed:
+        raise BlobDeletionInProgress(f"Blob deletions {claimed} are being drained")
+    rows = [pk for pk, _ in rows]
+    if rows:
+        BlobDeletion.objects.filter(pk__in=rows).delete()
+    return len(rows)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ProjectImage)
+@receiver(post_delete, sender=FlashDesign)
+def enqueue_deleted_blobs(sender, instance, **kwargs):
+    enqueue_blob_deletions(instance.blob_names)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff between attempts, capped at one hour"""
+    return timedelta(seconds=min(3600, 30 * 2 ** (attempts - 1)))
+
+
+def drain_blob_deletions(blob_service, batch_size: int = MAX_BATCH_SIZE) -> dict:
+    """
+    Process one batch of due outbox rows.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED so several workers
+    can drain concurrently. Blobs are content-addressed and may be shared, so
+    rows whose blob is still referenced by another row are dropped without
+    touching storage. The rest are leased for CLAIM_DURATION in that short
+    transaction; storage is called with no transaction open, and a second
+    one deletes or reschedules the rows the lease still covers. Returns
+    counts of deleted, kept and failed rows.
+    """
+    batch_size = min(batch_size, MAX_BATCH_SIZE)
+    with transaction.atomic():
+        rows = list(
+            BlobDeletion.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=timezone.now())
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if not rows:
+            return {'deleted': 0, 'kept': 0, 'failed': 0}
+
+        shared = still_referenced(row.blob_name for row in rows)
+        kept = [row.pk for row in rows if row.blob_name in shared]
+        BlobDeletion.objects.filter(pk__in=kept).delete()
+
+        rows = [row for row in rows if row.blob_name not in shared]
+        # A drain that dies mid-batch leaves rows that fall due when the lease ends
+        claimed_until = timezone.now() + CLAIM_DURATION
+        BlobDeletion.objects.filter(pk__in=[row.pk for row in rows]).update(
+            available_at=claimed_until, claimed_until=claimed_until
+        )
+    if not rows:
+        return {'deleted': 0, 'kept': len(kept), 'failed': 0}
+
+    results = blob_service.delete_images(list(dict.fromkeys(row.blob_name for row in rows)))
+
+    with transaction.atomic():
+        # Rows reclaimed by another drain after the lease expired are no longer ours
+        owned = BlobDeletion.objects.filter(claimed_until=claimed_until)
+        done = [row.pk for row in rows if results.get(row.blob_name) is None]
+        owned.filter(pk__in=done).delete()
+
+        failed = [row for row in rows if results.get(row.blob_name) is not None]
+        now = timezone.now()
+        for row in failed:
+            owned.filter(pk=row.pk).update(
+                attempts=row.attempts + 1,
+                last_error=results[row.blob_name],
+                available_at=now + retry_delay(row.attempts + 1),
+                claimed_until=None,
+            )
+
+    if failed:
+        logger.warning(f"{len(failed)} blob deletions failed and were rescheduled")
+    return {'deleted': len(done), 'kept': len(kept), 'failed': len(failed)}
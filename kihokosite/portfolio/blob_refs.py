@@ -0,0 +1,107 @@
+"""
+Blob names referenced by the database
+
+Used by the orphan reconciler and the deletion outbox to decide which blobs
+in the portfolio container are still in use. Uploads are content-addressed,
+so one blob may be shared by several rows.
+"""
+
+import posixpath
+import re
+from typing import Dict, Iterable, Set
+
+from django.db.models import Q
+
+from .models import BlobDeletion, FlashDesign, Project, ProjectImage
+
+# ``<stem>.w<width>.<format>`` as produced by image_pipeline.derivative_blob_name
+DERIVATIVE_NAME_RE = re.compile(r'^(?P<stem>.+)\.w\d+\.[a-z0-9]+$')
+
+
+def original_stem(blob_name: str) -> str:
+    """Blob name without extension, or without the derivative suffix"""
+    match = DERIVATIVE_NAME_RE.match(blob_name)
+    if match:
+        return match.group('stem')
+    return posixpath.splitext(blob_name)[0]
+
+
+def _derivative_blobs(derivatives) -> Iterable[str]:
+    for derivative in derivatives or []:
+        yield derivative['blob']
+
+
+def referenced_blob_names() -> Set[str]:
+    """
+    Every blob name referenced by a Project, ProjectImage or FlashDesign,
+    including derivatives. Rows are streamed with iterator() so only the
+    resulting set of names is held in memory.
+    """
+    names = set()
+    names.update(
+        Project.objects.exclude(featured_image_blob__isnull=True)
+        .exclude(featured_image_blob='')
+        .values_list('featured_image_blob', flat=True)
+        .iterator()
+    )
+    for model in (ProjectImage, FlashDesign):
+        for blob, derivatives in model.objects.values_list('image_blob', 'derivatives').iterator():
+            if blob:
+                names.add(blob)
+            names.update(_derivative_blobs(derivatives))
+    return names
+
+
+def queued_blob_names() -> Set[str]:
+    """Blobs already waiting in the deletion outbox"""
+    return set(BlobDeletion.objects.values_list('blob_name', flat=True).iterator())
+
+
+def still_referenced(blob_names: Iterable[str]) -> Set[str]:
+    """
+    Re-check a batch of candidate orphans against the database.
+
+    Catches rows that started referencing a blob after the reference set
+    was built. Derivative names are matched through their original's stem.
+    """
+    blob_names = set(blob_names)
+    if not blob_names:
+        return set()
+
+    found = set(
+        Project.objects.filter(featured_image_blob__in=blob_names)
+        .values_list('featured_image_blob', flat=True)
+    )
+    stems = {original_stem(name) for name in blob_names}
+    stem_filter = Q()
+    for stem in stems:
+        stem_filter |= Q(image_blob__startswith=stem)
+    for model in (ProjectImage, FlashDesign):
+        for blob, derivatives in model.objects.filter(Q(image_blob__in=blob_names) | stem_filter).values_list(
+            'image_blob', 'derivatives'
+        ):
+            found.add(blob)
+            found.update(_derivative_blobs(derivatives))
+    return found & blob_names
+
+
+STORED_IMAGE_FIELDS = ('derivatives', 'width', 'height', 'placeholder', 'dominant_color')
+
+
+def stored_image_fields(blob_name: str) -> Dict:
+    """
+    Derivatives and metadata of a row already using ``blob_name``, or {}.
+
+    Lets a repeat upload of the same bytes reuse the work done for the
+    first one instead of regenerating it.
+    """
+    for model in (ProjectImage, FlashDesign):
+        fields = (
+            model.objects.filter(image_blob=blob_name, width__isnull=False)
+            .exclude(derivatives=[])
+            .values(*STORED_IMAGE_FIELDS)
+            .first()
+        )
+        if fields:
+            return fields
+    return {}
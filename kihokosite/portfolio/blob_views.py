@@ -0,0 +1,26 @@
+"""
+Serves blobs from the local and in-memory storage backends
+
+Only routed when PORTFOLIO_BLOB_BACKEND is not 'azure', much like
+``static()`` serves media in development.
+"""
+
+import mimetypes
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.views.decorators.http import require_safe
+
+from .azure_service import CACHE_CONTROL, azure_blob_service
+
+
+@require_safe
+def serve_blob(request, blob_name):
+    try:
+        blob = azure_blob_service.backend.open(blob_name)
+    except (FileNotFoundError, IsADirectoryError, SuspiciousFileOperation):
+        raise Http404("Blob not found")
+    # FileResponse streams real files through the server's sendfile support
+    response = FileResponse(blob, content_type=mimetypes.guess_type(blob_name)[0] or 'application/octet-stream')
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,350 @@
+"""
+In-process read model for the public catalog.
+
+Projects, project images and flash designs change a few times a week but are
+read on every public page and API call. Each worker keeps an immutable
+snapshot of them (with image URLs already resolved) and only rebuilds it when
+the shared catalog version stored in the database moves forward.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .image_urls import get_image_url_resolver, resolve_image_urls, resolve_srcsets
+from .models import CatalogVersion, FlashDesign, Merchandise, MerchandiseImage, Project, ProjectImage
+
+logger = logging.getLogger(__name__)
+
+CATALOG_KEY = 'catalog'
+MERCHANDISE_KEY = 'merchandise'
+
+
+@dataclass(frozen=True, slots=True)
+class ImageEntry:
+    id: int
+    project_id: int
+    title: str
+    description: str
+    image_blob: str
+    image_url: Optional[str]
+    srcsets: Mapping[str, str]
+    order: int
+    created_at: datetime
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: str = ''
+    dominant_color: str = ''
+
+    @property
+    def pk(self):
+        return self.id
+
+
+@dataclass(frozen=True, slots=True)
+class ProjectEntry:
+    id: int
+    title: str
+    description: str
+    slug: str
+    featured_image_blob: Optional[str]
+    featured_image_url: Optional[str]
+    images: Tuple[ImageEntry, ...]
+
+    @property
+    def pk(self):
+        return self.id
+
+
+@dataclass(frozen=True, slots=True)
+class FlashEntry:
+    id: int
+    title: str
+    description: str
+    image_blob: str
+    image_url: Optional[str]
+    srcsets: Mapping[str, str]
+    is_available: bool
+    order: int
+    created_at: datetime
+    updated_at: datetime
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: str = ''
+    dominant_color: str = ''
+
+    @property
+    def pk(self):
+        return self.id
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Immutable view of the public catalog at a given version"""
+    version: int
+    updated_at: Optional[datetime]
+    projects: Tuple[ProjectEntry, ...]
+    images: Tuple[ImageEntry, ...]
+    flash_designs: Tuple[FlashEntry, ...]
+    projects_by_slug: Mapping[str, ProjectEntry]
+    images_by_id: Mapping[int, ImageEntry]
+    available_flash_count: int
+    taken_flash_count: int
+    flash_updated_at: Optional[datetime] = None
+    urls_valid_until: Optional[datetime] = None
+    _memo: Dict[str, object] = field(default_factory=dict, repr=False, compare=False)
+    _memo_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def get_project(self, slug: str) -> Optional[ProjectEntry]:
+        return self.projects_by_slug.get(slug)
+
+    @property
+    def flash_cache_key(self) -> str:
+        """
+        Changes whenever the rendered flash grid would: a design is added,
+        removed or edited, or signed image URLs roll over.
+        """
+        parts = (len(self.flash_designs), self.flash_updated_at, self.urls_valid_until)
+        return ':'.join(value.isoformat() if isinstance(value, datetime) else str(value) for value in parts)
+
+    @property
+    def urls_expired(self) -> bool:
+        """Signed URLs have rolled over to a new SAS bucket since the build"""
+        return self.urls_valid_until is not None and timezone.now() >= self.urls_valid_until
+
+    def memoize(self, key: str, builder: Callable[[], object]):
+        """
+        Return a value derived from this snapshot, computing it at most once.
+
+        Used to keep serialized API payloads alongside the snapshot they were
+        built from, so repeat requests skip serialization entirely.
+        """
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._memo_lock:
+            if key not in self._memo:
+                self._memo[key] = builder()
+            return self._memo[key]
+
+
+def _build_snapshot(version: int, updated_at: Optional[datetime]) -> CatalogSnapshot:
+    """Load projects, images and flash designs and freeze them into a snapshot"""
+    urls_valid_until = get_image_url_resolver().valid_until()
+    image_rows = list(ProjectImage.objects.order_by('order', 'created_at', 'id'))
+    project_rows = list(Project.objects.order_by('id'))
+    flash_rows = list(FlashDesign.objects.all())
+
+    images = tuple(
+        ImageEntry(
+            id=image.id,
+            project_id=image.project_id,
+            title=image.title,
+            description=image.description,
+            image_blob=image.image_blob,
+            image_url=url,
+            srcsets=MappingProxyType(resolve_srcsets(image.derivatives)),
+            order=image.order,
+            created_at=image.created_at,
+            width=image.width,
+            height=image.height,
+            placeholder=image.placeholder,
+            dominant_color=image.dominant_color,
+        )
+        for image, url in zip(image_rows, resolve_image_urls(row.image_blob for row in image_rows))
+    )
+
+    images_by_project: Dict[int, list] = {}
+    for image in images:
+        images_by_project.setdefault(image.project_id, []).append(image)
+
+    projects = tuple(
+        ProjectEntry(
+            id=project.id,
+            title=project.title,
+            description=project.description,
+            slug=project.slug,
+            featured_image_blob=project.featured_image_blob,
+            featured_image_url=url,
+            images=tuple(images_by_project.get(project.id, ())),
+        )
+        for project, url in zip(
+            project_rows, resolve_image_urls(row.featured_image_blob for row in project_rows)
+        )
+    )
+
+    flash_designs = tuple(
+        FlashEntry(
+            id=design.id,
+            title=design.title,
+            description=design.description,
+            image_blob=design.image_blob,
+            image_url=url,
+            srcsets=MappingProxyType(resolve_srcsets(design.derivatives)),
+            is_available=design.is_available,
+            order=design.order,
+            created_at=design.created_at,
+            updated_at=design.updated_at,
+            width=design.width,
+            height=design.height,
+            placeholder=design.placeholder,
+            dominant_color=design.dominant_color,
+        )
+        for design, url in zip(flash_rows, resolve_image_urls(row.image_blob for row in flash_rows))
+    )
+    available = sum(1 for design in flash_designs if design.is_available)
+
+    return CatalogSnapshot(
+        version=version,
+        updated_at=updated_at,
+        projects=projects,
+        images=images,
+        flash_designs=flash_designs,
+        projects_by_slug=MappingProxyType({project.slug: project for project in projects}),
+        images_by_id=MappingProxyType({image.id: image for image in images}),
+        available_flash_count=available,
+        taken_flash_count=len(flash_designs) - available,
+        flash_updated_at=max((design.updated_at for design in flash_designs), default=None),
+        urls_valid_until=urls_valid_until,
+    )
+
+
+class CatalogStore:
+    """
+    Per-process holder of the current catalog snapshot.
+
+    The shared version row is consulted at most once every
+    ``CATALOG_VERSION_CHECK_INTERVAL`` seconds, or immediately after this
+    process has written to the catalog itself.
+    """
+
+    def __init__(self, key: str = CATALOG_KEY):
+        self.key = key
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._token = None
+        self._checked_at = 0.0
+        self._dirty = True
+        self._lock = threading.Lock()
+
+    @property
+    def check_interval(self) -> float:
+        return getattr(settings, 'CATALOG_VERSION_CHECK_INTERVAL', 2.0)
+
+    def _read_version(self):
+        return read_version(self.key)
+
+    def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and not self._dirty
+            and time.monotonic() - self._checked_at < self.check_interval
+            and not snapshot.urls_expired
+        ):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if (
+                snapshot is not None
+                and not self._dirty
+                and time.monotonic() - self._checked_at < self.check_interval
+                and not snapshot.urls_expired
+            ):
+                return snapshot
+
+            # Clear the flag before reading so a write racing with the rebuild
+            # marks the store dirty again instead of being lost.
+            self._dirty = False
+            token = self._read_version()
+            if snapshot is None or token != self._token or snapshot.urls_expired:
+                snapshot = _build_snapshot(*token)
+                self._snapshot = snapshot
+                self._token = token
+                logger.info(f"Rebuilt catalog snapshot at version {token[0]}")
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def peek(self) -> Optional[CatalogSnapshot]:
+        """Return the last built snapshot without touching the database"""
+        return self._snapshot
+
+    def invalidate(self):
+        self._dirty = True
+
+    def require(self, version: int):
+        """
+        Make the next ``get`` consult the shared version unless the snapshot
+        is already at ``version``, which a caller has just read from the
+        database (another worker may have moved it within the check interval).
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            self._dirty = True
+
+    def reset(self):
+        with self._lock:
+            self._snapshot = None
+            self._token = None
+            self._dirty = True
+
+
+def read_version(key: str = CATALOG_KEY) -> Tuple[int, Optional[datetime]]:
+    """Current (version, updated_at) watermark for ``key``; one unique-index lookup"""
+    row = (
+        CatalogVersion.objects.filter(key=key)
+        .values_list('version', 'updated_at')
+        .first()
+    )
+    return row or (0, None)
+
+
+catalog_store = CatalogStore()
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Return the current catalog snapshot for this process"""
+    return catalog_store.get()
+
+
+def bump_catalog_version(key: str = CATALOG_KEY):
+    """Advance the shared catalog version so every worker rebuilds its snapshot"""
+    updated = CatalogVersion.objects.filter(key=key).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.get_or_create(key=key, defaults={'version': 1})
+
+    if key == catalog_store.key:
+        catalog_store.invalidate()
+        transaction.on_commit(catalog_store.invalidate)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectImage)
+@receiver(post_save, sender=FlashDesign)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ProjectImage)
+@receiver(post_delete, sender=FlashDesign)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Merchandise)
+@receiver(post_save, sender=MerchandiseImage)
+@receiver(post_delete, sender=Merchandise)
+@receiver(post_delete, sender=MerchandiseImage)
+def merchandise_changed(sender, **kwargs):
+    bump_catalog_version(MERCHANDISE_KEY)
@@ -0,0 +1,232 @@
+"""
+Responsive image derivatives for portfolio uploads
+
+Every upload is re-encoded into a few widths and formats (AVIF and WebP where
+Pillow supports them, progressive JPEG as the fallback) with EXIF stripped.
+Derivatives live next to the original under deterministic blob names, so they
+can be regenerated or cleaned up from the original name alone.
+
+Uploads are also analysed for their display dimensions, a tiny blurred
+placeholder and a dominant colour, which are stored on the model.
+"""
+
+import base64
+import io
+import logging
+import posixpath
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+from .image_urls import SOURCE_ORDER
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (320, 640, 1024, 1600)
+PLACEHOLDER_SIZE = 16
+# EXIF orientations that rotate by 90 degrees, swapping width and height
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+EXIF_ORIENTATION = 0x0112
+
+FORMATS = {
+    'avif': {'pil_format': 'AVIF', 'content_type': 'image/avif', 'options': {'quality': 55}},
+    'webp': {'pil_format': 'WEBP', 'content_type': 'image/webp', 'options': {'quality': 78, 'method': 4}},
+    'jpg': {'pil_format': 'JPEG', 'content_type': 'image/jpeg',
+            'options': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+
+
+@dataclass(frozen=True)
+class Derivative:
+    blob_name: str
+    width: int
+    height: int
+    format: str
+    content_type: str
+    data: bytes
+
+    def as_record(self) -> Dict:
+        """Metadata stored on the model; the bytes live only in blob storage"""
+        return {
+            'blob': self.blob_name,
+            'width': self.width,
+            'height': self.height,
+            'format': self.format,
+        }
+
+
+@dataclass(frozen=True)
+class ImageMetadata:
+    width: int
+    height: int
+    placeholder: str
+    dominant_color: str
+
+    def as_fields(self) -> Dict:
+        """Model field values"""
+        return {
+            'width': self.width,
+            'height': self.height,
+            'placeholder': self.placeholder,
+            'dominant_color': self.dominant_color,
+        }
+
+
+def get_derivative_widths() -> tuple:
+    return tuple(getattr(settings, 'PORTFOLIO_DERIVATIVE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def get_derivative_formats() -> List[str]:
+    """Formats this Pillow build can encode, best compression first"""
+    available = []
+    for name in SOURCE_ORDER:
+        if name == 'avif' and not features.check('avif'):
+            continue
+        if name == 'webp' and not features.check('webp'):
+            continue
+        available.append(name)
+    return available
+
+
+def derivative_blob_name(blob_name: str, width: int, fmt: str) -> str:
+    """``projects/ink/abc.png`` -> ``projects/ink/abc.w640.webp``"""
+    base, _ = posixpath.splitext(blob_name)
+    return f"{base}.w{width}.{fmt}"
+
+
+def _target_widths(original_width: int, widths: Iterable[int]) -> List[int]:
+    targets = sorted({width for width in widths if width < original_width})
+    # Images narrower than every breakpoint still get one re-encoded copy
+    return targets or [original_width]
+
+
+def _prepare(image: Image.Image, fmt: str) -> Image.Image:
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if fmt == 'jpg':
+        if has_alpha:
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image.convert('RGBA'), mask=image.convert('RGBA').getchannel('A'))
+            return background
+        return image.convert('RGB')
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def generate_derivatives(source: Union[bytes, BinaryIO], blob_name: str,
+                         widths: Optional[Iterable[int]] = None,
+                         formats: Optional[Iterable[str]] = None) -> List[Derivative]:
+    """
+    Decode an upload once and encode every width/format combination.
+
+    EXIF (including GPS) is dropped by re-encoding from pixel data; the
+    orientation tag is applied to the pixels first so nothing renders sideways.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    with Image.open(source) as original:
+        original.load()
+        image = ImageOps.exif_transpose(original)
+
+    widths = _target_widths(image.width, widths or get_derivative_widths())
+    formats = list(formats or get_derivative_formats())
+
+    derivatives = []
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            spec = FORMATS[fmt]
+            buffer = io.BytesIO()
+            _prepare(resized, fmt).save(buffer, format=spec['pil_format'], **spec['options'])
+            derivatives.append(Derivative(
+                blob_name=derivative_blob_name(blob_name, width, fmt),
+                width=width,
+                height=height,
+                format=fmt,
+                content_type=spec['content_type'],
+                data=buffer.getvalue(),
+            ))
+    return derivatives
+
+
+def _as_stream(source: Union[bytes, BinaryIO]) -> BinaryIO:
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _display_size(image: Image.Image) -> Tuple[int, int]:
+    width, height = image.size
+    # EXIF parsed at open only: getexif() decodes the whole image for PNG
+    exif = Image.Exif()
+    if image.info.get('exif'):
+        exif.load(image.info['exif'])
+    if exif.get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def read_dimensions(source: Union[bytes, BinaryIO]) -> Tuple[int, int]:
+    """
+    Display (width, height) read from the image headers alone.
+
+    Image.open only parses headers; no pixel data is decoded. EXIF rotation
+    is taken into account so portrait phone photos report portrait sizes.
+    """
+    with Image.open(_as_stream(source)) as image:
+        return _display_size(image)
+
+
+def analyze_image(source: Union[bytes, BinaryIO]) -> ImageMetadata:
+    """
+    Dimensions, placeholder and dominant colour of an upload.
+
+    JPEGs are decoded at reduced scale via draft(), so the cost does not
+    track the original resolution; other formats are decoded in full.
+    """
+    with Image.open(_as_stream(source)) as original:
+        width, height = _display_size(original)
+        original.draft('RGB', (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+        original.load()
+        image = ImageOps.exif_transpose(original)
+
+    small = _prepare(image, 'jpg')
+    small.thumbnail((PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4), Image.Resampling.BILINEAR)
+
+    # Most common colour of a small palette reduction
+    palette_image = small.quantize(colors=8)
+    _, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3:index * 3 + 3]
+
+    tiny = small.copy()
+    tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    tiny.save(buffer, format='JPEG', quality=40, optimize=True)
+
+    return ImageMetadata(
+        width=width,
+        height=height,
+        placeholder='data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode(),
+        dominant_color=f'#{red:02x}{green:02x}{blue:02x}',
+    )
+
+
+def image_metadata_fields(source: Union[bytes, BinaryIO]) -> Dict:
+    """
+    Model field values for an upload, or {} if it cannot be read.
+
+    Dimensions come from the headers first, so an upload whose pixels cannot
+    be decoded still reserves its layout space, just without a placeholder.
+    """
+    stream = _as_stream(source)
+    try:
+        width, height = read_dimensions(stream)
+    except Exception as e:
+        logger.warning(f"Could not read image dimensions: {e}")
+        return {}
+    stream.seek(0)
+    try:
+        return analyze_image(stream).as_fields()
+    except Exception as e:
+        logger.warning(f"Could not analyse image: {e}")
+        return {'width': width, 'height': height}
@@ -0,0 +1,135 @@
+"""
+Image URL resolution for blobs stored in the portfolio container
+
+Blob names are turned into public URLs by prefix concatenation. The prefix is
+built once per process from settings, and can point at a CDN or custom domain
+in front of the storage account via PORTFOLIO_IMAGE_HOST. When the container is
+private (PORTFOLIO_IMAGES_PRIVATE) URLs carry cached, expiry-bucketed SAS tokens.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .blob_backends import get_backend_class
+
+DEFAULT_CONTAINER = 'portfolio-images'
+
+# Order used when offering <source> elements: smallest files first
+SOURCE_ORDER = ('avif', 'webp', 'jpg')
+
+
+def get_container_name() -> str:
+    return getattr(settings, 'PORTFOLIO_IMAGES_CONTAINER', DEFAULT_CONTAINER)
+
+
+class ImageURLResolver:
+    """Resolves blob names to URLs against a fixed base URL"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/') + '/'
+
+    def resolve(self, blob_name: Optional[str]) -> Optional[str]:
+        if not blob_name:
+            return None
+        return self.base_url + quote(blob_name)
+
+    def resolve_many(self, blob_names: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """Resolve a batch of blob names, preserving order and empty entries"""
+        prefix = self.base_url
+        return [prefix + quote(name) if name else None for name in blob_names]
+
+    def valid_until(self) -> Optional[datetime]:
+        """When URLs resolved now stop being the ones this resolver would hand out"""
+        return None
+
+
+class SignedImageURLResolver(ImageURLResolver):
+    """Appends SAS tokens from the blob service's token cache"""
+
+    def __init__(self, base_url: str, signer, expiry_hours: int = 24):
+        super().__init__(base_url)
+        self.signer = signer
+        self.expiry_hours = expiry_hours
+
+    def resolve(self, blob_name: Optional[str]) -> Optional[str]:
+        return self.resolve_many([blob_name])[0]
+
+    def resolve_many(self, blob_names: Iterable[Optional[str]]) -> List[Optional[str]]:
+        blob_names = list(blob_names)
+        urls = super().resolve_many(blob_names)
+        tokens = self.signer.get_sas_tokens(blob_names, expiry_hours=self.expiry_hours)
+        return [f"{url}?{token}" if url and token else url for url, token in zip(urls, tokens)]
+
+    def valid_until(self) -> Optional[datetime]:
+        return self.signer.get_sas_valid_until(self.expiry_hours)
+
+
+def build_base_url() -> str:
+    """URL prefix for the portfolio container, from the configured blob backend"""
+    backend_class = get_backend_class(getattr(settings, 'PORTFOLIO_BLOB_BACKEND', 'azure'))
+    return backend_class.base_url(get_container_name())
+
+
+@lru_cache(maxsize=1)
+def get_public_url_resolver() -> ImageURLResolver:
+    """Resolver for unsigned URLs, regardless of container privacy"""
+    return ImageURLResolver(build_base_url())
+
+
+@lru_cache(maxsize=1)
+def get_image_url_resolver() -> ImageURLResolver:
+    if getattr(settings, 'PORTFOLIO_IMAGES_PRIVATE', False):
+        from .azure_service import azure_blob_service
+        return SignedImageURLResolver(
+            build_base_url(),
+            azure_blob_service,
+            expiry_hours=getattr(settings, 'PORTFOLIO_IMAGE_SAS_HOURS', 24),
+        )
+    return get_public_url_resolver()
+
+
+def resolve_image_url(blob_name: Optional[str]) -> Optional[str]:
+    return get_image_url_resolver().resolve(blob_name)
+
+
+def resolve_image_urls(blob_names: Iterable[Optional[str]]) -> List[Optional[str]]:
+    return get_image_url_resolver().resolve_many(blob_names)
+
+
+def resolve_srcsets(derivatives: Optional[List[Dict]]) -> Dict[str, str]:
+    """
+    Group stored derivative records into ``srcset`` strings per format.
+
+    Returns e.g. ``{'webp': 'https://.../a.w320.webp 320w, ...'}`` in
+    SOURCE_ORDER, resolving every URL in one bulk call.
+    """
+    if not derivatives:
+        return {}
+    records = sorted(derivatives, key=lambda record: record['width'])
+    urls = resolve_image_urls(record['blob'] for record in records)
+    grouped: Dict[str, List[str]] = {}
+    for record, url in zip(records, urls):
+        grouped.setdefault(record['format'], []).append(f"{url} {record['width']}w")
+    return {fmt: ', '.join(grouped[fmt]) for fmt in SOURCE_ORDER if fmt in grouped}
+
+
+@receiver(setting_changed)
+def reset_image_url_resolver(setting, **kwargs):
+    if setting in {
+        'AZURE_ACCOUNT_NAME',
+        'PORTFOLIO_BLOB_BACKEND',
+        'PORTFOLIO_BLOB_URL',
+        'PORTFOLIO_IMAGES_CONTAINER',
+        'PORTFOLIO_IMAGE_HOST',
+        'PORTFOLIO_IMAGE_SCHEME',
+        'PORTFOLIO_IMAGES_PRIVATE',
+        'PORTFOLIO_IMAGE_SAS_HOURS',
+    }:
+        get_public_url_resolver.cache_clear()
+        get_image_url_resolver.cache_clear()
@@ -0,0 +1,20 @@
+"""
+Seek conditions for composite ordering keys
+
+Shared by the keyset paginator and the model helpers that find an image's
+neighbours. Kept free of DRF so importing the models does not load it.
+"""
+
+from typing import Sequence, Tuple
+
+from django.db.models import Q
+
+
+def seek_filter(ordering: Sequence[str], key: Tuple, reverse: bool = False) -> Q:
+    """Rows strictly after (or before, when reversed) ``key`` in ``ordering``"""
+    lookup = 'lt' if reverse else 'gt'
+    condition = Q()
+    for index, field in enumerate(ordering):
+        equal = {name: key[i] for i, name in enumerate(ordering[:index])}
+        condition |= Q(**equal, **{f'{field}__{lookup}': key[index]})
+    return condition
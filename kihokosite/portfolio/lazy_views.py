@@ -0,0 +1,33 @@
+"""
+URLconf entries for rarely used views, imported on first request
+
+Resolving the URLconf imports every view module it names. Routes that are
+seldom hit (uploads, token auth) point at a ``lazy_api_view`` instead, so
+their modules and dependencies load when first called rather than in every
+worker at startup.
+"""
+
+from django.utils.module_loading import import_string
+
+
+def lazy_api_view(dotted_path: str):
+    """
+    Stand-in for the DRF function view at ``dotted_path``.
+
+    CsrfViewMiddleware inspects the callback before the real view is
+    imported, so the stand-in carries the ``csrf_exempt`` flag that DRF puts
+    on every APIView; DRF's SessionAuthentication still enforces CSRF. Only
+    use this for views built with ``@api_view``.
+    """
+    view = None
+
+    def inner(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path)
+        return view(request, *args, **kwargs)
+
+    inner.__name__ = inner.__qualname__ = dotted_path.rsplit('.', 1)[1]
+    inner.__module__ = dotted_path.rsplit('.', 1)[0]
+    inner.csrf_exempt = True
+    return inner
@@ -0,0 +1,147 @@
+"""
+Benchmark the catalog endpoints against a seeded synthetic dataset.
+
+A throwaway test database is created, filled by portfolio.benchmarks with a
+deterministic catalog of the requested size, and every catalog endpoint is
+requested through the full middleware stack. Results (latency percentiles,
+cold and warm queries, bytes and peak memory per endpoint) are written as
+JSON; pass a previous file with --compare to see how the numbers moved. The
+command fails, after writing the results, if any endpoint answered with a
+non-2xx status, since its timings do not measure the real page.
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from portfolio.benchmarks import (
+    DatasetSize, default_endpoints, environment_info, run_benchmarks, seed_catalog,
+)
+
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'first_queries', 'queries', 'bytes', 'peak_memory_kib')
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic catalog in a test database and benchmark the catalog endpoints"
+
+    def add_arguments(self, parser):
+        defaults = DatasetSize()
+        parser.add_argument('--projects', type=int, default=defaults.projects)
+        parser.add_argument('--images', type=int, default=defaults.images)
+        parser.add_argument('--flash', type=int, default=defaults.flash)
+        parser.add_argument('--merchandise', type=int, default=defaults.merchandise)
+        parser.add_argument('--carts', type=int, default=defaults.carts)
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Random seed; the same seed always generates the same dataset")
+        parser.add_argument('--iterations', type=int, default=50,
+                            help="Timed requests per endpoint after the cold one")
+        parser.add_argument('--uncached', action='store_true',
+                            help="Clear caches and the catalog snapshot before every request")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', metavar='NAME',
+                            help="Only run this endpoint (repeatable)")
+        parser.add_argument('--label', default=None,
+                            help="Free-form label stored with the results, e.g. a branch name")
+        parser.add_argument('--output', default=None,
+                            help="Results file (default: benchmarks/catalog-<images>-<timestamp>.json)")
+        parser.add_argument('--compare', default=None,
+                            help="Earlier results file to compare against")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Reuse the test database between runs (the dataset is still re-seeded)")
+
+    def handle(self, *args, **options):
+        size = DatasetSize(
+            projects=options['projects'],
+            images=options['images'],
+            flash=options['flash'],
+            merchandise=options['merchandise'],
+            carts=options['carts'],
+        )
+
+        # Read up front: fail before seeding, and allow --compare and --output to name one file
+        previous = self.load_results(options['compare']) if options['compare'] else None
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if options['keepdb']:
+                # A kept database still holds the previous run's dataset
+                call_command('flush', interactive=False, verbosity=0)
+
+            self.stdout.write(f"Seeding {size} (seed {options['seed']})")
+            dataset = seed_catalog(size, seed=options['seed'])
+
+            endpoints = default_endpoints()
+            if options['endpoints']:
+                unknown = set(options['endpoints']) - set(endpoints)
+                if unknown:
+                    raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+                endpoints = {name: endpoints[name] for name in options['endpoints']}
+
+            results = {
+                'environment': environment_info(
+                    dataset, options['seed'], options['iterations'], options['uncached'], options['label']
+                ),
+                'endpoints': run_benchmarks(endpoints, options['iterations'], uncached=options['uncached']),
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.report(results['endpoints'])
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks',
+            f"catalog-{size.images}-{timezone.now().strftime('%Y%m%dT%H%M%S')}.json",
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if previous is not None:
+            self.compare(options['compare'], previous, results['endpoints'])
+
+        errors = [f"{name} ({result['path']}) returned HTTP {result['status']}"
+                  for name, result in results['endpoints'].items() if not 200 <= result['status'] < 300]
+        if errors:
+            raise CommandError("; ".join(errors))
+
+    def report(self, endpoints):
+        self.stdout.write(
+            f"{'endpoint':<24}{'status':>7}{'first':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+            f"{'cold q':>8}{'queries':>9}{'bytes':>11}{'peak KiB':>10}"
+        )
+        for name, result in endpoints.items():
+            self.stdout.write(
+                f"{name:<24}{result['status']:>7}{result['first_ms']:>9.2f}{result['p50_ms']:>9.2f}"
+                f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                f"{result['first_queries']:>8}{result['queries']:>9}"
+                f"{result['bytes']:>11}{result['peak_memory_kib']:>10.1f}"
+            )
+
+    def load_results(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)['endpoints']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+    def compare(self, path, previous, endpoints):
+        self.stdout.write(f"Compared with {path}:")
+        for name, result in endpoints.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            changes = []
+            for metric in COMPARED_METRICS:
+                old, new = before.get(metric), result[metric]
+                if old is None or old == new:
+                    continue  # not recorded by older runs, or unchanged
+                change = f"{(new - old) / old * 100:+.0f}%" if old else "new"
+                changes.append(f"{metric} {old} -> {new} ({change})")
+            self.stdout.write(f"  {name}: {'; '.join(changes) or 'unchanged'}")
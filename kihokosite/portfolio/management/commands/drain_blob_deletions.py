@@ -0,0 +1,49 @@
+"""
+Worker that drains the blob deletion outbox using Azure batch deletes.
+
+Run once (e.g. from cron / a WebJob) or with --loop as a long-lived worker.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.azure_service import azure_blob_service
+from portfolio.blob_outbox import MAX_BATCH_SIZE, drain_blob_deletions
+
+
+class Command(BaseCommand):
+    help = "Delete blobs queued in the BlobDeletion outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE,
+                            help=f"Blobs per batch request (max {MAX_BATCH_SIZE})")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling for new rows instead of exiting when empty")
+        parser.add_argument('--interval', type=float, default=10.0,
+                            help="Seconds to sleep between polls when the outbox is empty")
+
+    def handle(self, *args, **options):
+        if azure_blob_service.backend is None:
+            raise CommandError("Blob storage is not configured")
+
+        total_deleted = total_kept = total_failed = 0
+        while True:
+            result = drain_blob_deletions(azure_blob_service, batch_size=options['batch_size'])
+            total_deleted += result['deleted']
+            total_kept += result['kept']
+            total_failed += result['failed']
+
+            if result['deleted'] or result['kept'] or result['failed']:
+                self.stdout.write(
+                    f"Deleted {result['deleted']}, kept {result['kept']} still referenced, "
+                    f"rescheduled {result['failed']}"
+                )
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained: {total_deleted} deleted, {total_kept} kept, {total_failed} rescheduled"
+        ))
@@ -0,0 +1,47 @@
+"""
+Backfill responsive derivatives and image metadata (dimensions, placeholder,
+dominant colour) for images uploaded before the pipeline existed, or for
+flash designs whose blobs were added through the admin.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from portfolio.azure_service import azure_blob_service
+from portfolio.image_pipeline import image_metadata_fields
+from portfolio.models import FlashDesign, ProjectImage
+
+
+class Command(BaseCommand):
+    help = "Generate srcset derivatives and layout metadata for project images and flash designs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Regenerate even when derivatives and metadata are already recorded")
+
+    def handle(self, *args, **options):
+        if azure_blob_service.backend is None:
+            raise CommandError("Blob storage is not configured")
+
+        for model in (ProjectImage, FlashDesign):
+            queryset = model.objects.exclude(image_blob='')
+            if not options['force']:
+                queryset = queryset.filter(Q(derivatives=[]) | Q(width__isnull=True))
+
+            done = 0
+            for instance in queryset.iterator():
+                original = azure_blob_service.download_image(instance.image_blob)
+                if original is None:
+                    self.stderr.write(f"Skipping {instance.image_blob}: original not readable")
+                    continue
+                update_fields = []
+                if options['force'] or not instance.derivatives:
+                    instance.derivatives = azure_blob_service.upload_derivatives(instance.image_blob, original)
+                    update_fields.append('derivatives')
+                for name, value in image_metadata_fields(original).items():
+                    setattr(instance, name, value)
+                    update_fields.append(name)
+                instance.save(update_fields=update_fields)
+                done += 1
+
+            self.stdout.write(f"{model._meta.verbose_name_plural}: processed {done}")
@@ -0,0 +1,41 @@
+"""
+Render the catalog APIs into precompressed, content-hashed static JSON files.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.azure_service import azure_blob_service
+from portfolio.snapshot_publisher import (
+    BlobContainerTarget, DirectoryTarget, get_default_target, publish_snapshot,
+)
+
+
+class Command(BaseCommand):
+    help = "Publish static JSON snapshots of the api/v2 catalog endpoints"
+
+    def add_arguments(self, parser):
+        destination = parser.add_mutually_exclusive_group()
+        destination.add_argument('--dir', help="Write into this directory")
+        destination.add_argument('--container', help="Write into this blob container")
+
+    def handle(self, *args, **options):
+        if options['dir']:
+            target = DirectoryTarget(options['dir'])
+        elif options['container']:
+            if azure_blob_service.client is None:
+                raise CommandError("Azure Blob Storage is not configured")
+            target = BlobContainerTarget(azure_blob_service.client.get_container_client(options['container']))
+        else:
+            target = get_default_target()
+        if target is None:
+            raise CommandError(
+                "No destination: pass --dir/--container or set PORTFOLIO_SNAPSHOT_DIR "
+                f"(the '{settings.PORTFOLIO_SNAPSHOT_CONTAINER}' container needs Azure credentials)"
+            )
+
+        manifest = publish_snapshot(target)
+        self.stdout.write(self.style.SUCCESS(
+            f"Published catalog v{manifest['version']}: {len(manifest['files'])} files, "
+            f"{len(manifest['retired'])} retired"
+        ))
@@ -0,0 +1,113 @@
+"""
+Find (and optionally delete) blobs in the portfolio container that no
+Project, ProjectImage or FlashDesign row references.
+
+The listing is streamed page by page against an in-memory set of referenced
+names, and progress is checkpointed after every page so a run over millions
+of blobs can be interrupted and resumed with --resume.
+"""
+
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from portfolio.azure_service import azure_blob_service
+from portfolio.blob_outbox import MAX_BATCH_SIZE
+from portfolio.blob_refs import queued_blob_names, referenced_blob_names, still_referenced
+
+
+class Command(BaseCommand):
+    help = "Report or delete orphaned blobs in the portfolio container"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true',
+                            help="Delete orphans (default is a report only)")
+        parser.add_argument('--prefix', default=None,
+                            help="Only scan blobs whose name starts with this prefix")
+        parser.add_argument('--min-age-hours', type=float, default=24,
+                            help="Ignore blobs modified more recently, e.g. uploads still in flight")
+        parser.add_argument('--page-size', type=int, default=5000,
+                            help="Blobs requested per listing page")
+        parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE,
+                            help=f"Blobs per batch delete request (max {MAX_BATCH_SIZE})")
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, 'reconcile_blobs.json'),
+                            help="File used to record progress between pages")
+        parser.add_argument('--resume', action='store_true',
+                            help="Continue from the listing position stored in the checkpoint")
+
+    def handle(self, *args, **options):
+        if azure_blob_service.backend is None:
+            raise CommandError("Blob storage is not configured")
+
+        state = self.load_checkpoint(options) if options['resume'] else None
+        state = state or {'continuation_token': None, 'scanned': 0, 'orphans': 0,
+                          'orphan_bytes': 0, 'deleted': 0, 'prefix': options['prefix']}
+        if state['prefix'] != options['prefix']:
+            raise CommandError("Checkpoint was written for a different --prefix")
+
+        referenced = referenced_blob_names() | queued_blob_names()
+        self.stdout.write(f"{len(referenced)} blob names referenced by the database")
+
+        cutoff = timezone.now() - timedelta(hours=options['min_age_hours'])
+        batch_size = min(options['batch_size'], MAX_BATCH_SIZE)
+
+        for blobs, next_token in azure_blob_service.iter_blob_pages(
+            prefix=options['prefix'],
+            page_size=options['page_size'],
+            continuation_token=state['continuation_token'],
+        ):
+            orphans = [
+                blob for blob in blobs
+                if blob.name not in referenced and blob.last_modified < cutoff
+            ]
+            state['scanned'] += len(blobs)
+            state['orphans'] += len(orphans)
+            state['orphan_bytes'] += sum(blob.size or 0 for blob in orphans)
+
+            for blob in orphans:
+                self.stdout.write(f"orphan: {blob.name} ({blob.size} bytes)")
+
+            if options['delete']:
+                names = [blob.name for blob in orphans]
+                for start in range(0, len(names), batch_size):
+                    state['deleted'] += self.delete_batch(names[start:start + batch_size])
+
+            state['continuation_token'] = next_token
+            self.save_checkpoint(options['checkpoint'], state)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {state['scanned']} blobs: {state['orphans']} orphans "
+            f"({state['orphan_bytes'] / 1024 / 1024:.1f} MiB), {state['deleted']} deleted"
+        ))
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+
+    def delete_batch(self, names):
+        # Rows created since the reference set was built must keep their blobs
+        keep = still_referenced(names)
+        names = [name for name in names if name not in keep]
+        results = azure_blob_service.delete_images(names)
+        for name, error in results.items():
+            if error:
+                self.stderr.write(f"Failed to delete {name}: {error}")
+        return sum(1 for error in results.values() if error is None)
+
+    def load_checkpoint(self, options):
+        try:
+            with open(options['checkpoint']) as checkpoint:
+                state = json.load(checkpoint)
+        except FileNotFoundError:
+            return None
+        self.stdout.write(f"Resuming after {state['scanned']} scanned blobs")
+        return state
+
+    def save_checkpoint(self, path, state):
+        # Write-then-rename so an interrupted run never leaves a torn checkpoint
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(tmp_path, path)
@@ -0,0 +1,182 @@
+"""
+Profile a cold start of the WSGI/ASGI application and enforce a time budget.
+
+A fresh interpreter, run with ``-X importtime``, imports ``kihokosite.wsgi``
+(or ``asgi``) and serves one request in-process. The command reports the
+slowest packages by import time, the wall-clock time to import the
+application and to answer the first request, and which of the modules that
+should only load on demand were imported anyway. It exits with an error when
+any budget is exceeded or the first request does not succeed (2xx/3xx), so
+it can gate a deployment.
+"""
+
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, NamedTuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in the child interpreter; prints a JSON report as its last stdout line
+PROBE = r'''
+import asyncio, io, json, sys, time
+
+target, path, deferred = sys.argv[1], sys.argv[2], sys.argv[3:]
+
+started = time.perf_counter()
+module = __import__(f'kihokosite.{target}', fromlist=['application'])
+application = module.application
+imported = time.perf_counter()
+
+from django.conf import settings
+host = next((h for h in settings.ALLOWED_HOSTS if h and h[0] not in '.*'), 'localhost')
+
+if target == 'wsgi':
+    statuses = []
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(body)
+    status = int(statuses[0].split()[0])
+else:
+    async def request():
+        messages = []
+        received = asyncio.Event()
+
+        async def receive():
+            if not received.is_set():
+                received.set()
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'root_path': '', 'headers': [(b'host', host.encode())], 'client': ('127.0.0.1', 0),
+            'server': (host, 80),
+        }
+        await application(scope, receive, send)
+        return next(m['status'] for m in messages if m['type'] == 'http.response.start')
+
+    status = asyncio.run(request())
+responded = time.perf_counter()
+
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (responded - imported) * 1000,
+    'status': status,
+    'deferred_loaded': [name for name in deferred if name in sys.modules],
+}))
+'''
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """Entries from ``-X importtime`` stderr, in the order they were logged"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header row
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append(ImportTime(
+            module=stripped,
+            self_us=int(fields[0]),
+            cumulative_us=int(fields[1]),
+            depth=(len(name) - len(stripped) - 1) // 2,
+        ))
+    return entries
+
+
+def package_breakdown(entries: List[ImportTime]) -> Dict[str, int]:
+    """Self time in microseconds per top-level package, largest first"""
+    totals = defaultdict(int)
+    for entry in entries:
+        totals[entry.module.split('.')[0]] += entry.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def run_probe(target: str, path: str, deferred_modules) -> tuple:
+    """Run PROBE in a fresh interpreter; returns (report, import entries)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, target, path, *deferred_modules],
+        cwd=settings.BASE_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CommandError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report, parse_importtime(result.stderr)
+
+
+class Command(BaseCommand):
+    help = "Measure application import and first-response time against a budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=['wsgi', 'asgi'], default='wsgi',
+                            help="Entry point to import")
+        parser.add_argument('--path', default='/',
+                            help="Path requested after the application is imported; pick a common page, "
+                                 "not one of the deferred upload/auth routes")
+        parser.add_argument('--import-budget-ms', type=float, default=settings.STARTUP_IMPORT_BUDGET_MS,
+                            help="Maximum time to import the application")
+        parser.add_argument('--first-response-budget-ms', type=float,
+                            default=settings.STARTUP_FIRST_RESPONSE_BUDGET_MS,
+                            help="Maximum time to answer the first request after import")
+        parser.add_argument('--top', type=int, default=15,
+                            help="Number of packages and modules to list")
+
+    def handle(self, *args, **options):
+        deferred = list(settings.STARTUP_DEFERRED_MODULES)
+        report, entries = run_probe(options['target'], options['path'], deferred)
+
+        top = options['top']
+        self.stdout.write("Import time by package (self, ms):")
+        for package, self_us in list(package_breakdown(entries).items())[:top]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}  {package}")
+
+        self.stdout.write("Slowest modules (cumulative, ms):")
+        for entry in sorted(entries, key=lambda e: e.cumulative_us, reverse=True)[:top]:
+            self.stdout.write(f"  {entry.cumulative_us / 1000:8.1f}  {entry.module}")
+
+        self.stdout.write(
+            f"Imported kihokosite.{options['target']} in {report['import_ms']:.0f}ms "
+            f"(budget {options['import_budget_ms']:.0f}ms); "
+            f"first response to {options['path']} ({report['status']}) in {report['first_response_ms']:.0f}ms "
+            f"(budget {options['first_response_budget_ms']:.0f}ms)"
+        )
+
+        problems = []
+        if not 200 <= report['status'] < 400:
+            # A fast error page is not a successful start
+            problems.append(f"first response to {options['path']} was HTTP {report['status']}")
+        if report['import_ms'] > options['import_budget_ms']:
+            problems.append(f"import took {report['import_ms']:.0f}ms")
+        if report['first_response_ms'] > options['first_response_budget_ms']:
+            problems.append(f"first response took {report['first_response_ms']:.0f}ms")
+        if report['deferred_loaded']:
+            problems.append(
+                f"deferred modules loaded by startup or the first request: {', '.join(report['deferred_loaded'])}"
+            )
+        if problems:
+            raise CommandError("Startup budget exceeded: " + "; ".join(problems))
+
+        self.stdout.write(self.style.SUCCESS("Startup within budget"))
@@ -0,0 +1,376 @@
+"""
+In-process request metrics in the Prometheus text format
+
+``MetricsMiddleware`` observes each request into a handful of histograms:
+latency and response size per view, SQL query count and per-query duration,
+and AzureBlobService operation latency (via ``timed_blob_operation``).
+Observing is a lock and a bisect into fixed buckets, so it costs
+microseconds per request.
+
+Each worker process aggregates its own numbers. With PORTFOLIO_METRICS_DIR
+set, workers also write their totals to ``<dir>/<worker>.json`` at most every
+PORTFOLIO_METRICS_FLUSH_SECONDS (and at exit), and the metrics endpoint sums
+every worker's file, so a scrape that lands on any one worker sees the whole
+server. So that counters never go backwards, a scrape that finds a worker's
+process gone folds that worker's totals into ``<dir>/archive.json`` and
+removes its file; the directory stays one file per live worker however often
+workers are recycled. Folding checks PIDs, so the directory must be local to
+the host; delete it to reset the counters.
+"""
+
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: exited workers' files are kept instead of folded
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+ARCHIVE_FILENAME = 'archive.json'
+LOCK_FILENAME = '.metrics.lock'
+
+
+class Histogram:
+    """
+    A labelled histogram; ``values`` maps a label-value tuple to
+    [per-bucket counts (the last one is +Inf), sum].
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        # bisect_left: a value equal to a bound belongs in that bucket (le)
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+
+class MetricsRegistry:
+    """Histograms of one process, plus the file store shared between workers"""
+
+    def __init__(self, histograms: Iterable[Histogram]):
+        self.histograms = {histogram.name: histogram for histogram in histograms}
+        self.directory = getattr(settings, 'PORTFOLIO_METRICS_DIR', '')
+        self.flush_seconds = getattr(settings, 'PORTFOLIO_METRICS_FLUSH_SECONDS', 5.0)
+        self._lock = threading.Lock()
+        self._worker_id = self._new_worker_id()
+        self._flushed_at = time.monotonic()
+        self._dirty = False
+
+    def _new_worker_id(self) -> str:
+        # PIDs get reused; the random suffix keeps a new worker from overwriting an old one's file
+        return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def observe(self, name: str, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            self.histograms[name].observe(labels, value)
+            self._dirty = True
+
+    def observe_many(self, observations: Iterable[Tuple[str, Tuple[str, ...], float]]):
+        """Record several observations under one lock acquisition"""
+        with self._lock:
+            for name, labels, value in observations:
+                self.histograms[name].observe(labels, value)
+            self._dirty = True
+
+    def snapshot(self) -> Dict:
+        """This process's values as JSON-serialisable data"""
+        with self._lock:
+            return {
+                name: [[list(labels), list(entry[0]), entry[1]] for labels, entry in histogram.values.items()]
+                for name, histogram in self.histograms.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            for histogram in self.histograms.values():
+                histogram.values.clear()
+            self._dirty = False
+
+    def _after_fork(self):
+        # The child starts empty: the parent's numbers are already in the parent's file
+        self._lock = threading.Lock()
+        for histogram in self.histograms.values():
+            histogram.values.clear()
+        self._worker_id = self._new_worker_id()
+        self._flushed_at = time.monotonic()
+        self._dirty = False
+
+    @property
+    def path(self) -> Optional[str]:
+        return os.path.join(self.directory, f"{self._worker_id}.json") if self.directory else None
+
+    def maybe_flush(self):
+        """Write this worker's file if it changed and the flush interval has passed"""
+        if self.directory and self._dirty and time.monotonic() - self._flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Atomically replace this worker's file with its current totals"""
+        if not self.directory:
+            return
+        self._flushed_at = time.monotonic()
+        self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            _write_json(self.directory, self.path, self.snapshot())
+        except OSError as e:
+            logger.warning(f"Failed to write metrics to {self.directory}: {e}")
+
+    def collect(self) -> Dict[str, Dict[Tuple[str, ...], list]]:
+        """
+        Totals per histogram and label set, summed over this process, the
+        files of every other worker and the archive of exited ones.
+        """
+        snapshots = [self.snapshot()]
+        if self.directory:
+            try:
+                with self._directory_lock():
+                    snapshots.extend(self._read_directory())
+            except OSError as e:
+                logger.warning(f"Failed to read metrics from {self.directory}: {e}")
+        return self._merge(snapshots)
+
+    @contextmanager
+    def _directory_lock(self):
+        """
+        Serialise scrapes, so one never reads a worker's file and the archive
+        it was just folded into. Workers' flushes need no lock (os.replace).
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILENAME), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read_directory(self) -> List[Dict]:
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return []
+        own = os.path.basename(self.path)
+        workers = [name for name in names
+                   if not name.startswith('.') and name.endswith('.json') and name not in (own, ARCHIVE_FILENAME)]
+        archive = self._read_archive()
+        exited = [name for name in workers if fcntl is not None and not _worker_alive(name)]
+        if exited:
+            archive = self._fold(archive, exited)
+
+        snapshots = [archive['metrics']]
+        for filename in workers:
+            # A file still listed in the archive was folded but not yet removed
+            if filename in exited or filename in archive['workers']:
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics file {filename}: {e}")
+        return snapshots
+
+    def _read_archive(self) -> Dict:
+        try:
+            with open(os.path.join(self.directory, ARCHIVE_FILENAME)) as f:
+                archive = json.load(f)
+            return {'workers': list(archive['workers']), 'metrics': dict(archive['metrics'])}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable metrics archive: {e}")
+        return {'workers': [], 'metrics': {}}
+
+    def _fold(self, archive: Dict, exited: List[str]) -> Dict:
+        """
+        Add the totals of exited workers' files to the archive, then remove
+        the files. The archive lists the files it holds until they are gone,
+        so a crash between the two steps cannot count a worker twice.
+        """
+        snapshots = [archive['metrics']]
+        folded = []
+        for filename in exited:
+            if filename in archive['workers']:
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics file {filename}: {e}")
+                continue
+            folded.append(filename)
+
+        if folded:
+            still_present = [name for name in archive['workers']
+                             if os.path.exists(os.path.join(self.directory, name))]
+            archive = {
+                'workers': still_present + folded,
+                'metrics': {
+                    name: [[list(labels), entry[0], entry[1]] for labels, entry in values.items()]
+                    for name, values in self._merge(snapshots).items()
+                },
+            }
+            _write_json(self.directory, os.path.join(self.directory, ARCHIVE_FILENAME), archive)
+        for filename in exited:
+            if filename in archive['workers']:
+                try:
+                    os.unlink(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+        return archive
+
+    def _merge(self, snapshots: Iterable[Dict]) -> Dict[str, Dict[Tuple[str, ...], list]]:
+        merged = {name: {} for name in self.histograms}
+        for data in snapshots:
+            for name, rows in data.items():
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    continue  # written by a release with other metrics
+                for labels, counts, total in rows:
+                    if len(counts) != len(histogram.buckets) + 1:
+                        continue  # buckets changed since the file was written
+                    entry = merged[name].setdefault(tuple(labels), [[0] * len(counts), 0.0])
+                    entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                    entry[1] += total
+        return merged
+
+    def render(self) -> str:
+        """All histograms in the Prometheus text exposition format"""
+        merged = self.collect()
+        lines = []
+        for name, histogram in self.histograms.items():
+            lines.append(f"# HELP {name} {histogram.documentation}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, (counts, total) in sorted(merged[name].items()):
+                pairs = [f'{key}="{_escape(value)}"' for key, value in zip(histogram.labelnames, labels)]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_number(bound)
+                    bucket_pairs = pairs + [f'le="{le}"']
+                    lines.append(f"{name}_bucket{{{','.join(bucket_pairs)}}} {cumulative}")
+                label_text = f"{{{','.join(pairs)}}}" if pairs else ''
+                lines.append(f"{name}_sum{label_text} {_format_number(total)}")
+                lines.append(f"{name}_count{label_text} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _write_json(directory: str, path: str, data):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _worker_alive(filename: str) -> bool:
+    """
+    Whether the process that wrote ``<pid>-<suffix>.json`` still runs. Files
+    not named that way are never folded; a reused PID only delays folding.
+    """
+    pid = filename.split('-', 1)[0]
+    if not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # e.g. EPERM: the PID exists but belongs to another user
+    return True
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REQUEST_DURATION = 'portfolio_http_request_duration_seconds'
+RESPONSE_SIZE = 'portfolio_http_response_size_bytes'
+REQUEST_QUERIES = 'portfolio_db_queries_per_request'
+QUERY_DURATION = 'portfolio_db_query_duration_seconds'
+BLOB_DURATION = 'portfolio_blob_operation_duration_seconds'
+
+registry = MetricsRegistry([
+    Histogram(REQUEST_DURATION, "Time to handle a request, by view, method and status",
+              ('view', 'method', 'status'), LATENCY_BUCKETS),
+    Histogram(RESPONSE_SIZE, "Response body size in bytes, by view", ('view',), SIZE_BUCKETS),
+    Histogram(REQUEST_QUERIES, "SQL queries executed per request, by view", ('view',), QUERY_COUNT_BUCKETS),
+    Histogram(QUERY_DURATION, "Duration of each SQL query, by the view that ran it", ('view',),
+              QUERY_DURATION_BUCKETS),
+    Histogram(BLOB_DURATION, "Duration of AzureBlobService operations, by operation and outcome",
+              ('operation', 'outcome'), LATENCY_BUCKETS),
+])
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registry._after_fork)
+atexit.register(lambda: registry._dirty and registry.flush())
+
+
+def timed_blob_operation(operation: str):
+    """
+    Record the duration of an AzureBlobService method. The service methods
+    report failures by returning None or False rather than raising, so those
+    (and exceptions) count as the ``error`` outcome.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = None
+            try:
+                result = method(*args, **kwargs)
+                return result
+            finally:
+                outcome = 'error' if result is None or result is False else 'ok'
+                registry.observe(BLOB_DURATION, (operation, outcome), time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class QueryTimer:
+    """execute_wrapper that counts the queries of one request and times each"""
+
+    def __init__(self):
+        self.durations: List[float] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations.append(time.perf_counter() - started)
@@ -0,0 +1,54 @@
+"""
+Request metrics middleware; see portfolio.metrics
+"""
+
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from .metrics import QUERY_DURATION, REQUEST_DURATION, REQUEST_QUERIES, RESPONSE_SIZE, QueryTimer, registry
+
+
+class MetricsMiddleware:
+    """
+    Time every request and the SQL it runs, and record the response size.
+
+    Place it first in MIDDLEWARE so the latency includes the rest of the
+    stack. Requests that match no route are grouped under ``unmatched`` to
+    keep the label set bounded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match.route) if match else 'unmatched'
+        observations = [
+            (REQUEST_DURATION, (view, request.method, str(response.status_code)), elapsed),
+            (REQUEST_QUERIES, (view,), len(timer.durations)),
+        ]
+        observations.extend((QUERY_DURATION, (view,), duration) for duration in timer.durations)
+        size = self.response_size(response)
+        if size is not None:
+            observations.append((RESPONSE_SIZE, (view,), size))
+        registry.observe_many(observations)
+        registry.maybe_flush()
+        return response
+
+    @staticmethod
+    def response_size(response):
+        if not response.streaming:
+            return len(response.content)
+        # Streamed bodies are only sized when the view declared a length
+        length = response.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
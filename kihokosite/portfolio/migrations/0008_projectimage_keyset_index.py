@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectimage',
+            index=models.Index(fields=['order', 'created_at', 'id'], name='projectimage_keyset_idx'),
+        ),
+    ]
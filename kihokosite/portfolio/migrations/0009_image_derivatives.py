@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_projectimage_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashdesign',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=list, help_text='Resized/re-encoded copies stored next to the original'),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=list, help_text='Resized/re-encoded copies stored next to the original'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0009_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blob_name', models.CharField(max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('available_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='Earliest time the next attempt may run')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['available_at', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0010_blob_deletion_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectimage',
+            index=models.Index(fields=['project', 'order', 'created_at', 'id'], name='projectimage_neighbor_idx'),
+        ),
+    ]
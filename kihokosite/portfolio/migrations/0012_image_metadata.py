@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0011_projectimage_neighbor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashdesign',
+            name='dominant_color',
+            field=models.CharField(blank=True, help_text='Hex colour, e.g. #a83c2e', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='flashdesign',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='flashdesign',
+            name='placeholder',
+            field=models.TextField(blank=True, help_text='Tiny blurred preview as a data URI'),
+        ),
+        migrations.AddField(
+            model_name='flashdesign',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='dominant_color',
+            field=models.CharField(blank=True, help_text='Hex colour, e.g. #a83c2e', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='placeholder',
+            field=models.TextField(blank=True, help_text='Tiny blurred preview as a data URI'),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0012_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blobdeletion',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, help_text='Set while a drain is deleting the blob', null=True),
+        ),
+    ]
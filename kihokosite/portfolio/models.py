@@ -3,8 +3,11 @@ from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.files.storage import default_storage
+from django.utils import timezone
 import os
 from django.conf import settings
+from .image_urls import resolve_image_url, resolve_srcsets
+from .keyset import seek_filter
 
 def unique_file_path(instance, filename):
     """Ensures file uniqueness by renaming duplicates with model-specific paths"""
@@ -61,17 +64,12 @@ class Project(models.Model):
     @property
     def featured_image_url(self):
         """Get the URL for the featured image from Azure Blob Storage"""
-        if self.featured_image_blob:
-            from .azure_service import azure_blob_service
-            return azure_blob_service.get_image_url(self.featured_image_blob)
-        return None
-
-    def delete(self, *args, **kwargs):
-        # Delete the blob when the model instance is deleted
-        if self.featured_image_blob:
-            from .azure_service import azure_blob_service
-            azure_blob_service.delete_image(self.featured_image_blob)
-        super().delete(*args, **kwargs)
+        return resolve_image_url(self.featured_image_blob)
+
+    @property
+    def blob_names(self):
+        """Blobs owned by this row, removed through the deletion outbox"""
+        return [self.featured_image_blob] if self.featured_image_blob else []
 
 class ProjectImage(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='images')
@@ -80,28 +78,63 @@ class ProjectImage(models.Model):
     title = models.CharField(max_length=200, default='Untitled')
     description = models.TextField(blank=True, help_text="Optional image description")
     order = models.PositiveIntegerField(default=0, help_text="Display order")
+    derivatives = models.JSONField(default=list, blank=True,
+                                   help_text="Resized/re-encoded copies stored next to the original")
+    # Read at upload time so pages can reserve layout before any image bytes arrive
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    placeholder = models.TextField(blank=True, help_text="Tiny blurred preview as a data URI")
+    dominant_color = models.CharField(max_length=7, blank=True, help_text="Hex colour, e.g. #a83c2e")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['order', 'created_at']
+        indexes = [
+            # Keyset pagination seeks on the full ordering key
+            models.Index(fields=['order', 'created_at', 'id'], name='projectimage_keyset_idx'),
+            # Prev/next seeks within a project
+            models.Index(fields=['project', 'order', 'created_at', 'id'], name='projectimage_neighbor_idx'),
+        ]
 
     def __str__(self):
         return f"{self.project.title} - {self.title}"
+
+    def get_neighbor_ids(self):
+        """
+        (previous_id, next_id) within the project, wrapping around at the ends.
+
+        Each side is one seek on the neighbor index, so the cost does not grow
+        with the size of the project.
+        """
+        ordering = ('order', 'created_at', 'id')
+        key = (self.order, self.created_at, self.id)
+        siblings = ProjectImage.objects.filter(project_id=self.project_id).values_list('id', flat=True)
+        descending = [f'-{field}' for field in ordering]
+
+        next_id = siblings.filter(seek_filter(ordering, key)).order_by(*ordering).first()
+        if next_id is None:
+            next_id = siblings.order_by(*ordering).first()
+        previous_id = siblings.filter(seek_filter(ordering, key, reverse=True)).order_by(*descending).first()
+        if previous_id is None:
+            previous_id = siblings.order_by(*descending).first()
+        return previous_id, next_id
     
     @property
     def image_url(self):
         """Get the URL for the image from Azure Blob Storage"""
-        if self.image_blob:
-            from .azure_service import azure_blob_service
-            return azure_blob_service.get_image_url(self.image_blob)
-        return None
+        return resolve_image_url(self.image_blob)
 
-    def delete(self, *args, **kwargs):
-        # Delete the blob when the model instance is deleted
-        if self.image_blob:
-            from .azure_service import azure_blob_service
-            azure_blob_service.delete_image(self.image_blob)
-        super().delete(*args, **kwargs)
+    @property
+    def srcsets(self):
+        """srcset strings per derivative format"""
+        return resolve_srcsets(self.derivatives)
+
+    @property
+    def blob_names(self):
+        """Blobs owned by this row, removed through the deletion outbox"""
+        if not self.image_blob:
+            return []
+        return [self.image_blob] + [derivative['blob'] for derivative in self.derivatives or []]
 
 
 class FlashDesign(models.Model):
@@ -110,6 +143,13 @@ class FlashDesign(models.Model):
     image_blob = models.CharField(max_length=500, help_text="Azure blob name for flash artwork")
     is_available = models.BooleanField(default=True, help_text="Uncheck when this design has been claimed")
     order = models.PositiveIntegerField(default=0, help_text="Lower numbers appear first")
+    derivatives = models.JSONField(default=list, blank=True,
+                                   help_text="Resized/re-encoded copies stored next to the original")
+    # Read at upload time so pages can reserve layout before any image bytes arrive
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    placeholder = models.TextField(blank=True, help_text="Tiny blurred preview as a data URI")
+    dominant_color = models.CharField(max_length=7, blank=True, help_text="Hex colour, e.g. #a83c2e")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -123,16 +163,17 @@ class FlashDesign(models.Model):
 
     @property
     def image_url(self):
-        if self.image_blob:
-            from .azure_service import azure_blob_service
-            return azure_blob_service.get_image_url(self.image_blob)
-        return None
+        return resolve_image_url(self.image_blob)
 
-    def delete(self, *args, **kwargs):
-        if self.image_blob:
-            from .azure_service import azure_blob_service
-            azure_blob_service.delete_image(self.image_blob)
-        super().delete(*args, **kwargs)
+    @property
+    def srcsets(self):
+        return resolve_srcsets(self.derivatives)
+
+    @property
+    def blob_names(self):
+        if not self.image_blob:
+            return []
+        return [self.image_blob] + [derivative['blob'] for derivative in self.derivatives or []]
 
 class Merchandise(models.Model):
     title = models.CharField(max_length=100)
@@ -159,3 +200,37 @@ class CartItem(models.Model):
     merchandise = models.ForeignKey(Merchandise, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
+
+
+class CatalogVersion(models.Model):
+    """Shared version counter used by workers to detect catalog changes"""
+    key = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+
+class BlobDeletion(models.Model):
+    """
+    Outbox row for a blob that should be removed from storage.
+
+    Rows are written in the same transaction as the model change that
+    orphaned the blob and drained in batches by ``drain_blob_deletions``,
+    which claims them for CLAIM_DURATION while it calls storage.
+    """
+    blob_name = models.CharField(max_length=500)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True,
+                                        help_text="Earliest time the next attempt may run")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True,
+                                         help_text="Set while a drain is deleting the blob")
+
+    class Meta:
+        ordering = ['available_at', 'id']
+
+    def __str__(self):
+        return self.blob_name
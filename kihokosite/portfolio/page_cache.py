@@ -0,0 +1,130 @@
+"""
+Full-page cache for the public HTML views
+
+Pages are cached per path, language and the two user bits the templates
+read (signed in, email unverified). Entries remember the catalog version
+they were rendered at, so any catalog write makes them stale without
+touching the cache. A stale entry keeps being served while a single worker,
+holding a short regeneration lock, renders the replacement; both only work
+across workers in a shared cache, so a local-memory PAGE_CACHE_ALIAS is
+rejected.
+"""
+
+import logging
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.utils import translation
+
+from .catalog import get_catalog
+from .context_processors import email_verification_status
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'page'
+
+
+def get_page_cache():
+    alias = getattr(settings, 'PAGE_CACHE_ALIAS', 'default')
+    cache = caches[alias]
+    if isinstance(cache, LocMemCache):
+        raise ImproperlyConfigured(
+            f"PAGE_CACHE_ALIAS '{alias}' is a local-memory cache; every worker would "
+            f"regenerate pages on its own. Point it at a shared cache."
+        )
+    return cache
+
+
+def _cache_path(request) -> str:
+    """The path plus only the query parameters listed in PAGE_CACHE_QUERY_PARAMS"""
+    allowed = getattr(settings, 'PAGE_CACHE_QUERY_PARAMS', ())
+    params = sorted((name, value) for name, value in request.GET.items() if name in allowed)
+    if not params:
+        return request.path
+    return f"{request.path}?{urlencode(params)}"
+
+
+def page_cache_key(request) -> str:
+    user = getattr(request, 'user', None)
+    authenticated = bool(user and user.is_authenticated)
+    unverified = bool(email_verification_status(request).get('email_not_verified'))
+    return ':'.join((
+        KEY_PREFIX,
+        translation.get_language() or settings.LANGUAGE_CODE,
+        'auth' if authenticated else 'anon',
+        'unverified' if unverified else 'verified',
+        _cache_path(request),
+    ))
+
+
+def _store(cache, key, version, response):
+    entry = {
+        'version': version,
+        'expires_at': time.time() + settings.PAGE_CACHE_TIMEOUT,
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'content_language': response.get('Content-Language'),
+    }
+    # Keep stale entries around well past their freshness so they can be
+    # served during regeneration
+    cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT * 10)
+
+
+def _from_entry(entry, state: str) -> HttpResponse:
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    if entry['content_language']:
+        response['Content-Language'] = entry['content_language']
+    response['X-Page-Cache'] = state
+    return response
+
+
+def cache_public_page(view):
+    """
+    Serve ``view`` from the page cache, revalidating against the catalog version.
+
+    Only successful GET/HEAD responses that set no cookies are stored, so
+    session or CSRF state never leaks between visitors.
+    """
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        try:
+            cache = get_page_cache()
+            key = page_cache_key(request)
+            catalog = get_catalog()
+            entry = cache.get(key)
+        except DatabaseError as e:
+            logger.warning(f"Bypassing the page cache: {e}")
+            return view(request, *args, **kwargs)
+
+        # updated_at guards against version numbers repeating after a database reset
+        version = (catalog.version, catalog.updated_at)
+
+        if entry is not None and entry['version'] == version and entry['expires_at'] > time.time():
+            return _from_entry(entry, 'hit')
+
+        lock_key = f"{key}:lock"
+        if entry is not None and not cache.add(lock_key, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+            # Another worker is already rendering the replacement
+            return _from_entry(entry, 'stale')
+
+        try:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies and not getattr(response, 'streaming', False):
+                _store(cache, key, version, response)
+                response['X-Page-Cache'] = 'miss'
+            return response
+        finally:
+            if entry is not None:
+                cache.delete(lock_key)
+
+    return inner
@@ -0,0 +1,163 @@
+"""
+Keyset (cursor) pagination for artwork and project listings
+
+Pages are addressed by the (order, created_at, id) key of their boundary rows
+rather than an offset, so fetching page 500 costs the same as page 1. Cursors
+are opaque base64 tokens; clients just follow ``next``/``previous``.
+"""
+
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Optional, Sequence, Tuple
+
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from .keyset import seek_filter
+
+
+class KeysetPagination:
+    """Paginates querysets or pre-sorted sequences on a composite ordering key"""
+
+    ordering = ('order', 'created_at', 'id')
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.request = None
+        self.next_key = None
+        self.previous_key = None
+
+    # Cursor encoding
+
+    def encode_cursor(self, key: Tuple, reverse: bool = False) -> str:
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+        payload = json.dumps({'k': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request) -> Optional[Tuple[Tuple, bool]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            order, created_at, pk = payload['k']
+            # Hand-made cursors must not reach the comparison with other types
+            if not (_is_int(order) and _is_int(pk) and isinstance(created_at, str)):
+                raise ValueError("cursor values have the wrong types")
+            created_at = datetime.fromisoformat(created_at)
+            if created_at.tzinfo is None:
+                raise ValueError("cursor datetime has no timezone")
+            return (order, created_at, pk), bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_key(self, item) -> Tuple:
+        return tuple(getattr(item, field) for field in self.ordering)
+
+    # Pagination
+
+    def paginate_queryset(self, queryset, request) -> list:
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            rows = list(queryset.order_by(*self.ordering)[:size + 1])
+            return self._finish(rows, size, reverse=False, has_cursor=False)
+
+        key, reverse = cursor
+        ordering = [f'-{field}' for field in self.ordering] if reverse else self.ordering
+        rows = list(queryset.filter(seek_filter(self.ordering, key, reverse)).order_by(*ordering)[:size + 1])
+        return self._finish(rows, size, reverse=reverse, has_cursor=True)
+
+    def paginate_sequence(self, items: Sequence, request, keys: Optional[Sequence[Tuple]] = None) -> list:
+        """
+        Paginate an in-memory sequence already sorted on ``ordering``.
+
+        ``keys`` may be passed precomputed (e.g. memoized on a catalog
+        snapshot) so each page is a binary search plus a slice.
+        """
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if keys is None:
+            keys = [self.get_key(item) for item in items]
+
+        if cursor is None:
+            return self._finish(list(items[:size + 1]), size, reverse=False, has_cursor=False)
+
+        key, reverse = cursor
+        if reverse:
+            end = bisect_left(keys, key)
+            rows = list(reversed(items[max(0, end - size - 1):end]))
+        else:
+            start = bisect_right(keys, key)
+            rows = list(items[start:start + size + 1])
+        return self._finish(rows, size, reverse=reverse, has_cursor=True)
+
+    def _finish(self, rows: list, size: int, reverse: bool, has_cursor: bool) -> list:
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        self.next_key = self.previous_key = None
+        if rows:
+            first, last = self.get_key(rows[0]), self.get_key(rows[-1])
+            if reverse:
+                self.next_key = last
+                self.previous_key = first if has_more else None
+            else:
+                self.next_key = last if has_more else None
+                self.previous_key = first if has_cursor else None
+        return rows
+
+    # Links
+
+    def _build_link(self, key: Optional[Tuple], reverse: bool) -> Optional[str]:
+        if key is None:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(key, reverse=reverse)
+        return self.request.build_absolute_uri(f'{self.request.path}?{params.urlencode()}')
+
+    def get_next_link(self) -> Optional[str]:
+        return self._build_link(self.next_key, reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        return self._build_link(self.previous_key, reverse=True)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+def paginate(paginator: KeysetPagination, request, source,
+             serialize: Callable[[list], object], keys=None) -> Response:
+    """Paginate a queryset or sorted sequence and wrap the serialized page"""
+    if hasattr(source, 'filter'):
+        page = paginator.paginate_queryset(source, request)
+    else:
+        page = paginator.paginate_sequence(source, request, keys=keys)
+    return paginator.get_paginated_response(serialize(page))
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
@@ -0,0 +1,37 @@
+"""
+Random artwork picks for error pages
+
+Error handlers show a random artwork. Picks come from the image tuple of the
+in-process catalog snapshot, so each pick is an index into memory rather
+than a table scan, and the pool refreshes whenever the catalog version moves.
+"""
+
+import logging
+import random
+from typing import Optional
+
+from django.db import DatabaseError
+
+from .catalog import ImageEntry, catalog_store
+
+logger = logging.getLogger(__name__)
+
+
+def random_artwork(use_database: bool = True) -> Optional[ImageEntry]:
+    """
+    Return a random project image, or None if none is available.
+
+    With ``use_database=False`` (the 500 handler, where the database may be
+    what failed) only a snapshot this worker has already built is used.
+    Database errors while refreshing also fall back to that snapshot.
+    """
+    snapshot = catalog_store.peek()
+    if use_database:
+        try:
+            snapshot = catalog_store.get()
+        except DatabaseError as e:
+            logger.warning(f"Falling back to the cached catalog for a random artwork: {e}")
+
+    if snapshot is None or not snapshot.images:
+        return None
+    return snapshot.images[random.randrange(len(snapshot.images))]
@@ -1,20 +1,109 @@
+from decimal import Decimal
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import DecimalField, F, Manager, Model, Prefetch, QuerySet, Sum, Value, prefetch_related_objects
+from django.db.models.functions import Coalesce
+from .image_urls import resolve_image_url, resolve_image_urls
 from .models import Project, ProjectImage, Merchandise, MerchandiseImage, Cart, CartItem
 
 
+class ImageURLField(serializers.Field):
+    """
+    Read-only URL for a blob name attribute.
+
+    Inside an ImageURLListSerializer the value is left for the list to fill in
+    bulk; standalone serializers resolve it directly.
+    """
+
+    def __init__(self, blob_attr, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.blob_attr = blob_attr
+
+    def to_representation(self, instance):
+        if isinstance(getattr(self.parent, 'parent', None), ImageURLListSerializer):
+            return None
+        return resolve_image_url(getattr(instance, self.blob_attr))
+
+
+class ImageURLListSerializer(serializers.ListSerializer):
+    """Resolves the ImageURLFields of every row with one bulk call per field"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        representation = super().to_representation(items)
+        for name, field in self.child.fields.items():
+            if not isinstance(field, ImageURLField):
+                continue
+            urls = resolve_image_urls(getattr(item, field.blob_attr) for item in items)
+            for row, url in zip(representation, urls):
+                row[name] = url
+        return representation
+
+
+class EagerLoadingMixin:
+    """
+    Serializers declare the related rows and annotations they read, and any
+    queryset or instance handed to them is planned before serialization, so
+    list endpoints run in a constant number of queries.
+    """
+    select_related = ()
+    prefetch_related = ()
+
+    @classmethod
+    def get_prefetch_related(cls):
+        return list(cls.prefetch_related)
+
+    @classmethod
+    def get_annotations(cls):
+        return {}
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related:
+            queryset = queryset.select_related(*cls.select_related)
+        prefetches = cls.get_prefetch_related()
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        annotations = cls.get_annotations()
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        if args and isinstance(args[0], QuerySet):
+            args = (cls.setup_eager_loading(args[0]),) + args[1:]
+        elif isinstance(kwargs.get('instance'), QuerySet):
+            kwargs['instance'] = cls.setup_eager_loading(kwargs['instance'])
+        return super().many_init(*args, **kwargs)
+
+    def __init__(self, instance=None, *args, **kwargs):
+        if isinstance(instance, Model):
+            prefetches = self.get_prefetch_related()
+            if prefetches:
+                prefetch_related_objects([instance], *prefetches)
+        super().__init__(instance, *args, **kwargs)
+
+
 class ProjectImageSerializer(serializers.ModelSerializer):
-    image_url = serializers.ReadOnlyField()
+    image_url = ImageURLField('image_blob')
+    srcset = serializers.ReadOnlyField(source='srcsets')
     
     class Meta:
         model = ProjectImage
-        fields = ['id', 'title', 'description', 'image_url', 'order', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'title', 'description', 'image_url', 'srcset', 'width', 'height',
+                  'placeholder', 'dominant_color', 'order', 'created_at']
+        read_only_fields = ['width', 'height', 'placeholder', 'dominant_color', 'created_at']
+        list_serializer_class = ImageURLListSerializer
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     images = ProjectImageSerializer(many=True, read_only=True)
-    featured_image_url = serializers.ReadOnlyField()
+    featured_image_url = ImageURLField('featured_image_blob')
+
+    prefetch_related = ('images',)
 
     class Meta:
         model = Project
@@ -23,11 +112,12 @@ class ProjectSerializer(serializers.ModelSerializer):
 
 class ProjectListSerializer(serializers.ModelSerializer):
     """Simplified serializer for project list view"""
-    featured_image_url = serializers.ReadOnlyField()
+    featured_image_url = ImageURLField('featured_image_blob')
     
     class Meta:
         model = Project
         fields = ['id', 'title', 'featured_image_url', 'slug']
+        list_serializer_class = ImageURLListSerializer
 
 
 class MerchandiseImageSerializer(serializers.ModelSerializer):
@@ -44,9 +134,11 @@ class MerchandiseImageSerializer(serializers.ModelSerializer):
         return representation
 
 
-class MerchandiseSerializer(serializers.ModelSerializer):
+class MerchandiseSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     images = MerchandiseImageSerializer(source='merchandiseimage_set', many=True, read_only=True)
 
+    prefetch_related = ('merchandiseimage_set',)
+
     class Meta:
         model = Merchandise
         fields = ['id', 'title', 'description', 'price', 'stock', 'images']
@@ -97,16 +189,19 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     merchandise = MerchandiseSerializer(read_only=True)
     merchandise_id = serializers.IntegerField(write_only=True)
 
+    select_related = ('merchandise',)
+    prefetch_related = ('merchandise__merchandiseimage_set',)
+
     class Meta:
         model = CartItem
         fields = ['id', 'merchandise', 'merchandise_id', 'quantity', 'created_at']
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     items = CartItemSerializer(source='cartitem_set', many=True, read_only=True)
     total_items = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
@@ -115,8 +210,32 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ['id', 'user', 'created_at', 'items', 'total_items', 'total_price']
 
+    @classmethod
+    def get_prefetch_related(cls):
+        items = CartItemSerializer.setup_eager_loading(CartItem.objects.all())
+        return [Prefetch('cartitem_set', queryset=items)]
+
+    @classmethod
+    def get_annotations(cls):
+        return {
+            'cart_total_items': Coalesce(Sum('cartitem__quantity'), 0),
+            'cart_total_price': Coalesce(
+                Sum(F('cartitem__quantity') * F('cartitem__merchandise__price'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        }
+
+    def _get_totals(self, obj):
+        if not hasattr(obj, 'cart_total_items'):
+            totals = Cart.objects.filter(pk=obj.pk).aggregate(**self.get_annotations())
+            obj.cart_total_items = totals['cart_total_items']
+            obj.cart_total_price = totals['cart_total_price']
+        return obj.cart_total_items, obj.cart_total_price
+
     def get_total_items(self, obj):
-        return sum(item.quantity for item in obj.cartitem_set.all())
+        return self._get_totals(obj)[0]
 
     def get_total_price(self, obj):
-        return sum(item.merchandise.price * item.quantity for item in obj.cartitem_set.all()) 
\ No newline at end of file
+        return self._get_totals(obj)[1]
@@ -0,0 +1,286 @@
+"""
+Static JSON snapshots of the catalog APIs
+
+Renders the api/v2 project list, every project detail and the full artwork
+list from the catalog snapshot into content-hashed JSON files, each with
+gzip (and brotli, when installed) siblings, plus a small ``manifest.json``
+mapping logical names to the current files. Clients read the manifest from
+the CDN and fetch the hashed files, which can be cached forever.
+
+Files are written before the manifest, so a client never sees a manifest
+pointing at something missing. Files dropped from the manifest are kept for
+one more publish before being deleted, so in-flight readers of the previous
+manifest still find them.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .catalog import CatalogSnapshot, get_catalog
+from .models import FlashDesign, Project, ProjectImage
+from .serializers import ProjectImageSerializer, ProjectListSerializer, ProjectSerializer
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are written without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MANIFEST_CACHE_CONTROL = 'public, max-age=30, must-revalidate'
+JSON_CONTENT_TYPE = 'application/json'
+
+
+class DirectoryTarget:
+    """Publishes into a local directory, e.g. one synced to a CDN origin"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, *name.split('/'))
+
+    def read(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name: str, data: bytes, content_encoding: Optional[str] = None,
+              cache_control: str = IMMUTABLE_CACHE_CONTROL):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, names: Iterable[str]):
+        for name in names:
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+
+class BlobContainerTarget:
+    """
+    Publishes into a blob container served directly or through the CDN.
+    The container is created, with public blob access, on the first write.
+    """
+
+    def __init__(self, container_client):
+        self.container_client = container_client
+        self._container_ready = False
+
+    def _ensure_container_exists(self):
+        from azure.core.exceptions import ResourceExistsError
+
+        if self._container_ready:
+            return
+        if not self.container_client.exists():
+            try:
+                self.container_client.create_container(public_access='blob')
+                logger.info(f"Created container: {self.container_client.container_name}")
+            except ResourceExistsError:
+                pass  # created by a concurrent publish
+        self._container_ready = True
+
+    def read(self, name: str) -> Optional[bytes]:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            return self.container_client.download_blob(name).readall()
+        except ResourceNotFoundError:
+            return None
+
+    def write(self, name: str, data: bytes, content_encoding: Optional[str] = None,
+              cache_control: str = IMMUTABLE_CACHE_CONTROL):
+        from azure.storage.blob import ContentSettings
+
+        self._ensure_container_exists()
+        self.container_client.upload_blob(
+            name, data, overwrite=True,
+            content_settings=ContentSettings(
+                content_type=JSON_CONTENT_TYPE,
+                content_encoding=content_encoding,
+                cache_control=cache_control,
+            ),
+        )
+
+    def delete(self, names: Iterable[str]):
+        names = list(names)
+        for start in range(0, len(names), 256):
+            self.container_client.delete_blobs(*names[start:start + 256], raise_on_any_failure=False)
+
+
+def get_default_target():
+    """Target configured in settings, or None if publishing is not configured"""
+    if settings.PORTFOLIO_SNAPSHOT_DIR:
+        return DirectoryTarget(settings.PORTFOLIO_SNAPSHOT_DIR)
+
+    from .azure_service import azure_blob_service
+
+    if azure_blob_service.client is None:
+        return None
+    return BlobContainerTarget(
+        azure_blob_service.client.get_container_client(settings.PORTFOLIO_SNAPSHOT_CONTAINER)
+    )
+
+
+def render_payloads(catalog: CatalogSnapshot) -> Dict[str, object]:
+    """Logical name -> response body, matching the live api/v2 endpoints"""
+    payloads = {
+        'projects': catalog.memoize(
+            'project_list',
+            lambda: ProjectListSerializer(catalog.projects, many=True).data,
+        ),
+        # Same envelope as the paginated endpoint, as one complete page
+        'artworks': {
+            'next': None,
+            'previous': None,
+            'results': ProjectImageSerializer(catalog.images, many=True).data,
+        },
+    }
+    for project in catalog.projects:
+        payloads[f'projects/{project.slug}'] = ProjectSerializer(project).data
+    return payloads
+
+
+ENCODING_SUFFIXES = {'gzip': 'gz', 'br': 'br'}
+
+
+def available_encodings() -> Dict[str, str]:
+    """Content-Encoding -> file suffix for the siblings this install can write"""
+    if brotli is None:
+        return {'gzip': ENCODING_SUFFIXES['gzip']}
+    return dict(ENCODING_SUFFIXES)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=11)
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def publish_snapshot(target, catalog: Optional[CatalogSnapshot] = None) -> Dict:
+    """
+    Render the catalog into ``target`` and return the new manifest.
+
+    Unchanged payloads keep their hashed names and are not rewritten.
+    """
+    catalog = catalog or get_catalog()
+    renderer = JSONRenderer()
+
+    previous = json.loads(target.read(MANIFEST_NAME) or b'{}')
+    previous_paths = {
+        path
+        for entry in previous.get('files', {}).values()
+        for path in [entry['path'], *entry['encodings'].values()]
+    }
+
+    encodings = available_encodings()
+    files = {}
+    written = 0
+    for name, data in render_payloads(catalog).items():
+        body = renderer.render(data)
+        digest = hashlib.sha256(body).hexdigest()
+        path = f"{name}.{digest[:16]}.json"
+        entry = {
+            'path': path,
+            'sha256': digest,
+            'bytes': len(body),
+            'encodings': {encoding: f"{path}.{suffix}" for encoding, suffix in encodings.items()},
+        }
+
+        if not {path, *entry['encodings'].values()} <= previous_paths:
+            target.write(path, body)
+            for encoding, encoded_path in entry['encodings'].items():
+                target.write(encoded_path, compress(body, encoding), content_encoding=encoding)
+            written += 1
+        files[name] = entry
+
+    current_paths = {
+        path
+        for entry in files.values()
+        for path in [entry['path'], *entry['encodings'].values()]
+    }
+    manifest = {
+        'version': catalog.version,
+        'generated_at': timezone.now().isoformat(),
+        'urls_valid_until': catalog.urls_valid_until.isoformat() if catalog.urls_valid_until else None,
+        'files': files,
+        'retired': sorted(previous_paths - current_paths),
+    }
+    target.write(
+        MANIFEST_NAME,
+        json.dumps(manifest, separators=(',', ':')).encode(),
+        cache_control=MANIFEST_CACHE_CONTROL,
+    )
+
+    # Retired by the previous publish and still unused: nobody can be
+    # following a manifest that mentions them any more
+    stale = set(previous.get('retired', [])) - current_paths
+    if stale:
+        target.delete(sorted(stale))
+
+    logger.info(f"Published catalog v{catalog.version} snapshot: {written} of {len(files)} files changed")
+    return manifest
+
+
+_publish_timer: Optional[threading.Timer] = None
+_publish_lock = threading.Lock()
+
+
+def _publish_in_background():
+    try:
+        target = get_default_target()
+        if target is not None:
+            publish_snapshot(target)
+    except Exception as e:
+        logger.error(f"Failed to publish catalog snapshot: {e}")
+    finally:
+        close_old_connections()
+
+
+def schedule_publish():
+    """
+    Publish after ``PORTFOLIO_SNAPSHOT_PUBLISH_DELAY`` seconds of quiet.
+
+    A bulk edit fires many change signals; restarting the timer on each one
+    coalesces them into a single publish.
+    """
+    global _publish_timer
+    with _publish_lock:
+        if _publish_timer is not None:
+            _publish_timer.cancel()
+        _publish_timer = threading.Timer(settings.PORTFOLIO_SNAPSHOT_PUBLISH_DELAY, _publish_in_background)
+        _publish_timer.daemon = True
+        _publish_timer.start()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectImage)
+@receiver(post_save, sender=FlashDesign)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=ProjectImage)
+@receiver(post_delete, sender=FlashDesign)
+def publish_on_change(sender, **kwargs):
+    if settings.PORTFOLIO_SNAPSHOT_PUBLISH_ON_CHANGE:
+        transaction.on_commit(schedule_publish)
@@ -0,0 +1,45 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio.catalog import catalog_store
+from portfolio.models import Project, ProjectImage
+
+
+class ArtNeighborTests(TestCase):
+    def setUp(self):
+        catalog_store.reset()
+        project = Project.objects.create(title="Ink", description="", slug="ink")
+        other = Project.objects.create(title="Koi", description="", slug="koi")
+        # Shared order values exercise the created_at/id tiebreakers
+        self.images = [
+            ProjectImage.objects.create(project=project, image_blob=f"projects/ink/{i}.jpg", order=i // 2)
+            for i in range(5)
+        ]
+        ProjectImage.objects.create(project=other, image_blob="projects/koi/a.jpg")
+
+    def test_neighbors_follow_display_order_and_wrap_around(self):
+        ids = [image.id for image in self.images]
+        for index, image in enumerate(self.images):
+            with self.subTest(index=index):
+                self.assertEqual(
+                    image.get_neighbor_ids(),
+                    (ids[index - 1], ids[(index + 1) % len(ids)]),
+                )
+
+    def test_middle_image_costs_two_seek_queries(self):
+        with self.assertNumQueries(2):
+            self.images[2].get_neighbor_ids()
+
+    def test_views_expose_neighbors(self):
+        first, second = self.images[0], self.images[1]
+
+        response = self.client.get(reverse('art_detail', args=[first.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('art_detail', args=[second.id]))
+        self.assertContains(response, reverse('art_detail', args=[self.images[-1].id]))
+
+        data = self.client.get(reverse('api_artwork_detail', args=[first.id])).json()
+        self.assertEqual((data['previous_id'], data['next_id']), (self.images[-1].id, second.id))
+
+    def test_missing_image_is_a_404(self):
+        self.assertEqual(self.client.get(reverse('art_detail', args=[999])).status_code, 404)
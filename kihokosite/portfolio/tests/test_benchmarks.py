@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from portfolio.benchmarks import DatasetSize, default_endpoints, percentile, run_benchmarks, seed_catalog
+from portfolio.catalog import catalog_store
+from portfolio.models import Cart, FlashDesign, Merchandise, Project, ProjectImage
+
+
+class BenchmarkTests(TestCase):
+    size = DatasetSize(projects=3, images=40, flash=5, merchandise=4, carts=3)
+
+    def setUp(self):
+        catalog_store.reset()
+
+    def seeded_images(self):
+        return list(ProjectImage.objects.order_by('pk').values_list('project__slug', 'image_blob', 'width'))
+
+    def test_seeding_is_deterministic_and_sized(self):
+        counts = seed_catalog(self.size, seed=7)
+        first = self.seeded_images()
+
+        for model in (Cart, Merchandise, FlashDesign, Project):
+            model.objects.all().delete()
+        seed_catalog(self.size, seed=7)
+
+        self.assertEqual(self.seeded_images(), first)
+        self.assertEqual(
+            {name: counts[name] for name in ('projects', 'images', 'flash', 'merchandise', 'carts')},
+            {'projects': 3, 'images': 40, 'flash': 5, 'merchandise': 4, 'carts': 3},
+        )
+        self.assertGreaterEqual(counts['cart_items'], 3)
+        self.assertTrue(all(len(row[1]) > 0 and row[2] for row in first))
+
+    def test_every_endpoint_reports_latency_queries_bytes_and_memory(self):
+        seed_catalog(self.size)
+
+        results = run_benchmarks(default_endpoints(), iterations=3)
+
+        for name, result in results.items():
+            with self.subTest(name):
+                self.assertEqual(result['status'], 200)
+                self.assertEqual(result['samples'], 3)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['bytes'], 0)
+                self.assertGreater(result['peak_memory_kib'], 0)
+        self.assertGreater(results['api_merchandise']['queries'], 0)
+        # The cold request builds the catalog snapshot; warm ones reuse it
+        projects = results['api_v2_projects']
+        self.assertGreater(projects['first_queries'], projects['queries'])
+
+    def test_error_responses_are_reported_and_fail_the_command(self):
+        seed_catalog(self.size)
+        endpoints = {'api_v2_projects': '/api/v2/projects/', 'missing': '/project/missing/'}
+        results = run_benchmarks(endpoints, iterations=1)
+        self.assertEqual(results['missing']['status'], 404)
+
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        path = os.path.join(output.name, 'results.json')
+        command = 'portfolio.management.commands.benchmark_catalog'
+        with mock.patch(f'{command}.seed_catalog', return_value={}), \
+                mock.patch(f'{command}.default_endpoints', return_value=endpoints), \
+                mock.patch(f'{command}.run_benchmarks', return_value=results), \
+                mock.patch(f'{command}.setup_test_environment'), \
+                mock.patch(f'{command}.teardown_test_environment'), \
+                mock.patch.object(connection.creation, 'create_test_db'), \
+                mock.patch.object(connection.creation, 'destroy_test_db'):
+            with self.assertRaisesMessage(CommandError, "missing (/project/missing/) returned HTTP 404"):
+                call_command('benchmark_catalog', output=path, stdout=StringIO())
+
+        # The results are still written for inspection
+        with open(path) as f:
+            self.assertEqual(json.load(f)['endpoints']['missing']['status'], 404)
+
+    def test_percentile_uses_nearest_rank(self):
+        samples = list(range(100, 0, -1))
+
+        self.assertEqual([percentile(samples, p) for p in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(percentile([3.0], 99), 3.0)
@@ -0,0 +1,117 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from portfolio.azure_service import AzureBlobService
+from portfolio.blob_backends import AzureBlobBackend, InMemoryBlobBackend, LocalBlobBackend, get_backend_class
+from portfolio.blob_views import serve_blob
+from portfolio.image_urls import resolve_image_url
+
+
+class BackendContract:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.backend = self.make_backend()
+
+    def listing(self, **kwargs):
+        return [([blob.name for blob in blobs], token) for blobs, token in self.backend.list_pages(**kwargs)]
+
+    def test_upload_download_and_delete(self):
+        self.backend.upload('projects/ink/a.jpg', b'jpeg', 'image/jpeg', 'public')
+        self.backend.upload_stream('projects/ink/b.jpg', io.BytesIO(b'stream'), 'image/jpeg', 'public')
+
+        self.assertTrue(self.backend.exists('projects/ink/a.jpg'))
+        self.assertEqual(self.backend.download('projects/ink/b.jpg'), b'stream')
+        self.assertEqual(self.backend.open('projects/ink/a.jpg').read(), b'jpeg')
+
+        self.backend.delete('projects/ink/a.jpg')
+        self.backend.delete('projects/ink/missing.jpg')
+        self.assertFalse(self.backend.exists('projects/ink/a.jpg'))
+        with self.assertRaises(FileNotFoundError):
+            self.backend.download('projects/ink/a.jpg')
+
+    def test_batch_delete_counts_missing_blobs_as_deleted(self):
+        self.backend.upload('a.jpg', b'a', 'image/jpeg', 'public')
+
+        self.assertEqual(self.backend.delete_many(['a.jpg', 'gone.jpg']), {'a.jpg': None, 'gone.jpg': None})
+
+    def test_listing_pages_resume_from_continuation_tokens(self):
+        for name in ['flash/koi.png', 'projects/ink/a.jpg', 'projects/ink/b.jpg', 'projects/ink/c.jpg',
+                     'projects/oak/a.jpg']:
+            self.backend.upload(name, b'1234', 'image/jpeg', 'public')
+
+        pages = self.listing(prefix='projects/ink/', page_size=2)
+        self.assertEqual(pages, [
+            (['projects/ink/a.jpg', 'projects/ink/b.jpg'], 'projects/ink/b.jpg'),
+            (['projects/ink/c.jpg'], None),
+        ])
+        self.assertEqual(self.listing(prefix='projects/', continuation_token='projects/ink/c.jpg'),
+                         [(['projects/oak/a.jpg'], None)])
+        blob = next(self.backend.list_pages(prefix='flash/'))[0][0]
+        self.assertEqual((blob.size, blob.last_modified.tzinfo is not None), (4, True))
+
+
+class LocalBackendTests(BackendContract, SimpleTestCase):
+    def make_backend(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        return LocalBlobBackend(root.name)
+
+    def test_names_cannot_escape_the_root(self):
+        with self.assertRaises(SuspiciousFileOperation):
+            self.backend.download('../etc/passwd')
+
+
+class InMemoryBackendTests(BackendContract, SimpleTestCase):
+    def make_backend(self):
+        return InMemoryBlobBackend()
+
+    def test_deletes_during_a_listing_do_not_break_it(self):
+        for name in ('a.jpg', 'b.jpg', 'c.jpg'):
+            self.backend.upload(name, b'1', 'image/jpeg', 'public')
+        pages = self.backend.list_pages(page_size=1)
+
+        first, _ = next(pages)
+        self.backend.delete('c.jpg')
+
+        self.assertEqual([blob.name for blob in first] + [blob.name for blobs, _ in pages for blob in blobs],
+                         ['a.jpg', 'b.jpg', 'c.jpg'])
+
+
+@override_settings(PORTFOLIO_BLOB_BACKEND='memory', PORTFOLIO_BLOB_URL='/blobs/')
+class OfflinePipelineTests(SimpleTestCase):
+    def test_service_uploads_lists_and_serves_without_azure(self):
+        service = AzureBlobService()
+
+        blob_name = service.upload_image(io.BytesIO(b'png bytes'), 'scan.png', project_slug='ink')
+
+        self.assertEqual([blob['blob_name'] for blob in service.list_project_images('ink')], [blob_name])
+        self.assertEqual(resolve_image_url(blob_name), f'/blobs/{blob_name}')
+
+        request = RequestFactory().get(f'/blobs/{blob_name}')
+        with mock.patch('portfolio.blob_views.azure_blob_service', service):
+            response = serve_blob(request, blob_name)
+            with self.assertRaises(Http404):
+                serve_blob(request, 'projects/ink/missing.png')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(response.streaming_content), b'png bytes')
+
+
+class BackendURLTests(SimpleTestCase):
+    @override_settings(PORTFOLIO_BLOB_URL='/blobs/', AZURE_ACCOUNT_NAME='kihoko', PORTFOLIO_IMAGE_HOST=None)
+    def test_each_backend_knows_where_its_blobs_are_served(self):
+        self.assertEqual(LocalBlobBackend.base_url('portfolio-images'), '/blobs/')
+        self.assertEqual(InMemoryBlobBackend.base_url('portfolio-images'), '/blobs/')
+        self.assertEqual(AzureBlobBackend.base_url('portfolio-images'),
+                         'https://kihoko.blob.core.windows.net/portfolio-images/')
+
+    def test_unknown_backend_is_a_configuration_error(self):
+        self.assertIs(get_backend_class('memory'), InMemoryBlobBackend)
+        with self.assertRaises(ImproperlyConfigured):
+            get_backend_class('s3')
@@ -0,0 +1,200 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from portfolio.azure_service import AzureBlobService
+from portfolio.blob_outbox import drain_blob_deletions
+from portfolio.models import BlobDeletion, FlashDesign, Project, ProjectImage
+from portfolio.tests.test_image_pipeline import make_jpeg
+
+
+class FakeBlobService:
+    def __init__(self, failing=(), during_delete=None):
+        self.failing = set(failing)
+        self.during_delete = during_delete
+        self.batches = []
+
+    def delete_images(self, blob_names):
+        self.batches.append(list(blob_names))
+        if self.during_delete:
+            self.during_delete()
+        return {name: ("HTTP 500" if name in self.failing else None) for name in blob_names}
+
+
+class BlobOutboxTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(
+            title="Ink", description="", slug="ink", featured_image_blob="projects/ink/cover.jpg"
+        )
+        ProjectImage.objects.create(
+            project=self.project,
+            image_blob="projects/ink/a.jpg",
+            derivatives=[{'blob': 'projects/ink/a.w320.webp', 'width': 320, 'height': 200, 'format': 'webp'}],
+        )
+
+    def queued(self):
+        return sorted(BlobDeletion.objects.values_list('blob_name', flat=True))
+
+    def test_cascade_delete_queues_every_owned_blob(self):
+        self.project.delete()
+
+        self.assertEqual(self.queued(), [
+            "projects/ink/a.jpg", "projects/ink/a.w320.webp", "projects/ink/cover.jpg",
+        ])
+
+    def test_queryset_delete_queues_blobs(self):
+        FlashDesign.objects.create(title="Koi", image_blob="flash/koi.jpg")
+
+        FlashDesign.objects.all().delete()
+
+        self.assertEqual(self.queued(), ["flash/koi.jpg"])
+
+    def test_drain_deletes_in_one_batch_and_reschedules_failures(self):
+        self.project.delete()
+        service = FakeBlobService(failing={"projects/ink/cover.jpg"})
+
+        result = drain_blob_deletions(service)
+
+        self.assertEqual(result, {'deleted': 2, 'kept': 0, 'failed': 1})
+        self.assertEqual(len(service.batches), 1)
+        failed = BlobDeletion.objects.get()
+        self.assertEqual(failed.attempts, 1)
+        self.assertGreater(failed.available_at, timezone.now())
+
+        # Not due yet, so a second pass leaves it alone
+        self.assertEqual(drain_blob_deletions(service), {'deleted': 0, 'kept': 0, 'failed': 0})
+
+    def test_drain_keeps_blobs_shared_with_another_row(self):
+        shared = ProjectImage.objects.values('image_blob', 'derivatives').get()
+        FlashDesign.objects.create(title="Ink", **shared)
+        self.project.delete()
+        service = FakeBlobService()
+
+        result = drain_blob_deletions(service)
+
+        self.assertEqual(result, {'deleted': 1, 'kept': 2, 'failed': 0})
+        self.assertEqual(service.batches, [["projects/ink/cover.jpg"]])
+        self.assertEqual(self.queued(), [])
+
+    def test_rows_are_leased_rather_than_locked_while_storage_is_called(self):
+        self.project.delete()
+        seen = []
+
+        def check_claims():
+            # Another drain would find nothing due
+            seen.extend(BlobDeletion.objects.values_list('claimed_until', 'available_at'))
+            self.assertFalse(BlobDeletion.objects.filter(available_at__lte=timezone.now()).exists())
+
+        result = drain_blob_deletions(FakeBlobService(failing={"projects/ink/cover.jpg"},
+                                                      during_delete=check_claims))
+
+        self.assertEqual(result, {'deleted': 2, 'kept': 0, 'failed': 1})
+        self.assertEqual(len(seen), 3)
+        self.assertTrue(all(claimed == available for claimed, available in seen))
+        self.assertIsNone(BlobDeletion.objects.get().claimed_until)
+
+    def test_rows_reclaimed_after_the_lease_expired_belong_to_the_new_drain(self):
+        self.project.delete()
+
+        def lease_expires_and_another_drain_claims():
+            later = timezone.now() + timedelta(hours=1)
+            BlobDeletion.objects.update(claimed_until=later, available_at=later)
+
+        drain_blob_deletions(FakeBlobService(failing={"projects/ink/cover.jpg"},
+                                             during_delete=lease_expires_and_another_drain_claims))
+
+        self.assertEqual(len(self.queued()), 3)
+        self.assertFalse(BlobDeletion.objects.filter(attempts__gt=0).exists())
+
+
+@override_settings(PORTFOLIO_BLOB_BACKEND='memory', PORTFOLIO_DERIVATIVE_WIDTHS=(320,))
+class ReuploadTests(TestCase):
+    """Re-uploading deleted bytes reuses their content-addressed blob"""
+
+    def setUp(self):
+        self.service = AzureBlobService()
+        patcher = mock.patch('portfolio.upload_api_views.azure_blob_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.project = Project.objects.create(title="Ink", description="", slug="ink")
+        self.client = APIClient()
+        self.client.force_authenticate(User(username='staff'))
+        self.jpeg = make_jpeg(800, 600)
+
+    def upload(self):
+        response = self.client.post(
+            f'/api/v2/project/{self.project.slug}/upload-image/',
+            {'image': SimpleUploadedFile('koi.jpg', self.jpeg, content_type='image/jpeg')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+        return ProjectImage.objects.get(pk=response.data['id'])
+
+    def stored(self, image):
+        return self.service.missing_blobs(image.blob_names) == []
+
+    def test_reupload_withdraws_the_queued_deletion(self):
+        first = self.upload()
+        first.delete()
+        self.assertTrue(BlobDeletion.objects.exists())
+
+        second = self.upload()
+
+        self.assertEqual(second.image_blob, first.image_blob)
+        self.assertFalse(BlobDeletion.objects.exists())
+        self.assertEqual(drain_blob_deletions(self.service), {'deleted': 0, 'kept': 0, 'failed': 0})
+        self.assertTrue(self.stored(second))
+
+    def test_blobs_drained_while_the_upload_reused_them_are_restored(self):
+        self.upload().delete()
+        upload_image = self.service.upload_image
+
+        def upload_then_drain(*args, **kwargs):
+            # The blob exists, so the upload is skipped; then a drain runs
+            # before the new row commits
+            blob_name = upload_image(*args, **kwargs)
+            drain_blob_deletions(self.service)
+            return blob_name
+
+        with mock.patch.object(self.service, 'upload_image', side_effect=upload_then_drain):
+            image = self.upload()
+
+        image.refresh_from_db()
+        self.assertTrue(image.derivatives)
+        self.assertTrue(self.stored(image))
+
+    def test_failed_restore_does_not_fail_the_committed_upload(self):
+        with mock.patch.object(self.service, 'missing_blobs', side_effect=OSError("storage down")):
+            with self.assertLogs('portfolio.upload_api_views', 'ERROR'):
+                image = self.upload()
+
+        self.assertEqual(ProjectImage.objects.get().pk, image.pk)
+
+    def test_upload_reusing_a_blob_a_drain_is_deleting_is_retried(self):
+        self.upload().delete()
+        responses = []
+        delete_images = self.service.delete_images
+
+        def upload_then_delete(blob_names):
+            responses.append(self.client.post(
+                f'/api/v2/project/{self.project.slug}/upload-image/',
+                {'image': SimpleUploadedFile('koi.jpg', self.jpeg, content_type='image/jpeg')},
+                format='multipart',
+            ))
+            return delete_images(blob_names)
+
+        with mock.patch.object(self.service, 'delete_images', side_effect=upload_then_delete):
+            drain_blob_deletions(self.service)
+
+        self.assertEqual(responses[0].status_code, 503)
+        self.assertEqual(responses[0]['Retry-After'], '5')
+        self.assertFalse(ProjectImage.objects.exists())
+        self.assertFalse(BlobDeletion.objects.exists())
+
+        image = self.upload()
+        self.assertTrue(self.stored(image))
@@ -0,0 +1,90 @@
+import hashlib
+import io
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from portfolio.azure_service import AzureBlobService
+
+
+class FakeBlobClient:
+    def __init__(self, failures=0):
+        self.staged = {}
+        self.committed = None
+        self.failures = failures
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def stage_block(self, block_id, data, length):
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("transient")
+            self.staged[block_id] = bytes(data)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def commit_block_list(self, blocks, content_settings):
+        self.committed = b''.join(self.staged[block.id] for block in blocks)
+
+    def exists(self):
+        return self.committed is not None
+
+
+class FakeServiceClient:
+    def __init__(self, blob_client):
+        self.blob_client = blob_client
+
+    def get_blob_client(self, container, blob):
+        return self.blob_client
+
+
+@override_settings(AZURE_UPLOAD_BLOCK_SIZE=1024, AZURE_UPLOAD_CONCURRENCY=3)
+class StreamingUploadTests(SimpleTestCase):
+    def setUp(self):
+        self.blob_client = FakeBlobClient()
+        self.service = AzureBlobService()
+        self.service.client = FakeServiceClient(self.blob_client)
+
+    def test_file_like_uploads_are_staged_in_blocks_and_committed_in_order(self):
+        payload = bytes(range(256)) * 41  # 10,496 bytes -> 11 blocks
+
+        blob_name = self.service.upload_image(io.BytesIO(payload), 'scan.png', project_slug='ink')
+
+        self.assertEqual(blob_name, f"projects/ink/{hashlib.sha256(payload).hexdigest()}.png")
+        self.assertEqual(len(self.blob_client.staged), 11)
+        self.assertEqual(self.blob_client.committed, payload)
+        self.assertLessEqual(self.blob_client.peak_in_flight, 3)
+
+    def test_repeat_upload_of_the_same_bytes_is_skipped(self):
+        first = self.service.upload_image(io.BytesIO(b'x' * 2048), 'scan.png')
+        self.blob_client.staged.clear()
+
+        second = self.service.upload_image(io.BytesIO(b'x' * 2048), 'copy.png')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.blob_client.staged, {})
+
+    def test_failed_blocks_are_retried(self):
+        self.blob_client.failures = 2
+
+        with mock.patch('portfolio.blob_backends.time.sleep'):
+            blob_name = self.service.upload_image(io.BytesIO(b'x' * 2048), 'scan.png')
+
+        self.assertIsNotNone(blob_name)
+        self.assertEqual(self.blob_client.committed, b'x' * 2048)
+
+    def test_exhausted_retries_fail_the_upload_without_committing(self):
+        self.blob_client.failures = 10
+
+        with mock.patch('portfolio.blob_backends.time.sleep'):
+            blob_name = self.service.upload_image(io.BytesIO(b'x' * 512), 'scan.png')
+
+        self.assertIsNone(blob_name)
+        self.assertIsNone(self.blob_client.committed)
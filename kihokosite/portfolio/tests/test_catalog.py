@@ -0,0 +1,63 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from portfolio.catalog import catalog_store, get_catalog
+from portfolio.models import CatalogVersion, FlashDesign, Project, ProjectImage
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        catalog_store.reset()
+        self.project = Project.objects.create(
+            title="Botanicals",
+            description="Floral work",
+            slug="botanicals",
+            featured_image_blob="projects/botanicals/cover.jpg",
+        )
+        self.second = ProjectImage.objects.create(
+            project=self.project, image_blob="projects/botanicals/b.jpg", title="Fern", order=2
+        )
+        self.first = ProjectImage.objects.create(
+            project=self.project, image_blob="projects/botanicals/a.jpg", title="Iris", order=1
+        )
+
+    def test_snapshot_groups_images_in_display_order(self):
+        catalog = get_catalog()
+
+        project = catalog.get_project("botanicals")
+        self.assertEqual([image.id for image in project.images], [self.first.id, self.second.id])
+        self.assertTrue(project.featured_image_url.endswith("projects/botanicals/cover.jpg"))
+
+    def test_reads_are_served_without_queries_once_built(self):
+        get_catalog()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('project_detail', kwargs={'slug': 'botanicals'}))
+        self.assertEqual(response.status_code, 200)
+        # Only the shared page cache is read and written; the catalog is not queried
+        self.assertTrue(all('portfolio_page_cache' in query['sql'] or 'SAVEPOINT' in query['sql']
+                            for query in queries))
+
+    def test_model_changes_bump_version_and_rebuild(self):
+        version = get_catalog().version
+
+        FlashDesign.objects.create(title="Crane", image_blob="flash/crane.jpg")
+
+        catalog = get_catalog()
+        self.assertGreater(catalog.version, version)
+        self.assertEqual(CatalogVersion.objects.get(key='catalog').version, catalog.version)
+        self.assertEqual([design.title for design in catalog.flash_designs], ["Crane"])
+
+    def test_deleting_a_project_removes_it_from_the_snapshot(self):
+        get_catalog()
+
+        self.project.delete()
+
+        self.assertIsNone(get_catalog().get_project("botanicals"))
+
+    def test_unknown_project_returns_404(self):
+        response = self.client.get(reverse('project_detail', kwargs={'slug': 'missing'}))
+
+        self.assertEqual(response.status_code, 404)
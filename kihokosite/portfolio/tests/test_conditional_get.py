@@ -0,0 +1,76 @@
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portfolio.catalog import CATALOG_KEY, catalog_store
+from portfolio.models import CatalogVersion, Merchandise, Project
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        catalog_store.reset()
+        Project.objects.create(title="Ink", description="", slug="ink")
+        Merchandise.objects.create(title="Print", description="", price="20.00")
+
+    def urls(self):
+        return [
+            reverse('api_v2_projects_list'),
+            reverse('api_v2_project_detail', args=['ink']),
+            reverse('api_merchandise_list'),
+        ]
+
+    def test_matching_etag_short_circuits_without_serializing(self):
+        for url in self.urls():
+            with self.subTest(url):
+                first = self.client.get(url, HTTP_ACCEPT='application/json')
+                self.assertEqual(first.status_code, 200)
+                self.assertTrue(first['ETag'].startswith('"'))
+                self.assertIn('Last-Modified', first)
+
+                with self.assertNumQueries(1):
+                    second = self.client.get(url, HTTP_ACCEPT='application/json',
+                                             HTTP_IF_NONE_MATCH=first['ETag'])
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second['ETag'], first['ETag'])
+
+                second = self.client.get(url, HTTP_ACCEPT='application/json',
+                                         HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+                self.assertEqual(second.status_code, 304)
+
+    def test_etag_changes_when_the_watched_data_changes(self):
+        projects_url, _, merchandise_url = self.urls()
+        projects_etag = self.client.get(projects_url)['ETag']
+        merchandise_etag = self.client.get(merchandise_url)['ETag']
+
+        Merchandise.objects.create(title="Tote", description="", price="15.00")
+
+        self.assertEqual(self.client.get(projects_url, HTTP_IF_NONE_MATCH=projects_etag).status_code, 304)
+        response = self.client.get(merchandise_url, HTTP_IF_NONE_MATCH=merchandise_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+        Project.objects.create(title="Koi", description="", slug="koi")
+        self.assertEqual(self.client.get(projects_url, HTTP_IF_NONE_MATCH=projects_etag).status_code, 200)
+
+    def test_representations_get_distinct_etags(self):
+        url = reverse('api_v2_projects_list')
+
+        json_etag = self.client.get(url, HTTP_ACCEPT='application/json')['ETag']
+        html_etag = self.client.get(url, HTTP_ACCEPT='text/html')['ETag']
+
+        self.assertNotEqual(json_etag, html_etag)
+
+    @override_settings(CATALOG_VERSION_CHECK_INTERVAL=3600)
+    def test_body_is_never_older_than_an_etag_bumped_by_another_worker(self):
+        url = reverse('api_v2_projects_list')
+        self.client.get(url)
+
+        # Another worker adds a project: no signal reaches this worker's store
+        Project.objects.bulk_create([Project(title="Koi", description="", slug="koi")])
+        CatalogVersion.objects.filter(key=CATALOG_KEY).update(version=F('version') + 1)
+        response = self.client.get(url)
+
+        version = CatalogVersion.objects.get(key=CATALOG_KEY).version
+        self.assertIn(f'"{CATALOG_KEY}-{version}-', response['ETag'])
+        self.assertEqual({project['slug'] for project in response.json()}, {'ink', 'koi'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
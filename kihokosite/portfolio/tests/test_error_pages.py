@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import OperationalError
+from django.test import RequestFactory, TestCase
+
+from portfolio import views
+from portfolio.catalog import catalog_store
+from portfolio.models import Project, ProjectImage
+from portfolio.sampler import random_artwork
+
+
+class ErrorPageTests(TestCase):
+    def setUp(self):
+        catalog_store.reset()
+        project = Project.objects.create(title="Ink", description="", slug="ink")
+        self.images = [
+            ProjectImage.objects.create(project=project, image_blob=f"projects/ink/{i}.jpg") for i in range(3)
+        ]
+        self.request = RequestFactory().get('/missing/')
+        self.request.user = AnonymousUser()
+
+    def test_404_shows_a_catalog_image_without_scanning_the_table(self):
+        catalog_store.get()
+
+        with self.assertNumQueries(0):
+            response = views.custom_404(self.request, Exception("missing"))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn(b'/projects/ink/', response.content)
+
+    def test_500_never_touches_the_database(self):
+        with self.assertNumQueries(0):
+            response = views.custom_500(self.request)
+        self.assertEqual(response.status_code, 500)
+        self.assertNotIn(b'<img', response.content)
+
+        catalog_store.get()
+        with self.assertNumQueries(0):
+            response = views.custom_500(self.request)
+        self.assertIn(b'/projects/ink/', response.content)
+
+    def test_sampler_falls_back_to_the_last_snapshot_when_the_database_fails(self):
+        catalog_store.get()
+        catalog_store.invalidate()
+
+        with mock.patch.object(catalog_store, '_read_version', side_effect=OperationalError("down")):
+            image = random_artwork()
+
+        self.assertIn(image.id, [row.id for row in self.images])
@@ -1,11 +1,19 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 
+from portfolio.catalog import catalog_store
 from portfolio.models import FlashDesign
+from portfolio.views import flash_gallery
 
 
 class FlashGalleryViewTests(TestCase):
     def setUp(self):
+        cache.clear()
+        catalog_store.reset()
         self.available = FlashDesign.objects.create(
             title="Lotus Bloom",
             image_blob="flash/lotus.jpg",
@@ -24,11 +32,33 @@ class FlashGalleryViewTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'flash_gallery.html')
-        designs = list(response.context['flash_designs'])
-        self.assertEqual(designs, [self.available, self.taken])
+        design_ids = [design.id for design in response.context['flash_designs']]
+        self.assertEqual(design_ids, [self.available.id, self.taken.id])
 
     def test_flash_gallery_shows_availability_counts(self):
         response = self.client.get(reverse('flash_gallery'))
 
         self.assertEqual(response.context['available_count'], 1)
         self.assertEqual(response.context['taken_count'], 1)
+
+    def render_without_page_cache(self):
+        # The page cache would serve repeat views whole, never reaching the fragment
+        request = RequestFactory().get(reverse('flash_gallery'))
+        request.user = AnonymousUser()
+        return flash_gallery.__wrapped__(request)
+
+    def test_repeat_views_reuse_the_cached_grid_until_a_design_changes(self):
+        self.render_without_page_cache()
+
+        # The grid is the only part of the page that includes picture.html
+        with self.assertNumQueries(0), mock.patch('django.template.loader_tags.IncludeNode.render') as include:
+            response = self.render_without_page_cache()
+        include.assert_not_called()
+        self.assertContains(response, 'Lotus Bloom')
+
+        self.taken.title = 'Koi Returns'
+        self.taken.save()
+
+        response = self.render_without_page_cache()
+        self.assertContains(response, 'Koi Returns')
+        self.assertNotContains(response, 'Koi Embrace')
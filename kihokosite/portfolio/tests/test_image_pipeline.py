@@ -0,0 +1,111 @@
+import base64
+import io
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from portfolio.image_pipeline import (
+    analyze_image, derivative_blob_name, generate_derivatives, image_metadata_fields, read_dimensions,
+)
+from portfolio.models import FlashDesign, Project, ProjectImage
+from portfolio.serializers import ProjectImageSerializer
+
+
+def make_jpeg(width, height, exif=True, orientation=None):
+    image = Image.new('RGB', (width, height), (200, 40, 40))
+    data = image.getexif()
+    if exif:
+        data[0x010F] = 'Camera Maker'
+    if orientation:
+        data[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=data.tobytes())
+    return buffer.getvalue()
+
+
+class DerivativeGenerationTests(SimpleTestCase):
+    def test_generates_each_width_below_original_in_every_format(self):
+        derivatives = generate_derivatives(
+            make_jpeg(1200, 800), 'projects/ink/abc.jpg', widths=(320, 640, 1600), formats=['webp', 'jpg']
+        )
+
+        self.assertEqual(
+            [(d.width, d.format) for d in derivatives],
+            [(320, 'webp'), (320, 'jpg'), (640, 'webp'), (640, 'jpg')],
+        )
+        self.assertEqual(derivatives[0].height, 213)
+        self.assertEqual(derivatives[0].blob_name, 'projects/ink/abc.w320.webp')
+
+    def test_exif_is_stripped_and_jpeg_is_progressive(self):
+        derivative = generate_derivatives(make_jpeg(800, 600), 'a.jpg', widths=(320,), formats=['jpg'])[0]
+
+        with Image.open(io.BytesIO(derivative.data)) as image:
+            self.assertFalse(image.getexif())
+            self.assertTrue(image.info.get('progressive') or image.info.get('progression'))
+
+    def test_small_originals_get_a_single_reencoded_copy(self):
+        derivatives = generate_derivatives(make_jpeg(200, 100), 'a.png', widths=(320, 640), formats=['webp'])
+
+        self.assertEqual([(d.width, d.height) for d in derivatives], [(200, 100)])
+
+    def test_derivative_names_sit_next_to_the_original(self):
+        self.assertEqual(derivative_blob_name('flash/koi.png', 640, 'avif'), 'flash/koi.w640.avif')
+
+
+class ImageMetadataTests(SimpleTestCase):
+    def test_dimensions_follow_exif_rotation(self):
+        data = make_jpeg(1200, 800, orientation=6)
+
+        self.assertEqual(read_dimensions(data), (800, 1200))
+        self.assertEqual((analyze_image(data).width, analyze_image(data).height), (800, 1200))
+
+    def test_undecodable_uploads_keep_their_header_dimensions(self):
+        buffer = io.BytesIO()
+        Image.effect_noise((300, 200), 64).save(buffer, format='PNG')
+        truncated = buffer.getvalue()[:len(buffer.getvalue()) // 2]
+
+        with self.assertLogs('portfolio.image_pipeline', 'WARNING'):
+            self.assertEqual(image_metadata_fields(truncated), {'width': 300, 'height': 200})
+        with self.assertLogs('portfolio.image_pipeline', 'WARNING'):
+            self.assertEqual(image_metadata_fields(b'not an image'), {})
+        self.assertEqual(image_metadata_fields(buffer.getvalue())['width'], 300)
+
+    def test_placeholder_is_a_tiny_jpeg_and_colour_matches_the_image(self):
+        metadata = analyze_image(make_jpeg(1600, 900))
+
+        self.assertTrue(metadata.placeholder.startswith('data:image/jpeg;base64,'))
+        encoded = metadata.placeholder.split(',', 1)[1]
+        with Image.open(io.BytesIO(base64.b64decode(encoded))) as image:
+            self.assertLessEqual(max(image.size), 16)
+        red, green, blue = (int(metadata.dominant_color[i:i + 2], 16) for i in (1, 3, 5))
+        self.assertLess(abs(red - 200) + abs(green - 40) + abs(blue - 40), 30)
+
+
+@override_settings(AZURE_ACCOUNT_NAME='kihoko', PORTFOLIO_IMAGE_HOST=None)
+class SrcsetExposureTests(TestCase):
+    def test_serializer_and_flash_gallery_expose_srcsets(self):
+        derivatives = [
+            {'blob': 'a.w640.webp', 'width': 640, 'height': 480, 'format': 'webp'},
+            {'blob': 'a.w320.webp', 'width': 320, 'height': 240, 'format': 'webp'},
+            {'blob': 'a.w320.jpg', 'width': 320, 'height': 240, 'format': 'jpg'},
+        ]
+        metadata = {'width': 1200, 'height': 900, 'placeholder': 'data:image/jpeg;base64,AAAA',
+                    'dominant_color': '#c82828'}
+        project = Project.objects.create(title='Ink', description='', slug='ink')
+        image = ProjectImage.objects.create(project=project, image_blob='a.jpg', derivatives=derivatives, **metadata)
+        FlashDesign.objects.create(title='Koi', image_blob='a.jpg', derivatives=derivatives, **metadata)
+
+        data = ProjectImageSerializer(image).data
+        self.assertEqual({name: data[name] for name in metadata}, metadata)
+        srcset = data['srcset']
+        self.assertEqual(list(srcset), ['webp', 'jpg'])
+        self.assertEqual(
+            srcset['webp'],
+            'https://kihoko.blob.core.windows.net/portfolio-images/a.w320.webp 320w, '
+            'https://kihoko.blob.core.windows.net/portfolio-images/a.w640.webp 640w',
+        )
+
+        response = self.client.get('/flash/')
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, 'width="1200" height="900"')
+        self.assertContains(response, 'background-color: #c82828;')
@@ -0,0 +1,40 @@
+from django.test import TestCase, override_settings
+
+from portfolio.image_urls import resolve_image_url, resolve_image_urls
+from portfolio.models import Project, ProjectImage
+from portfolio.serializers import ProjectImageSerializer
+
+
+@override_settings(AZURE_ACCOUNT_NAME='kihoko', PORTFOLIO_IMAGE_HOST=None)
+class ImageURLResolverTests(TestCase):
+    def test_resolves_against_storage_account_by_default(self):
+        self.assertEqual(
+            resolve_image_url('projects/ink/a.jpg'),
+            'https://kihoko.blob.core.windows.net/portfolio-images/projects/ink/a.jpg',
+        )
+
+    def test_bulk_resolution_preserves_order_and_empty_names(self):
+        urls = resolve_image_urls(['a.jpg', None, 'b.jpg'])
+
+        self.assertEqual(urls[1], None)
+        self.assertTrue(urls[0].endswith('/a.jpg'))
+        self.assertTrue(urls[2].endswith('/b.jpg'))
+
+    def test_custom_host_replaces_storage_account(self):
+        with self.settings(PORTFOLIO_IMAGE_HOST='cdn.kihoko.com'):
+            self.assertEqual(
+                resolve_image_url('a.jpg'),
+                'https://cdn.kihoko.com/portfolio-images/a.jpg',
+            )
+
+    def test_list_serializer_matches_single_resolution(self):
+        project = Project.objects.create(title='Ink', description='', slug='ink')
+        images = [
+            ProjectImage.objects.create(project=project, image_blob=f'projects/ink/{i}.jpg', order=i)
+            for i in range(3)
+        ]
+
+        data = ProjectImageSerializer(images, many=True).data
+
+        self.assertEqual([row['image_url'] for row in data], [image.image_url for image in images])
+        self.assertEqual(ProjectImageSerializer(images[0]).data['image_url'], images[0].image_url)
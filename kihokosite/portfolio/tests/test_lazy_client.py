@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from portfolio.azure_service import AzureBlobService
+
+
+@override_settings(AZURE_ACCOUNT_NAME='kihoko', AZURE_ACCOUNT_KEY='a2V5')
+class LazyClientTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch('portfolio.azure_service.BlobServiceClient')
+        self.client_class = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_construction_does_not_touch_azure(self):
+        AzureBlobService()
+
+        self.client_class.assert_not_called()
+
+    def test_client_and_container_check_are_created_once_per_process(self):
+        service = AzureBlobService()
+
+        self.assertIs(service.client, service.client)
+
+        self.client_class.assert_called_once()
+        container = self.client_class.return_value.get_container_client.return_value
+        container.exists.assert_called_once()
+        self.assertEqual(set(service.cold_start_timings), {'client', 'container_check'})
+
+    def test_forked_process_builds_its_own_client(self):
+        service = AzureBlobService()
+        service.client
+
+        with mock.patch('portfolio.azure_service.os.getpid', return_value=-1):
+            service.client
+
+        self.assertEqual(self.client_class.call_count, 2)
+
+    @override_settings(AZURE_ENSURE_CONTAINER=False)
+    def test_container_check_can_be_skipped(self):
+        service = AzureBlobService()
+
+        self.assertIsNotNone(service.client)
+        self.client_class.return_value.get_container_client.assert_not_called()
+
+    @override_settings(AZURE_ACCOUNT_KEY='')
+    def test_missing_credentials_leave_the_client_unset(self):
+        self.assertIsNone(AzureBlobService().client)
+        self.client_class.assert_not_called()
@@ -0,0 +1,215 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from portfolio import metrics
+from portfolio.azure_service import AzureBlobService
+from portfolio.metrics import BLOB_DURATION, REQUEST_DURATION, Histogram, MetricsRegistry
+from portfolio.models import Project
+
+
+def sample(text, line_start):
+    """Value of the single exposition line starting with ``line_start``"""
+    [line] = [line for line in text.splitlines() if line.startswith(line_start)]
+    return float(line.rsplit(' ', 1)[1])
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+        Project.objects.create(title='Koi', slug='koi')
+        # rest_framework.authtoken is not installed, so skip the token signal
+        patcher = mock.patch('portfolio.api_config.Token')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+
+    def test_requests_are_recorded_by_view_with_queries_and_size(self):
+        self.client.get('/api/v2/projects/')
+        self.client.get('/api/v2/projects/')
+        self.client.force_login(self.staff)
+
+        response = self.client.get('/api/v2/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        view = 'view="api_v2_projects_list"'
+        self.assertEqual(sample(text, f'{REQUEST_DURATION}_count{{{view},method="GET",status="200"}}'), 2)
+        self.assertEqual(
+            sample(text, f'{REQUEST_DURATION}_bucket{{{view},method="GET",status="200",le="+Inf"}}'), 2
+        )
+        self.assertGreater(sample(text, f'portfolio_db_queries_per_request_sum{{{view}}}'), 0)
+        self.assertGreater(sample(text, f'portfolio_http_response_size_bytes_sum{{{view}}}'), 0)
+        self.assertIn('# TYPE portfolio_db_query_duration_seconds histogram', text)
+
+    def test_metrics_are_staff_only(self):
+        self.assertEqual(self.client.get('/api/v2/metrics/').status_code, 403)
+
+        User.objects.create_user('visitor', password='pw')
+        self.client.login(username='visitor', password='pw')
+        self.assertEqual(self.client.get('/api/v2/metrics/').status_code, 403)
+
+    def test_prometheus_accept_header_is_served(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get(
+            '/api/v2/metrics/',
+            HTTP_ACCEPT='application/openmetrics-text;version=1.0.0,text/plain;version=0.0.4;q=0.5,*/*;q=0.1',
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+
+class MetricsRegistryTests(TestCase):
+    def make_registry(self, directory=''):
+        with override_settings(PORTFOLIO_METRICS_DIR=directory, PORTFOLIO_METRICS_FLUSH_SECONDS=0):
+            return MetricsRegistry([Histogram('latency', "Latency", ('view',), (0.1, 1.0))])
+
+    def make_directory(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name
+
+    def exited_worker(self, directory, *values):
+        """Flush ``values`` as a worker whose process has exited"""
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        registry = self.make_registry(directory)
+        registry._worker_id = f"{process.pid}-deadbeef"
+        for value in values:
+            registry.observe('latency', ('home',), value)
+        registry.flush()
+        return os.path.basename(registry.path)
+
+    def test_buckets_are_cumulative_and_bounds_inclusive(self):
+        registry = self.make_registry()
+        for value in (0.05, 0.1, 0.5, 3.0):
+            registry.observe('latency', ('home',), value)
+
+        text = registry.render()
+
+        self.assertIn('latency_bucket{view="home",le="0.1"} 2', text)
+        self.assertIn('latency_bucket{view="home",le="1"} 3', text)
+        self.assertIn('latency_bucket{view="home",le="+Inf"} 4', text)
+        self.assertIn('latency_count{view="home"} 4', text)
+        self.assertEqual(sample(text, 'latency_sum{view="home"}'), 3.65)
+
+    def test_label_values_are_escaped(self):
+        registry = self.make_registry()
+        registry.observe('latency', ('say "hi"\\\n',), 0.2)
+
+        self.assertIn('latency_count{view="say \\"hi\\"\\\\\\n"} 1', registry.render())
+
+    def test_workers_sharing_a_directory_are_summed(self):
+        directory = self.make_directory()
+        first, second = self.make_registry(directory), self.make_registry(directory)
+        first.observe('latency', ('home',), 0.05)
+        first.maybe_flush()
+        second.observe('latency', ('home',), 0.5)
+        second.observe('latency', ('flash',), 0.5)
+        second.flush()
+        # Only first's unflushed in-memory state is newer than its file
+        first.observe('latency', ('home',), 2.0)
+
+        text = first.render()
+
+        self.assertIn('latency_count{view="home"} 3', text)
+        self.assertIn('latency_bucket{view="home",le="0.1"} 1', text)
+        self.assertIn('latency_count{view="flash"} 1', text)
+        self.assertIn('latency_count{view="home"} 2', second.render())
+
+    def test_forked_worker_starts_empty_with_its_own_file(self):
+        directory = self.make_directory()
+        registry = self.make_registry(directory)
+        registry.observe('latency', ('home',), 0.05)
+        registry.flush()
+        parent_path = registry.path
+
+        registry._after_fork()
+
+        self.assertNotEqual(registry.path, parent_path)
+        self.assertIn('latency_count{view="home"} 1', registry.render())
+
+    def test_unreadable_and_foreign_files_are_skipped(self):
+        directory = self.make_directory()
+        with open(f"{directory}/broken.json", 'w') as f:
+            f.write('{')
+        with open(f"{directory}/old.json", 'w') as f:
+            f.write('{"latency": [[["home"], [1, 1], 0.5]], "gone": [[["x"], [1], 1.0]]}')
+        registry = self.make_registry(directory)
+
+        with self.assertLogs('portfolio.metrics', 'WARNING'):
+            text = registry.render()
+
+        self.assertNotIn('latency_count', text)
+        self.assertNotIn('gone', text)
+
+    def test_exited_workers_are_folded_into_the_archive(self):
+        directory = self.make_directory()
+        first = self.exited_worker(directory, 0.05, 0.5)
+        registry = self.make_registry(directory)
+        registry.observe('latency', ('home',), 2.0)
+
+        self.assertIn('latency_count{view="home"} 3', registry.render())
+        self.assertNotIn(first, os.listdir(directory))
+
+        second = self.exited_worker(directory, 0.05)
+        text = registry.render()
+
+        self.assertIn('latency_count{view="home"} 4', text)
+        self.assertIn('latency_bucket{view="home",le="0.1"} 2', text)
+        self.assertEqual(sorted(name for name in os.listdir(directory) if not name.startswith('.')),
+                         ['archive.json'])
+        # Names are kept only until their file is gone
+        self.assertEqual(registry._read_archive()['workers'], [second])
+
+    def test_file_left_behind_by_an_interrupted_fold_is_not_counted_twice(self):
+        directory = self.make_directory()
+        exited = self.exited_worker(directory, 0.05)
+        registry = self.make_registry(directory)
+        with mock.patch('portfolio.metrics.os.unlink', side_effect=OSError("crashed")):
+            with self.assertLogs('portfolio.metrics', 'WARNING'):
+                registry.render()
+        self.assertIn(exited, os.listdir(directory))
+
+        text = registry.render()
+
+        self.assertIn('latency_count{view="home"} 1', text)
+        self.assertNotIn(exited, os.listdir(directory))
+
+
+@override_settings(PORTFOLIO_BLOB_BACKEND='memory')
+class BlobOperationMetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    def test_service_operations_are_timed_with_their_outcome(self):
+        service = AzureBlobService()
+
+        blob_name = service.upload_image(b'koi', 'koi.jpg')
+        service.download_image(blob_name)
+        service.download_image('missing.jpg')
+
+        values = metrics.registry.histograms[BLOB_DURATION].values
+        self.assertEqual(sum(values[('upload', 'ok')][0]), 1)
+        self.assertEqual(sum(values[('download', 'ok')][0]), 1)
+        self.assertEqual(sum(values[('download', 'error')][0]), 1)
+
+    def test_deletes_and_existence_checks_are_timed_separately(self):
+        service = AzureBlobService()
+        blob_name = service.upload_image(b'koi', 'koi.jpg')
+
+        service.missing_blobs([blob_name, 'missing.jpg'])
+        service.delete_image(blob_name)
+
+        values = metrics.registry.histograms[BLOB_DURATION].values
+        self.assertEqual(sum(values[('delete', 'ok')][0]), 1)
+        self.assertEqual(sum(values[('exists', 'ok')][0]), 1)
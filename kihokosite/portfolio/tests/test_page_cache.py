@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import translation
+
+from portfolio.catalog import catalog_store
+from portfolio.models import Project
+from portfolio.page_cache import get_page_cache, page_cache_key
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        get_page_cache().clear()
+        catalog_store.reset()
+        Project.objects.create(title="Ink", description="", slug="ink")
+
+    def test_anonymous_repeat_views_are_hits_until_the_catalog_changes(self):
+        url = reverse('home')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Ink')
+
+        Project.objects.create(title="Koi", description="", slug="koi")
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Koi')
+
+    def test_hits_are_one_cache_query_without_rendering(self):
+        url = reverse('flash_gallery')
+        self.client.get(url)
+
+        with self.assertNumQueries(1), mock.patch('portfolio.views.render') as render:
+            response = self.client.get(url)
+
+        render.assert_not_called()
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_stale_page_is_served_while_another_worker_regenerates(self):
+        url = reverse('project_detail', args=['ink'])
+        self.client.get(url)
+        Project.objects.filter(slug='ink').update(title="Renamed")
+        Project.objects.get(slug='ink').save()
+
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        with translation.override('en'):
+            lock_key = page_cache_key(request) + ':lock'
+        get_page_cache().add(lock_key, 1)
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertNotContains(response, 'Renamed')
+
+        get_page_cache().delete(lock_key)
+        self.assertContains(self.client.get(url), 'Renamed')
+
+    def test_key_varies_on_language_and_user_bits(self):
+        request = RequestFactory().get('/flash/')
+        keys = set()
+        for language in ('en', 'ja'):
+            for user in (SimpleNamespace(is_authenticated=False),
+                         SimpleNamespace(is_authenticated=True, profile=SimpleNamespace(email_confirmed=True)),
+                         SimpleNamespace(is_authenticated=True, profile=SimpleNamespace(email_confirmed=False))):
+                request.user = user
+                with translation.override(language):
+                    keys.add(page_cache_key(request))
+
+        self.assertEqual(len(keys), 6)
+
+    def test_unlisted_query_parameters_share_the_page_entry(self):
+        url = reverse('home')
+        self.client.get(url)
+
+        response = self.client.get(url, {'utm_source': 'x', 'junk': '1'})
+
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    @override_settings(PAGE_CACHE_QUERY_PARAMS=('page',))
+    def test_listed_query_parameters_are_part_of_the_key(self):
+        factory = RequestFactory()
+        keys = set()
+        for query in ({}, {'page': '2'}, {'page': '2', 'junk': '1'}):
+            request = factory.get('/flash/', query)
+            request.user = AnonymousUser()
+            keys.add(page_cache_key(request))
+
+        self.assertEqual(len(keys), 2)
+
+    @override_settings(PAGE_CACHE_ALIAS='default')
+    def test_local_memory_cache_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_page_cache()
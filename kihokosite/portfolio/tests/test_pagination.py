@@ -0,0 +1,69 @@
+import base64
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio.catalog import catalog_store
+from portfolio.models import Project, ProjectImage
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        catalog_store.reset()
+        project = Project.objects.create(title="Ink", description="", slug="ink")
+        # Shared order values force the created_at/id tiebreakers into play
+        self.images = [
+            ProjectImage.objects.create(project=project, image_blob=f"projects/ink/{i}.jpg", order=i // 3)
+            for i in range(7)
+        ]
+        self.expected = [image.id for image in ProjectImage.objects.order_by('order', 'created_at', 'id')]
+
+    def walk(self, url_name):
+        url = reverse(url_name) + '?page_size=3'
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            url = data['next']
+        return pages
+
+    def test_v2_and_legacy_endpoints_walk_every_artwork_once(self):
+        for url_name in ('api_v2_all_artworks', 'api_artworks_list'):
+            with self.subTest(url_name):
+                pages = self.walk(url_name)
+
+                ids = [row['id'] for page in pages for row in page['results']]
+                self.assertEqual(ids, self.expected)
+                self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+                self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_cursor_returns_the_preceding_page(self):
+        for url_name in ('api_v2_all_artworks', 'api_artworks_list'):
+            with self.subTest(url_name):
+                pages = self.walk(url_name)
+
+                previous = self.client.get(pages[2]['previous']).json()
+                self.assertEqual(
+                    [row['id'] for row in previous['results']],
+                    [row['id'] for row in pages[1]['results']],
+                )
+                self.assertIsNotNone(previous['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse('api_v2_all_artworks') + '?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_hand_made_cursors_with_wrong_value_types_are_rejected(self):
+        for values in ([0, '2026-01-01T00:00:00', 1],       # naive datetime
+                       [0, '2026-01-01T00:00:00+00:00', '1'],
+                       [True, '2026-01-01T00:00:00+00:00', 1],
+                       [0, 1767225600, 1],
+                       [0, None, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'k': values, 'r': 0}).encode()).decode()
+            for url_name in ('api_v2_all_artworks', 'api_artworks_list'):
+                with self.subTest(values=values, url_name=url_name):
+                    response = self.client.get(reverse(url_name) + f'?cursor={cursor}')
+
+                    self.assertEqual(response.status_code, 404)
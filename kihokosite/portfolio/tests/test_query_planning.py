@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from portfolio.models import Cart, CartItem, Merchandise, MerchandiseImage, Project, ProjectImage
+from portfolio.serializers import CartSerializer, ProjectSerializer
+
+
+class QueryPlanningTests(TestCase):
+    def create_merchandise(self, count):
+        items = []
+        for i in range(count):
+            merchandise = Merchandise.objects.create(
+                title=f"Print {i}", description="", price=Decimal('12.50'), stock=3
+            )
+            MerchandiseImage.objects.create(merchandise=merchandise, image=f"merchandise/{i}.jpg")
+            items.append(merchandise)
+        return items
+
+    def test_merchandise_list_query_count_is_constant(self):
+        self.create_merchandise(2)
+        # Version watermark for the ETag, merchandise, prefetched images
+        with self.assertNumQueries(3):
+            self.client.get(reverse('api_merchandise_list'))
+
+        self.create_merchandise(5)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('api_merchandise_list'))
+        self.assertEqual(len(response.json()), 7)
+
+    def test_cart_list_uses_aggregates_and_prefetches(self):
+        merchandise = self.create_merchandise(3)
+        for i in range(3):
+            cart = Cart.objects.create()
+            for item in merchandise:
+                CartItem.objects.create(cart=cart, merchandise=item, quantity=i + 1)
+
+        with self.assertNumQueries(3):
+            data = CartSerializer(Cart.objects.order_by('id'), many=True).data
+
+        self.assertEqual([row['total_items'] for row in data], [3, 6, 9])
+        self.assertEqual(data[2]['total_price'], Decimal('112.50'))
+        self.assertEqual(len(data[0]['items'][0]['merchandise']['images']), 1)
+
+    def test_single_cart_totals_for_empty_cart(self):
+        cart = Cart.objects.create()
+
+        data = CartSerializer(cart).data
+
+        self.assertEqual(data['total_items'], 0)
+        self.assertEqual(data['total_price'], Decimal('0.00'))
+
+    def test_project_instance_prefetches_images(self):
+        project = Project.objects.create(title="Ink", description="", slug="ink")
+        for i in range(4):
+            ProjectImage.objects.create(project=project, image_blob=f"projects/ink/{i}.jpg")
+        project = Project.objects.get(pk=project.pk)
+
+        with self.assertNumQueries(1):
+            data = ProjectSerializer(project).data
+        self.assertEqual(len(data['images']), 4)
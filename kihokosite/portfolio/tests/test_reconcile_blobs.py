@@ -0,0 +1,93 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from portfolio.models import BlobDeletion, Project, ProjectImage
+
+
+class FakePagedBlobService:
+    backend = object()
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.deleted = []
+        self.tokens = []
+
+    def iter_blob_pages(self, prefix=None, page_size=5000, continuation_token=None):
+        self.tokens.append(continuation_token)
+        start = int(continuation_token or 0)
+        for index in range(start, len(self.pages)):
+            next_token = str(index + 1) if index + 1 < len(self.pages) else None
+            yield self.pages[index], next_token
+
+    def delete_images(self, blob_names):
+        self.deleted.extend(blob_names)
+        return {name: None for name in blob_names}
+
+
+def blob(name, age_hours=48, size=100):
+    return SimpleNamespace(name=name, size=size, last_modified=timezone.now() - timedelta(hours=age_hours))
+
+
+class ReconcileBlobsTests(TestCase):
+    def setUp(self):
+        project = Project.objects.create(
+            title="Ink", description="", slug="ink", featured_image_blob="projects/ink/cover.jpg"
+        )
+        ProjectImage.objects.create(
+            project=project,
+            image_blob="projects/ink/a.jpg",
+            derivatives=[{'blob': 'projects/ink/a.w320.webp', 'width': 320, 'height': 200, 'format': 'webp'}],
+        )
+        BlobDeletion.objects.create(blob_name="projects/ink/queued.jpg")
+        self.service = FakePagedBlobService([
+            [blob("projects/ink/a.jpg"), blob("projects/ink/a.w320.webp"), blob("projects/ink/old.jpg")],
+            [blob("projects/ink/cover.jpg"), blob("projects/ink/queued.jpg"), blob("projects/ink/new.jpg", age_hours=1)],
+        ])
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'reconcile.json')
+
+    def run_command(self, *args):
+        out = io.StringIO()
+        with mock.patch('portfolio.management.commands.reconcile_blobs.azure_blob_service', self.service):
+            call_command('reconcile_blobs', '--checkpoint', self.checkpoint, *args, stdout=out)
+        return out.getvalue()
+
+    def test_report_lists_only_old_unreferenced_blobs(self):
+        output = self.run_command()
+
+        self.assertIn("orphan: projects/ink/old.jpg", output)
+        self.assertNotIn("new.jpg", output)
+        self.assertNotIn("queued.jpg", output)
+        self.assertIn("Scanned 6 blobs: 1 orphans", output)
+        self.assertEqual(self.service.deleted, [])
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_delete_rechecks_references_before_deleting(self):
+        def referenced_mid_run(names):
+            # An upload reusing the name lands after the reference set was built
+            return {"projects/ink/old.jpg"} if "projects/ink/old.jpg" in names else set()
+
+        with mock.patch('portfolio.management.commands.reconcile_blobs.still_referenced', referenced_mid_run):
+            self.run_command('--delete')
+        self.assertEqual(self.service.deleted, [])
+
+        self.service.deleted.clear()
+        self.run_command('--delete', '--min-age-hours', '0')
+        self.assertEqual(sorted(self.service.deleted), ["projects/ink/new.jpg", "projects/ink/old.jpg"])
+
+    def test_resume_continues_from_checkpointed_page(self):
+        with open(self.checkpoint, 'w') as checkpoint:
+            checkpoint.write('{"continuation_token": "1", "scanned": 3, "orphans": 1, '
+                             '"orphan_bytes": 100, "deleted": 0, "prefix": null}')
+
+        output = self.run_command('--resume')
+
+        self.assertEqual(self.service.tokens, ["1"])
+        self.assertIn("Scanned 6 blobs: 1 orphans", output)
@@ -0,0 +1,54 @@
+import base64
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from portfolio import azure_service
+from portfolio.azure_service import AzureBlobService, SasTokenCache
+
+
+class SasTokenCacheTests(SimpleTestCase):
+    def test_expiry_is_rounded_up_to_bucket_boundary(self):
+        cache = SasTokenCache(bucket_seconds=3600)
+        now = datetime(2025, 1, 1, 10, 15, tzinfo=timezone.utc)
+
+        expiry = cache.expiry_for(timedelta(hours=24), now=now)
+
+        self.assertEqual(expiry, datetime(2025, 1, 2, 11, 0, tzinfo=timezone.utc))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = SasTokenCache(max_entries=2)
+        cache.put('a', '1')
+        cache.put('b', '2')
+        cache.get('a')
+        cache.put('c', '3')
+
+        self.assertEqual(cache.get('a'), '1')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+
+@override_settings(AZURE_ACCOUNT_NAME='', AZURE_ACCOUNT_KEY='')
+class SasSigningTests(SimpleTestCase):
+    def setUp(self):
+        self.service = AzureBlobService()
+        self.service.account_name = 'kihoko'
+        self.service.account_key = base64.b64encode(b'secret-key').decode()
+
+    def test_bulk_signing_reuses_tokens_within_a_bucket(self):
+        with mock.patch.object(
+            azure_service, 'generate_blob_sas', wraps=azure_service.generate_blob_sas
+        ) as sign:
+            first = self.service.get_sas_tokens(['a.jpg', 'b.jpg', None])
+            second = self.service.get_sas_tokens(['a.jpg', 'b.jpg'])
+
+        self.assertEqual(sign.call_count, 2)
+        self.assertEqual(first[:2], second)
+        self.assertIsNone(first[2])
+
+    def test_permissions_are_cached_separately(self):
+        read = self.service.get_sas_token('a.jpg', permission='r')
+        write = self.service.get_sas_token('a.jpg', permission='w')
+
+        self.assertNotEqual(read, write)
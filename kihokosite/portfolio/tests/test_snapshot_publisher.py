@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from portfolio.catalog import catalog_store
+from portfolio.models import Project, ProjectImage
+from portfolio.snapshot_publisher import BlobContainerTarget, DirectoryTarget, publish_snapshot
+
+
+@override_settings(AZURE_ACCOUNT_NAME='kihoko', PORTFOLIO_IMAGE_HOST=None)
+class SnapshotPublisherTests(TestCase):
+    def setUp(self):
+        catalog_store.reset()
+        self.root = tempfile.mkdtemp()
+        self.target = DirectoryTarget(self.root)
+        project = Project.objects.create(title="Ink", description="", slug="ink")
+        ProjectImage.objects.create(project=project, image_blob="projects/ink/a.jpg")
+
+    def read(self, path):
+        with open(os.path.join(self.root, *path.split('/')), 'rb') as f:
+            return f.read()
+
+    def test_payloads_match_the_live_endpoints_and_are_precompressed(self):
+        manifest = publish_snapshot(self.target)
+
+        self.assertEqual(json.loads(self.read('manifest.json')), manifest)
+        self.assertEqual(sorted(manifest['files']), ['artworks', 'projects', 'projects/ink'])
+        for name, url in [('projects', reverse('api_v2_projects_list')),
+                          ('projects/ink', reverse('api_v2_project_detail', args=['ink']))]:
+            entry = manifest['files'][name]
+            self.assertRegex(entry['path'], rf'^{name}\.[0-9a-f]{{16}}\.json$')
+            live = self.client.get(url, HTTP_ACCEPT='application/json').json()
+            self.assertEqual(json.loads(self.read(entry['path'])), live)
+            self.assertEqual(json.loads(gzip.decompress(self.read(entry['encodings']['gzip']))), live)
+
+        artworks = json.loads(self.read(manifest['files']['artworks']['path']))
+        self.assertEqual(len(artworks['results']), 1)
+        self.assertIsNone(artworks['next'])
+
+    def test_unchanged_payloads_are_not_rewritten_and_old_files_retire_after_one_publish(self):
+        first = publish_snapshot(self.target)
+        with mock.patch.object(self.target, 'write', wraps=self.target.write) as write:
+            publish_snapshot(self.target)
+        self.assertEqual([call.args[0] for call in write.call_args_list], ['manifest.json'])
+
+        Project.objects.create(title="Koi", description="", slug="koi")
+        second = publish_snapshot(self.target)
+        old_path = first['files']['projects']['path']
+        self.assertIn(old_path, second['retired'])
+        self.assertTrue(os.path.exists(os.path.join(self.root, old_path)))
+        self.assertEqual(second['files']['projects/ink'], first['files']['projects/ink'])
+
+        publish_snapshot(self.target)
+        self.assertFalse(os.path.exists(os.path.join(self.root, old_path)))
+
+    @override_settings(PORTFOLIO_SNAPSHOT_PUBLISH_ON_CHANGE=True)
+    def test_catalog_changes_schedule_a_publish_after_commit(self):
+        with mock.patch('portfolio.snapshot_publisher.schedule_publish') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                Project.objects.create(title="Koi", description="", slug="koi")
+
+        schedule.assert_called_once_with()
+
+
+class BlobContainerTargetTests(SimpleTestCase):
+    def test_first_write_creates_a_missing_container(self):
+        container = mock.Mock()
+        container.exists.return_value = False
+        target = BlobContainerTarget(container)
+
+        target.write('a.json', b'{}')
+        target.write('manifest.json', b'{}')
+
+        container.create_container.assert_called_once_with(public_access='blob')
+        container.exists.assert_called_once_with()
+        self.assertEqual(container.upload_blob.call_count, 2)
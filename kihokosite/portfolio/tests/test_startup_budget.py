@@ -0,0 +1,71 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+from django.urls import resolve
+
+from portfolio.management.commands.startup_budget import package_breakdown, parse_importtime
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     django.utils.version
+import time:       300 |        420 |   django.utils
+import time:      1000 |       1420 | django
+import time:      2500 |       2500 | rest_framework.serializers
+"""
+
+
+class ImportTimeParsingTests(SimpleTestCase):
+    def test_entries_keep_order_depth_and_timings(self):
+        entries = parse_importtime(IMPORTTIME)
+
+        self.assertEqual([(e.module, e.depth) for e in entries], [
+            ('django.utils.version', 2), ('django.utils', 1), ('django', 0), ('rest_framework.serializers', 0),
+        ])
+        self.assertEqual(entries[2].cumulative_us, 1420)
+
+    def test_breakdown_sums_self_time_per_top_level_package(self):
+        breakdown = package_breakdown(parse_importtime(IMPORTTIME))
+
+        self.assertEqual(breakdown, {'rest_framework': 2500, 'django': 1420})
+        self.assertEqual(list(breakdown), ['rest_framework', 'django'])
+
+
+class StartupBudgetCommandTests(SimpleTestCase):
+    def run_command(self, **report):
+        report = {'import_ms': 400, 'first_response_ms': 50, 'status': 200, 'deferred_loaded': [], **report}
+        with mock.patch('portfolio.management.commands.startup_budget.run_probe',
+                        return_value=(report, parse_importtime(IMPORTTIME))):
+            out = StringIO()
+            call_command('startup_budget', import_budget_ms=500, first_response_budget_ms=100, stdout=out)
+            return out.getvalue()
+
+    def test_within_budget(self):
+        self.assertIn("Startup within budget", self.run_command())
+
+    def test_slow_import_or_eager_deferred_module_fails(self):
+        with self.assertRaisesMessage(CommandError, "import took 900ms"):
+            self.run_command(import_ms=900)
+        with self.assertRaisesMessage(CommandError, "portfolio.upload_api_views"):
+            self.run_command(deferred_loaded=['portfolio.upload_api_views'])
+
+
+    def test_error_response_fails_however_fast(self):
+        with self.assertRaisesMessage(CommandError, "first response to / was HTTP 500"):
+            self.run_command(status=500)
+        with self.assertRaisesMessage(CommandError, "was HTTP 404"):
+            self.run_command(status=404)
+        self.assertIn("Startup within budget", self.run_command(status=302))
+
+class LazyRouteTests(TestCase):
+    def test_auth_route_imports_its_view_on_first_call(self):
+        match = resolve('/api/auth/login/')
+        self.assertEqual(match.func.__module__, 'portfolio.auth_api_views')
+        self.assertTrue(match.func.csrf_exempt)
+
+        response = self.client.post('/api/auth/login/', {})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Username and password are required'})
@@ -0,0 +1,224 @@
+"""
+API views for uploading and managing portfolio images in Azure Blob Storage
+
+Only staff tooling calls these, so the URLconf imports this module (and with
+it the Azure SDK and Pillow) on first use rather than at startup.
+"""
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.shortcuts import get_object_or_404
+from django.db import transaction
+import logging
+
+from .models import Project, ProjectImage
+from .serializers import ProjectSerializer, ProjectImageSerializer
+from .azure_service import azure_blob_service
+from .blob_outbox import BlobDeletionInProgress, cancel_blob_deletions, enqueue_blob_deletions
+from .blob_refs import stored_image_fields
+from .image_pipeline import image_metadata_fields
+
+logger = logging.getLogger(__name__)
+
+
+def restore_missing_blobs(instance, blob_name, image_file, filename, project_slug):
+    """
+    Re-upload blobs of a just-committed row that are no longer in storage.
+
+    An upload of bytes that were stored before reuses the existing blob. A
+    deletion drain that finished between that check and the row's commit
+    may have removed it (or its derivatives) in the meantime. The row is
+    already saved, so a failure is logged rather than failing the request,
+    which the client would retry into a duplicate row.
+    """
+    try:
+        missing = set(azure_blob_service.missing_blobs(instance.blob_names))
+        if not missing:
+            return
+        logger.warning(f"Restoring blobs deleted while {blob_name} was being reused: {sorted(missing)}")
+        if blob_name in missing:
+            image_file.seek(0)
+            azure_blob_service.upload_image(file_data=image_file, filename=filename, project_slug=project_slug)
+        if missing - {blob_name}:
+            image_file.seek(0)
+            instance.derivatives = azure_blob_service.upload_derivatives(blob_name, image_file)
+            instance.save(update_fields=['derivatives'])
+    except Exception as e:
+        logger.error(f"Failed to restore blobs of {blob_name}: {e}")
+
+
+def deletion_in_progress_response():
+    """The uploaded bytes' blob is being deleted; a retry uploads it afresh"""
+    response = Response({'error': 'This image is being removed from storage, please retry shortly'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '5'
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def api_upload_project_image(request, slug):
+    """Upload a new image for a project to Azure Blob Storage"""
+    try:
+        project = get_object_or_404(Project, slug=slug)
+        
+        if 'image' not in request.FILES:
+            return Response({'error': 'No image file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        image_file = request.FILES['image']
+        title = request.data.get('title', 'Untitled')
+        description = request.data.get('description', '')
+        order = request.data.get('order', 0)
+        
+        # Stream to Azure Blob Storage in blocks
+        blob_name = azure_blob_service.upload_image(
+            file_data=image_file,
+            filename=image_file.name,
+            project_slug=project.slug
+        )
+        
+        if not blob_name:
+            return Response({'error': 'Failed to upload image to Azure'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        # The same bytes uploaded before: reuse their derivatives and metadata
+        metadata = stored_image_fields(blob_name)
+        if not metadata:
+            # Resized/re-encoded copies for srcset
+            image_file.seek(0)
+            metadata['derivatives'] = azure_blob_service.upload_derivatives(blob_name, image_file)
+            
+            # Dimensions, placeholder and dominant colour for layout reservation
+            image_file.seek(0)
+            metadata.update(image_metadata_fields(image_file))
+        
+        # Create database record; a reused blob may still be queued for deletion
+        with transaction.atomic():
+            project_image = ProjectImage(
+                project=project,
+                image_blob=blob_name,
+                title=title,
+                description=description,
+                order=order,
+                **metadata
+            )
+            cancel_blob_deletions(project_image.blob_names)
+            project_image.save()
+        restore_missing_blobs(project_image, blob_name, image_file, image_file.name, project.slug)
+        
+        serializer = ProjectImageSerializer(project_image)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        
+    except BlobDeletionInProgress:
+        return deletion_in_progress_response()
+    except Exception as e:
+        logger.error(f"Error in api_upload_project_image: {e}")
+        return Response({'error': 'Failed to upload image'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser])
+def api_upload_featured_image(request, slug):
+    """Upload a featured image for a project to Azure Blob Storage"""
+    try:
+        project = get_object_or_404(Project, slug=slug)
+        
+        if 'image' not in request.FILES:
+            return Response({'error': 'No image file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        image_file = request.FILES['image']
+        old_blob = project.featured_image_blob
+        
+        # Stream new image to Azure Blob Storage in blocks
+        blob_name = azure_blob_service.upload_image(
+            file_data=image_file,
+            filename=f"featured_{image_file.name}",
+            project_slug=project.slug
+        )
+        
+        if not blob_name:
+            return Response({'error': 'Failed to upload image to Azure'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        # Update project with new blob name; the old blob is removed by the
+        # deletion outbox once this commits
+        with transaction.atomic():
+            project.featured_image_blob = blob_name
+            cancel_blob_deletions([blob_name])
+            project.save()
+            if old_blob and old_blob != blob_name:
+                enqueue_blob_deletions([old_blob])
+        restore_missing_blobs(project, blob_name, image_file, f"featured_{image_file.name}", project.slug)
+        
+        serializer = ProjectSerializer(project)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+        
+    except BlobDeletionInProgress:
+        return deletion_in_progress_response()
+    except Exception as e:
+        logger.error(f"Error in api_upload_featured_image: {e}")
+        return Response({'error': 'Failed to upload featured image'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def api_delete_project_image(request, image_id):
+    """Delete a project image; its blobs are queued for the deletion outbox"""
+    try:
+        project_image = get_object_or_404(ProjectImage, id=image_id)
+        
+        # Delete from database; post_delete enqueues the blob and derivatives
+        project_image.delete()
+        
+        return Response({'message': 'Image deleted successfully'}, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error in api_delete_project_image: {e}")
+        return Response({'error': 'Failed to delete image'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def api_update_project_image(request, image_id):
+    """Update project image metadata"""
+    try:
+        project_image = get_object_or_404(ProjectImage, id=image_id)
+        
+        # Update metadata
+        project_image.title = request.data.get('title', project_image.title)
+        project_image.description = request.data.get('description', project_image.description)
+        project_image.order = request.data.get('order', project_image.order)
+        project_image.save()
+        
+        serializer = ProjectImageSerializer(project_image)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error in api_update_project_image: {e}")
+        return Response({'error': 'Failed to update image'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def api_azure_blob_health(request):
+    """Check Azure Blob Storage connectivity"""
+    try:
+        if azure_blob_service.client is None:
+            return Response({
+                'status': 'disconnected',
+                'message': 'Azure Blob Storage not configured'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        # Try to list containers to test connectivity
+        containers = list(azure_blob_service.client.list_containers())
+        
+        return Response({
+            'status': 'connected',
+            'message': 'Azure Blob Storage is accessible',
+            'container_count': len(containers)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Azure Blob Storage health check failed: {e}")
+        return Response({
+            'status': 'error',
+            'message': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE) 
\ No newline at end of file
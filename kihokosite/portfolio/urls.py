@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views, api_views
+from .lazy_views import lazy_api_view
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -17,15 +18,16 @@ urlpatterns = [
     path('api/v2/project/<slug:slug>/', api_views.api_project_detail, name='api_v2_project_detail'),
     path('api/v2/project/<slug:slug>/images/', api_views.api_project_images, name='api_v2_project_images'),
     path('api/v2/artworks/', api_views.api_all_artworks, name='api_v2_all_artworks'),
+    path('api/v2/metrics/', api_views.api_metrics, name='api_v2_metrics'),
     
     # Image upload/management endpoints
-    path('api/v2/project/<slug:slug>/upload-image/', api_views.api_upload_project_image, name='api_v2_upload_project_image'),
-    path('api/v2/project/<slug:slug>/upload-featured/', api_views.api_upload_featured_image, name='api_v2_upload_featured_image'),
-    path('api/v2/image/<int:image_id>/update/', api_views.api_update_project_image, name='api_v2_update_project_image'),
-    path('api/v2/image/<int:image_id>/delete/', api_views.api_delete_project_image, name='api_v2_delete_project_image'),
+    path('api/v2/project/<slug:slug>/upload-image/', lazy_api_view('portfolio.upload_api_views.api_upload_project_image'), name='api_v2_upload_project_image'),
+    path('api/v2/project/<slug:slug>/upload-featured/', lazy_api_view('portfolio.upload_api_views.api_upload_featured_image'), name='api_v2_upload_featured_image'),
+    path('api/v2/image/<int:image_id>/update/', lazy_api_view('portfolio.upload_api_views.api_update_project_image'), name='api_v2_update_project_image'),
+    path('api/v2/image/<int:image_id>/delete/', lazy_api_view('portfolio.upload_api_views.api_delete_project_image'), name='api_v2_delete_project_image'),
     
     # Azure Blob Storage health check
-    path('api/v2/azure/health/', api_views.api_azure_blob_health, name='api_v2_azure_health'),
+    path('api/v2/azure/health/', lazy_api_view('portfolio.upload_api_views.api_azure_blob_health'), name='api_v2_azure_health'),
     
     # Legacy API endpoints (for backward compatibility)
     path('api/projects/', views.api_projects_list, name='api_projects_list'),
@@ -37,7 +39,14 @@ urlpatterns = [
     path('api/merchandise/', views.api_merchandise_list, name='api_merchandise_list'),
     
     # Authentication API endpoints
-    path('api/auth/login/', views.api_user_login, name='api_user_login'),
-    path('api/auth/signup/', views.api_user_signup, name='api_user_signup'),
-    path('api/auth/logout/', views.api_user_logout, name='api_user_logout'),
+    path('api/auth/login/', lazy_api_view('portfolio.auth_api_views.api_user_login'), name='api_user_login'),
+    path('api/auth/signup/', lazy_api_view('portfolio.auth_api_views.api_user_signup'), name='api_user_signup'),
+    path('api/auth/logout/', lazy_api_view('portfolio.auth_api_views.api_user_logout'), name='api_user_logout'),
 ]
+
+if settings.PORTFOLIO_BLOB_BACKEND != 'azure':
+    # Blobs kept on local disk or in memory are served by the site itself
+    from .blob_views import serve_blob
+    urlpatterns += [
+        path(f"{settings.PORTFOLIO_BLOB_URL.strip('/')}/<path:blob_name>", serve_blob, name='serve_blob'),
+    ]
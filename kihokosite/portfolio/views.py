@@ -1,7 +1,6 @@
 import json
 from django.shortcuts import redirect, render, get_object_or_404
-from django.http import HttpResponseServerError, HttpResponseBadRequest, HttpResponseNotFound, JsonResponse
-from random import choice
+from django.http import Http404, HttpResponseServerError, HttpResponseBadRequest, HttpResponseNotFound, JsonResponse
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.mail import send_mail
@@ -17,12 +16,17 @@ from django.core.mail import EmailMessage
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 import logging
-from django.contrib.auth import login, authenticate
+from django.contrib.auth import login
 from django.conf import settings
 from django.utils import translation
 from django.db.models import Sum
 from django.utils import timezone
 from .models import Project, ProjectImage, Merchandise, Cart, CartItem, FlashDesign
+from .catalog import MERCHANDISE_KEY, get_catalog
+from .conditional import conditional_on_version
+from .sampler import random_artwork
+from .page_cache import cache_public_page
+from .pagination import KeysetPagination, paginate
 from .forms import UpdateCartItemForm, RemoveCartItemForm, ContactForm, EditProfileForm, CustomUserCreationForm
 import traceback
 import os
@@ -30,26 +34,24 @@ import os
 # REST Framework imports
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny
-from rest_framework.authtoken.models import Token
 from .serializers import (
     ProjectSerializer, ProjectListSerializer, ProjectImageSerializer,
-    MerchandiseSerializer, ContactFormSerializer, UserSerializer,
-    UserRegistrationSerializer, CartSerializer, CartItemSerializer
+    MerchandiseSerializer, ContactFormSerializer, CartSerializer, CartItemSerializer
 )
 
 logger = logging.getLogger('django')
 
-from django.contrib import admin
-
 def redirect_to_shop_base(request):
     return redirect(settings.THIRD_PARTY_CHECKOUT_URL, permanent=True)
 
 # EXAMPLE VIEWS
+@cache_public_page
 def home(request):
     try:
-        projects = Project.objects.all()
+        projects = get_catalog().projects
         return render(request, 'index.html', {'projects': projects})
     except Exception as e:
         logger.error(f"An error occurred while processing your request: {e}")
@@ -57,31 +59,35 @@ def home(request):
         logger.error(f"Traceback: {traceback.format_exc()}")
         return HttpResponseServerError("An error occurred while processing your request.")
 
+@cache_public_page
 def project_detail(request, slug):
     try:
-        project = get_object_or_404(Project, slug=slug)
-        project_images = ProjectImage.objects.filter(project=project)
-        return render(request, 'project_detail.html', {'project': project, 'project_images': project_images})
+        project = get_catalog().get_project(slug)
+        if project is None:
+            raise Http404("No Project matches the given query.")
+        return render(request, 'project_detail.html', {'project': project, 'project_images': project.images})
+    except Http404:
+        raise
     except Exception as e:
         logger.error(f"An error occurred while processing your request: {e}")
         # log the traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         return HttpResponseServerError("An error occurred while processing your request.")
 
+@cache_public_page
 def art_detail(request, image_id):
     try:
         image = get_object_or_404(ProjectImage, id=image_id)
-        project_images = list(image.project.projectimage_set.all())
-        current_index = project_images.index(image)
-        prev_index = current_index - 1 if current_index > 0 else len(project_images) - 1
-        next_index = (current_index + 1) % len(project_images)
+        prev_id, next_id = image.get_neighbor_ids()
 
         context = {
             'image': image,
-            'prev_image': project_images[prev_index],
-            'next_image': project_images[next_index],
+            'prev_id': prev_id,
+            'next_id': next_id,
         }
         return render(request, 'art_detail.html', context)
+    except Http404:
+        raise
     except Exception as e:
         logger.error(f"An error occurred while processing your request: {e}")
         # log the traceback
@@ -89,13 +95,16 @@ def art_detail(request, image_id):
         return HttpResponseServerError("An error occurred while processing your request.")
 
 
+@cache_public_page
 def flash_gallery(request):
     try:
-        flash_designs = FlashDesign.objects.all()
+        catalog = get_catalog()
         context = {
-            'flash_designs': flash_designs,
-            'available_count': flash_designs.filter(is_available=True).count(),
-            'taken_count': flash_designs.filter(is_available=False).count(),
+            'flash_designs': catalog.flash_designs,
+            'available_count': catalog.available_flash_count,
+            'taken_count': catalog.taken_flash_count,
+            'grid_cache_key': catalog.flash_cache_key,
+            'grid_cache_timeout': settings.FLASH_GALLERY_CACHE_TIMEOUT,
         }
         return render(request, 'flash_gallery.html', context)
     except Exception as e:
@@ -231,22 +240,21 @@ def activate_email(request, uidb64, token):
 # 400 Series Errors
 def custom_404(request, exception):
     logger.error(f"404 error: {exception}")
-    images = ProjectImage.objects.all()
-    random_image = choice(images) if images.exists() else None
-    return render(request, '404.html', {'random_image': random_image}, status=404)
+    return render(request, '404.html', {'random_image': random_artwork()}, status=404)
 
 def custom_400(request, exception):
     logger.error(f"400 error: {exception}")
-    images = ProjectImage.objects.all()
-    random_image = choice(images) if images.exists() else None
-    return render(request, '400.html', {'random_image': random_image})
+    return render(request, '400.html', {'random_image': random_artwork()}, status=400)
 
 # 500 Series Errors
 def custom_500(request):
     logger.error(f"500 error")
-    images = ProjectImage.objects.all()
-    random_image = choice(images) if images.exists() else None
-    return render(request, '500.html', {'random_image': random_image})
+    try:
+        # No database access: it may be the reason we are here
+        return render(request, '500.html', {'random_image': random_artwork(use_database=False)}, status=500)
+    except Exception as e:
+        logger.error(f"Failed to render the 500 page: {e}")
+        return HttpResponseServerError("An error occurred while processing your request.")
 
 
 # =====================================
@@ -258,9 +266,12 @@ def custom_500(request):
 def api_projects_list(request):
     """API endpoint to get all projects for the React frontend"""
     try:
-        projects = Project.objects.all()
-        serializer = ProjectListSerializer(projects, many=True, context={'request': request})
-        return Response(serializer.data)
+        catalog = get_catalog()
+        data = catalog.memoize(
+            'project_list',
+            lambda: ProjectListSerializer(catalog.projects, many=True).data,
+        )
+        return Response(data)
     except Exception as e:
         logger.error(f"Error in api_projects_list: {e}")
         return Response({'error': 'Failed to fetch projects'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -300,7 +311,10 @@ def api_artwork_detail(request, artwork_id):
     try:
         artwork = get_object_or_404(ProjectImage, id=artwork_id)
         serializer = ProjectImageSerializer(artwork, context={'request': request})
-        return Response(serializer.data)
+        previous_id, next_id = artwork.get_neighbor_ids()
+        return Response({**serializer.data, 'previous_id': previous_id, 'next_id': next_id})
+    except Http404:
+        raise
     except Exception as e:
         logger.error(f"Error in api_artwork_detail: {e}")
         return Response({'error': 'Failed to fetch artwork'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -309,11 +323,14 @@ def api_artwork_detail(request, artwork_id):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def api_artworks_list(request):
-    """API endpoint to get all artworks"""
+    """API endpoint to get artworks, one cursor page at a time"""
     try:
-        artworks = ProjectImage.objects.all()
-        serializer = ProjectImageSerializer(artworks, many=True, context={'request': request})
-        return Response(serializer.data)
+        return paginate(
+            KeysetPagination(), request, ProjectImage.objects.all(),
+            lambda page: ProjectImageSerializer(page, many=True, context={'request': request}).data,
+        )
+    except NotFound:
+        raise
     except Exception as e:
         logger.error(f"Error in api_artworks_list: {e}")
         return Response({'error': 'Failed to fetch artworks'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -352,70 +369,7 @@ def api_contact_form(request):
         return Response({'error': 'Failed to send message'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def api_user_login(request):
-    """API endpoint for user login"""
-    try:
-        username = request.data.get('username')
-        password = request.data.get('password')
-        
-        if not username or not password:
-            return Response({'error': 'Username and password are required'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        user = authenticate(username=username, password=password)
-        if user:
-            token, created = Token.objects.get_or_create(user=user)
-            user_serializer = UserSerializer(user)
-            return Response({
-                'token': token.key,
-                'user': user_serializer.data,
-                'message': 'Login successful'
-            })
-        else:
-            return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-    except Exception as e:
-        logger.error(f"Error in api_user_login: {e}")
-        return Response({'error': 'Login failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def api_user_signup(request):
-    """API endpoint for user signup"""
-    try:
-        serializer = UserRegistrationSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            token, created = Token.objects.get_or_create(user=user)
-            user_serializer = UserSerializer(user)
-            return Response({
-                'token': token.key,
-                'user': user_serializer.data,
-                'message': 'Account created successfully'
-            }, status=status.HTTP_201_CREATED)
-        else:
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    except Exception as e:
-        logger.error(f"Error in api_user_signup: {e}")
-        return Response({'error': 'Signup failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
-@api_view(['POST'])
-def api_user_logout(request):
-    """API endpoint for user logout"""
-    try:
-        if request.user.is_authenticated:
-            # Delete the user's token
-            Token.objects.filter(user=request.user).delete()
-            return Response({'message': 'Logged out successfully'})
-        else:
-            return Response({'error': 'User not authenticated'}, status=status.HTTP_401_UNAUTHORIZED)
-    except Exception as e:
-        logger.error(f"Error in api_user_logout: {e}")
-        return Response({'error': 'Logout failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
+@conditional_on_version(MERCHANDISE_KEY)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def api_merchandise_list(request):
@@ -0,0 +1,414 @@
+"""
+Tests for upload_portfolio_images.py, with in-memory stand-ins for the blob
+container (and, further down, the Cosmos DB container).
+
+Run from the repository root with the script's dependencies installed:
+    python -m unittest discover scripts/tests
+"""
+
+import contextlib
+import io
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import upload_portfolio_images as upload  # noqa: E402
+
+
+class NotFound(Exception):
+    status_code = 404
+
+
+class FakeContainerClient:
+    """Blob container client keeping blobs in a dict"""
+
+    account_name = "kihoko"
+
+    def __init__(self, fail=()):
+        self.blobs = {}  # name -> (data, metadata)
+        self.uploaded = []
+        self.deleted = []
+        self.fail = set(fail)
+
+    def upload_blob(self, name, data, overwrite=False, length=None, max_concurrency=1,
+                    metadata=None, content_settings=None):
+        if name in self.fail:
+            raise OSError(f"upload of {name} failed")
+        self.blobs[name] = (data.read(), dict(metadata or {}))
+        self.uploaded.append(name)
+
+    def list_blobs(self, name_starts_with="", include=None):
+        return [
+            SimpleNamespace(name=name, metadata=metadata)
+            for name, (_, metadata) in sorted(self.blobs.items()) if name.startswith(name_starts_with)
+        ]
+
+    def delete_blob(self, name):
+        if name not in self.blobs:
+            raise NotFound(name)
+        del self.blobs[name]
+        self.deleted.append(name)
+
+
+class InMemoryCosmosContainer:
+    """
+    Cosmos DB container client holding documents in a dict. ``throttle(n)``
+    makes the next n batches fail with HTTP 429.
+    """
+
+    class Throttled(Exception):
+        status_code = 429
+
+        def __init__(self, retry_after_ms=None):
+            super().__init__("Request rate is large")
+            self.headers = {"x-ms-retry-after-ms": str(retry_after_ms)} if retry_after_ms else {}
+
+    def __init__(self, partition_key_path="/categoryId"):
+        self.partition_key_path = partition_key_path
+        self.items = {}  # (partition key value, id) -> document
+        self.batches = []  # (partition key value, number of operations)
+        self._throttled = 0
+        self.retry_after_ms = 10
+
+    def read(self):
+        return {"partitionKey": {"paths": [self.partition_key_path]}}
+
+    def throttle(self, batches=1, retry_after_ms=10):
+        self._throttled += batches
+        self.retry_after_ms = retry_after_ms
+
+    def execute_item_batch(self, batch_operations, partition_key=None):
+        if self._throttled:
+            self._throttled -= 1
+            raise self.Throttled(retry_after_ms=self.retry_after_ms)
+        self.batches.append((partition_key, len(batch_operations)))
+        for operation, args in batch_operations:
+            if operation == "upsert":
+                document = args[0]
+                self.items[(partition_key, document["id"])] = document
+            elif operation == "delete":
+                self.items.pop((partition_key, args[0]), None)
+            else:
+                raise ValueError(f"Unsupported batch operation: {operation}")
+        return [{"statusCode": 200} for _ in batch_operations]
+
+
+class ScriptTestCase(unittest.TestCase):
+    """Points WATCH_DIR and the manifest at a temporary directory"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = pathlib.Path(tmp.name) / "portfolio"
+        self.root.mkdir()
+        for name, value in (("root", self.root), ("statef", pathlib.Path(tmp.name) / "manifest.json")):
+            patcher = mock.patch.object(upload, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.container = FakeContainerClient()
+        self.output = io.StringIO()
+
+    def write(self, relative, data):
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def run_script(self, *argv):
+        service = SimpleNamespace(get_container_client=lambda name: self.container)
+        environ = {"AZURE_CONN_STR": "UseDevelopmentStorage=true", "CONTAINER": "media"}
+        with mock.patch.dict(os.environ, environ), mock.patch.dict(os.environ, {"COSMOS_CONN_STR": ""}), \
+                mock.patch.object(upload.BlobServiceClient, "from_connection_string", return_value=service), \
+                contextlib.redirect_stdout(self.output):
+            return upload.main(list(argv))
+
+
+class BlobNamingTests(ScriptTestCase):
+    def test_files_with_the_same_name_in_different_folders_get_their_own_blobs(self):
+        self.write("a/x.jpg", b"first")
+        self.write("b/x.jpg", b"second")
+
+        self.assertEqual(self.run_script(), 0)
+
+        self.assertEqual(self.container.blobs["images/a/x.jpg"][0], b"first")
+        self.assertEqual(self.container.blobs["images/b/x.jpg"][0], b"second")
+        self.container.uploaded.clear()
+        self.assertEqual(self.run_script(), 0)
+        self.assertEqual(self.container.uploaded, [])
+
+    def test_blob_under_an_old_name_is_removed_once_the_file_is_uploaded_again(self):
+        self.write("a/x.jpg", b"first")
+        self.run_script()
+        # As recorded by the version that named blobs after the file name only
+        manifest = upload.load_manifest()
+        manifest["a/x.jpg"]["blob_name"] = "images/x.jpg"
+        upload.save_manifest(manifest)
+        self.container.blobs["images/x.jpg"] = self.container.blobs.pop("images/a/x.jpg")
+
+        self.assertEqual(self.run_script(), 0)
+
+        self.assertEqual(sorted(self.container.blobs), ["images/a/x.jpg"])
+        self.assertEqual(upload.load_manifest()["a/x.jpg"]["blob_name"], "images/a/x.jpg")
+
+
+class ManifestTests(ScriptTestCase):
+    def test_manifest_round_trips(self):
+        files = {"a/x.jpg": {"size": 5, "mtime_ns": 1, "sha256": "ab", "blob_name": "images/a/x.jpg"}}
+
+        upload.save_manifest(files)
+
+        self.assertEqual(upload.load_manifest(), files)
+        self.assertFalse(upload.statef.with_suffix(".json.tmp").exists())
+
+    def test_missing_or_corrupt_manifest_is_empty(self):
+        self.assertEqual(upload.load_manifest(), {})
+
+        upload.statef.write_text("{")
+
+        self.assertEqual(upload.load_manifest(), {})
+
+    def test_unchanged_files_are_not_hashed_again(self):
+        self.write("x.jpg", b"ink")
+        with contextlib.redirect_stdout(self.output):
+            manifest = upload.scan_local({})
+            with mock.patch.object(upload, "hash_file") as hash_file:
+                rescanned = upload.scan_local(manifest)
+
+        hash_file.assert_not_called()
+        self.assertEqual(rescanned, manifest)
+
+
+class PlanSyncTests(unittest.TestCase):
+    def record(self, relative, sha256):
+        return {"size": 3, "mtime_ns": 1, "sha256": sha256, "blob_name": upload.blob_name_for(relative)}
+
+    def test_new_changed_and_unchanged_files(self):
+        local = {
+            "new.jpg": self.record("new.jpg", "n"),
+            "changed.jpg": self.record("changed.jpg", "c2"),
+            "same.jpg": self.record("same.jpg", "s"),
+        }
+        remote = {"images/changed.jpg": "c1", "images/same.jpg": "s"}
+
+        uploads, deletes = upload.plan_sync(local, dict(local), remote)
+
+        self.assertEqual((uploads, deletes), (["changed.jpg", "new.jpg"], []))
+
+    def test_blob_without_a_recorded_hash_is_uploaded_again(self):
+        local = {"x.jpg": self.record("x.jpg", "s")}
+
+        uploads, _ = upload.plan_sync(local, {}, {"images/x.jpg": None})
+
+        self.assertEqual(uploads, ["x.jpg"])
+
+    def test_only_files_this_script_uploaded_are_deleted(self):
+        manifest = {"gone.jpg": self.record("gone.jpg", "g"), "kept.jpg": self.record("kept.jpg", "k")}
+        local = {"kept.jpg": manifest["kept.jpg"]}
+        remote = {"images/gone.jpg": "g", "images/kept.jpg": "k", "images/other.jpg": "o"}
+
+        self.assertEqual(upload.plan_sync(local, manifest, remote), ([], ["gone.jpg"]))
+
+
+class SyncTests(ScriptTestCase):
+    def test_changed_files_are_uploaded_and_deleted_files_removed(self):
+        self.write("keep.jpg", b"ink")
+        changed = self.write("series/changed.png", b"v1")
+        removed = self.write("removed.jpg", b"old")
+        self.assertEqual(self.run_script(), 0)
+        self.container.uploaded.clear()
+
+        changed.write_bytes(b"version 2")
+        removed.unlink()
+        self.assertEqual(self.run_script(), 0)
+
+        self.assertEqual(self.container.uploaded, ["images/series/changed.png"])
+        self.assertEqual(self.container.blobs["images/series/changed.png"][0], b"version 2")
+        self.assertEqual(self.container.deleted, ["images/removed.jpg"])
+        self.assertEqual(sorted(upload.load_manifest()), ["keep.jpg", "series/changed.png"])
+
+    def test_blobs_record_the_content_hash(self):
+        path = self.write("x.jpg", b"ink")
+
+        self.run_script()
+
+        self.assertEqual(self.container.blobs["images/x.jpg"][1], {"sha256": upload.hash_file(path)})
+
+    def test_blob_already_holding_the_content_is_not_uploaded_again(self):
+        self.write("x.jpg", b"ink")
+        self.run_script()
+        # A fresh machine: no manifest, but the container is already in sync
+        upload.statef.unlink()
+        self.container.uploaded.clear()
+
+        self.assertEqual(self.run_script(), 0)
+
+        self.assertEqual(self.container.uploaded, [])
+        self.assertIn("x.jpg", upload.load_manifest())
+
+    def test_dry_run_changes_nothing(self):
+        self.write("new.jpg", b"ink")
+
+        self.assertEqual(self.run_script("--dry-run"), 0)
+
+        self.assertEqual(self.container.blobs, {})
+        self.assertFalse(upload.statef.exists())
+        self.assertIn("1 upload(s)", self.output.getvalue())
+
+
+class WorkerPoolTests(ScriptTestCase):
+    def test_files_are_uploaded_concurrently_up_to_the_worker_limit(self):
+        for index in range(6):
+            self.write(f"{index}.jpg", bytes([index]))
+        active, peak = 0, 0
+        lock = threading.Lock()
+        original = self.container.upload_blob
+
+        def slow_upload(*args, **kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            original(*args, **kwargs)
+            with lock:
+                active -= 1
+
+        with mock.patch.object(upload, "workers", 3), \
+                mock.patch.object(self.container, "upload_blob", side_effect=slow_upload):
+            self.assertEqual(self.run_script(), 0)
+
+        self.assertEqual(len(self.container.blobs), 6)
+        self.assertGreater(peak, 1)
+        self.assertLessEqual(peak, 3)
+
+    def test_an_interrupted_run_resumes_with_the_files_that_failed(self):
+        for name in ("a.jpg", "b.jpg", "c.jpg"):
+            self.write(name, name.encode())
+        self.container.fail = {"images/b.jpg"}
+
+        self.assertEqual(self.run_script(), 1)
+        self.assertEqual(sorted(upload.load_manifest()), ["a.jpg", "c.jpg"])
+
+        self.container.fail = set()
+        self.container.uploaded.clear()
+        self.assertEqual(self.run_script(), 0)
+        self.assertEqual(self.container.uploaded, ["images/b.jpg"])
+
+    def test_file_edited_during_upload_is_left_for_the_next_run(self):
+        path = self.write("x.jpg", b"v1")
+        original = self.container.upload_blob
+
+        def edit_while_uploading(*args, **kwargs):
+            original(*args, **kwargs)
+            path.write_bytes(b"version 2")
+
+        with mock.patch.object(self.container, "upload_blob", side_effect=edit_while_uploading):
+            self.assertEqual(self.run_script(), 1)
+
+        self.assertNotIn("x.jpg", upload.load_manifest())
+        self.assertEqual(self.run_script(), 0)
+        self.assertEqual(self.container.blobs["images/x.jpg"][0], b"version 2")
+
+    def test_files_join_the_manifest_only_once_their_metadata_is_stored(self):
+        for name in ("a.jpg", "b.jpg"):
+            self.write(name, name.encode())
+        cosmos = InMemoryCosmosContainer()
+        # Both attempts of the first run's batch are throttled
+        cosmos.throttle(2)
+        writer = upload.CosmosBatchWriter(cosmos, "categoryId", max_retries=1, sleep=lambda seconds: None)
+        manifest = {}
+
+        with contextlib.redirect_stdout(self.output):
+            local = upload.scan_local({})
+            succeeded, _ = upload.upload_all(["a.jpg", "b.jpg"], local, manifest, self.container, writer)
+        self.assertEqual((succeeded, manifest), (0, {}))
+
+        with contextlib.redirect_stdout(self.output):
+            succeeded, total_bytes = upload.upload_all(["a.jpg", "b.jpg"], local, manifest, self.container, writer)
+        self.assertEqual((succeeded, total_bytes), (2, 10))
+        self.assertEqual(sorted(manifest), ["a.jpg", "b.jpg"])
+        self.assertEqual({document_id for _, document_id in cosmos.items},
+                         {record["cosmos_id"] for record in manifest.values()})
+
+
+class CosmosBatchWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.container = InMemoryCosmosContainer()
+        self.sleeps = []
+        self.writer = upload.CosmosBatchWriter(
+            self.container, upload.partition_key_path(self.container), batch_size=2, sleep=self.sleeps.append
+        )
+
+    def document(self, document_id, category="ink"):
+        return {"id": document_id, "categoryId": category}
+
+    def test_a_full_batch_is_written_as_soon_as_it_fills(self):
+        self.assertEqual(self.writer.upsert("a.jpg", self.document("1")), ([], []))
+        self.assertEqual(self.writer.upsert("b.jpg", self.document("2")), (["a.jpg", "b.jpg"], []))
+        self.writer.upsert("c.jpg", self.document("3"))
+
+        self.assertEqual(self.container.batches, [("ink", 2)])
+        self.assertEqual(self.writer.flush(), (["c.jpg"], []))
+        self.assertEqual(self.container.batches, [("ink", 2), ("ink", 1)])
+
+    def test_batch_size_is_capped_at_the_cosmos_limit(self):
+        writer = upload.CosmosBatchWriter(self.container, "categoryId", batch_size=500)
+
+        self.assertEqual(writer.batch_size, 100)
+
+    def test_operations_are_grouped_by_partition_key(self):
+        writer = upload.CosmosBatchWriter(self.container, "categoryId")
+        writer.upsert("a.jpg", self.document("1", "ink"))
+        writer.upsert("b.jpg", self.document("2", "koi"))
+        writer.delete("c.jpg", "3", "ink")
+
+        done, failed = writer.flush()
+
+        self.assertEqual((sorted(done), failed), (["a.jpg", "b.jpg", "c.jpg"], []))
+        self.assertEqual(sorted(self.container.batches), [("ink", 2), ("koi", 1)])
+        self.assertEqual(set(self.container.items), {("ink", "1"), ("koi", "2")})
+
+    def test_throttled_batch_is_retried_after_the_requested_delay(self):
+        self.container.throttle(2, retry_after_ms=250)
+        self.writer.upsert("a.jpg", self.document("1"))
+
+        self.assertEqual(self.writer.flush(), (["a.jpg"], []))
+        self.assertEqual(self.sleeps, [0.25, 0.25])
+        self.assertIn(("ink", "1"), self.container.items)
+
+    def test_throttling_without_a_delay_backs_off_exponentially(self):
+        self.container.throttle(3, retry_after_ms=None)
+        self.writer.upsert("a.jpg", self.document("1"))
+
+        self.writer.flush()
+
+        self.assertEqual(self.sleeps, [0.1, 0.2, 0.4])
+
+    def test_keys_are_reported_failed_once_retries_run_out(self):
+        writer = upload.CosmosBatchWriter(self.container, "categoryId", max_retries=1, sleep=self.sleeps.append)
+        self.container.throttle(5)
+        writer.upsert("a.jpg", self.document("1"))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(writer.flush(), ([], ["a.jpg"]))
+        self.assertEqual(self.container.items, {})
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_other_errors_are_not_retried(self):
+        self.writer.delete("a.jpg", "1", "ink")
+        with mock.patch.object(self.container, "execute_item_batch", side_effect=ValueError("bad request")), \
+                contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.writer.flush(), ([], ["a.jpg"]))
+        self.assertEqual(self.sleeps, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,166 +1,471 @@
 #!/usr/bin/env python3
 """
 Kihoko Portfolio - Automated Image Upload Script
-Monitors a local directory and uploads new/modified images to Azure Blob Storage
-and creates metadata records in Cosmos DB.
+Keeps Azure Blob Storage (and the Cosmos DB metadata records) in sync with a
+local directory of images.
+
+A local manifest remembers the size, mtime and SHA-256 of every file that has
+been uploaded. Each run diffs the directory against the manifest and the remote
+blob inventory, uploads only new or changed content, and removes blobs whose
+local file was deleted. Run with --dry-run to print the plan without changing
+anything.
 
 Based on Microsoft's official BlobServiceClient pattern.
 """
 
 import os
+import sys
 import json
 import pathlib
+import argparse
+import hashlib
+import threading
+import time
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from azure.storage.blob import BlobServiceClient, ContentSettings
 from azure.cosmos import CosmosClient
+try:
+    from azure.cosmos.partition_key import NullPartitionKeyValue
+except ImportError:  # older SDKs: documents without the key field are sent as None
+    NullPartitionKeyValue = None
 from dotenv import load_dotenv
 import uuid
+try:
+    from PIL import Image
+except ImportError:  # optional: without Pillow, dimensions are left unset
+    Image = None
 
 # Load environment variables
 load_dotenv()
 
 # Configuration
 root = pathlib.Path(os.getenv("WATCH_DIR", "~/Pictures/Portfolio")).expanduser()
-statef = pathlib.Path(__file__).with_suffix(".json")  # state.json in same dir as script
+statef = pathlib.Path(__file__).with_suffix(".json")  # manifest in same dir as script
+blob_prefix = "images/"
+workers = int(os.getenv("UPLOAD_WORKERS", "4"))  # files uploaded at once
+block_concurrency = int(os.getenv("UPLOAD_BLOCK_CONCURRENCY", "4"))  # parallel blocks per large file
+single_put_limit = 8 * 1024 * 1024  # larger files go up as parallel 4 MiB blocks
 mime = {
-    ".jpg": "image/jpeg", 
-    ".jpeg": "image/jpeg", 
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
     ".png": "image/png",
-    ".gif": "image/gif", 
+    ".gif": "image/gif",
     ".webp": "image/webp",
     ".heic": "image/heic"
 }
 
-def load_last_run():
-    """Load the timestamp of the last successful run"""
+def load_manifest():
+    """
+    Load the manifest of uploaded files:
+    {relative path: {size, mtime_ns, sha256, blob_name, cosmos_id, cosmos_pk}}
+    """
     if statef.exists():
         try:
-            data = json.loads(statef.read_text())
-            return dt.datetime.fromisoformat(data["last_run"])
-        except (json.JSONDecodeError, KeyError, ValueError):
+            return json.loads(statef.read_text()).get("files", {})
+        except json.JSONDecodeError:
             pass
-    return dt.datetime.min
+    return {}
 
-def save_last_run():
-    """Save the current timestamp as the last successful run"""
-    statef.write_text(json.dumps({
-        "last_run": dt.datetime.utcnow().isoformat(),
-        "script_version": "1.0"
+def save_manifest(files):
+    """Write the manifest atomically so an interrupted run never corrupts it"""
+    tmp = statef.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({
+        "files": files,
+        "saved_at": dt.datetime.now().isoformat(),
+        "script_version": "2.0"
     }))
+    tmp.replace(statef)
+
+def blob_name_for(relative_path):
+    """Blob for a file, mirroring its path under WATCH_DIR so subfolders cannot collide"""
+    return f"{blob_prefix}{pathlib.PurePosixPath(relative_path).as_posix()}"
+
+def hash_file(file_path):
+    """SHA-256 of a file, read in 1 MiB chunks"""
+    digest = hashlib.sha256()
+    with file_path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def find_new_images(since):
-    """Find all image files modified since the given timestamp"""
+def scan_local(manifest):
+    """
+    Stat every image under WATCH_DIR and return {relative path: record}.
+
+    Files whose size and mtime match the manifest keep their recorded hash;
+    only new or changed paths are read and hashed.
+    """
     if not root.exists():
         print(f"⚠️  Watch directory doesn't exist: {root}")
-        return []
-    
-    new_files = []
+        return None
+
+    local = {}
+    rehashed = 0
     for p in root.rglob("*"):
-        if (p.suffix.lower() in mime and 
-            p.is_file() and 
-            dt.datetime.fromtimestamp(p.stat().st_mtime) > since):
-            new_files.append(p)
-    
-    return sorted(new_files)
-
-def upload_to_blob(blob_client, file_path):
+        if p.suffix.lower() not in mime or not p.is_file():
+            continue
+        relative = p.relative_to(root).as_posix()
+        stats = p.stat()
+        known = manifest.get(relative)
+        if known and known["size"] == stats.st_size and known["mtime_ns"] == stats.st_mtime_ns:
+            sha256 = known["sha256"]
+        else:
+            sha256 = hash_file(p)
+            rehashed += 1
+        local[relative] = {
+            "size": stats.st_size,
+            "mtime_ns": stats.st_mtime_ns,
+            "sha256": sha256,
+            "blob_name": blob_name_for(relative),
+        }
+    print(f"🔍 {len(local)} local image(s), {rehashed} hashed this run")
+    return local
+
+def list_remote(container_client):
+    """Remote inventory under the upload prefix: {blob name: sha256 or None}"""
+    return {
+        blob.name: (blob.metadata or {}).get("sha256")
+        for blob in container_client.list_blobs(name_starts_with=blob_prefix, include=["metadata"])
+    }
+
+def plan_sync(local, manifest, remote):
+    """
+    Decide what to upload and what to delete.
+
+    Uploads: local files whose blob is missing or holds different content.
+    Deletes: blobs this script uploaded (they are in the manifest) whose local
+    file is gone, unless another local file still maps to the same blob.
+    """
+    uploads = sorted(
+        relative for relative, record in local.items()
+        if remote.get(record["blob_name"]) != record["sha256"]
+    )
+    in_use = {record["blob_name"] for record in local.values()}
+    deletes = sorted(
+        relative for relative, record in manifest.items()
+        if relative not in local and record["blob_name"] not in in_use
+    )
+    return uploads, deletes
+
+def moved_blobs(local, manifest):
+    """
+    Blobs recorded for files that still exist but now map to another blob name
+    (uploaded by an older version of this script), unless a local file uses them.
+    """
+    in_use = {record["blob_name"] for record in local.values()}
+    return sorted({
+        record["blob_name"] for relative, record in manifest.items()
+        if relative in local and record["blob_name"] != local[relative]["blob_name"]
+        and record["blob_name"] not in in_use
+    })
+
+def print_plan(uploads, deletes, local, manifest, remote, moved=()):
+    for relative in uploads:
+        reason = "changed" if local[relative]["blob_name"] in remote else "new"
+        print(f"  ⬆️  {relative} ({reason}, {local[relative]['size'] / 1e6:.1f} MB)")
+    for relative in deletes:
+        print(f"  🗑️  {relative} -> {manifest[relative]['blob_name']}")
+    for blob_name in moved:
+        print(f"  🗑️  {blob_name} (moved)")
+    unchanged = len(local) - len(uploads)
+    print(f"📋 Plan: {len(uploads)} upload(s), {len(deletes)} delete(s), {unchanged} unchanged")
+
+def image_size(file_path):
+    """
+    Display (width, height) from the image headers, without decoding pixels.
+    Returns (None, None) if Pillow is missing or cannot read the format.
+    """
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(file_path) as image:
+            width, height = image.size
+            # EXIF orientations 5-8 are rotated by 90 degrees
+            if image.getexif().get(0x0112) in (5, 6, 7, 8):
+                return height, width
+            return width, height
+    except Exception:
+        return None, None
+
+def upload_to_blob(blob_client, file_path, blob_name, sha256):
     """Upload a single file to Azure Blob Storage"""
-    blob_name = f"images/{file_path.name}"
-    
     with file_path.open("rb") as data:
         blob_client.upload_blob(
-            blob_name, 
-            data, 
+            blob_name,
+            data,
             overwrite=True,
+            length=file_path.stat().st_size,
+            max_concurrency=block_concurrency,
+            metadata={"sha256": sha256},
             content_settings=ContentSettings(
                 content_type=mime[file_path.suffix.lower()]
             )
         )
-    
+
     # Generate the public URL
     account_name = blob_client.account_name
     container_name = os.getenv("CONTAINER", "media")
     url = f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_name}"
-    
+
     return {
         "blob_name": blob_name,
         "url": url,
         "thumbnail_url": url  # Using same URL for now
     }
 
-def save_to_cosmos(cosmos_client, image_data):
-    """Save image metadata to Cosmos DB"""
-    try:
-        database = cosmos_client.get_database_client(os.getenv("COSMOS_DATABASE", "kihokodb"))
-        container = database.get_container_client("images")
-        
-        # Create the document
-        document = {
-            "id": str(uuid.uuid4()),
-            "title": image_data["title"],
-            "description": image_data["description"],
-            "categoryId": image_data.get("category_id"),  # Optional
-            "blobName": image_data["blob_name"],
-            "thumbnailBlobName": image_data["blob_name"],
-            "fileName": image_data["file_name"],
-            "contentType": image_data["content_type"],
-            "size": image_data["size"],
-            "width": 800,  # Default - could enhance with image analysis
-            "height": 600,
-            "tags": ["portfolio", "auto-upload"],
-            "isFeatured": image_data.get("is_featured", False),
-            "order": 0,
-            "createdAt": dt.datetime.utcnow().isoformat()
-        }
-        
-        container.create_item(document)
-        return document["id"]
-        
-    except Exception as e:
-        print(f"⚠️  Failed to save to Cosmos DB: {e}")
-        return None
+def build_document(image_data, document_id=None):
+    """Cosmos DB metadata document; reusing the id replaces the earlier record for the same file"""
+    return {
+        "id": document_id or str(uuid.uuid4()),
+        "title": image_data["title"],
+        "description": image_data["description"],
+        "categoryId": image_data.get("category_id"),  # Optional
+        "blobName": image_data["blob_name"],
+        "thumbnailBlobName": image_data["blob_name"],
+        "fileName": image_data["file_name"],
+        "contentType": image_data["content_type"],
+        "size": image_data["size"],
+        "width": image_data.get("width"),
+        "height": image_data.get("height"),
+        "tags": ["portfolio", "auto-upload"],
+        "isFeatured": image_data.get("is_featured", False),
+        "order": 0,
+        "createdAt": dt.datetime.utcnow().isoformat()
+    }
+
+class CosmosBatchWriter:
+    """
+    Buffers Cosmos DB upserts and deletes and writes them as transactional
+    batches, one per partition key value, of up to 100 operations.
+
+    Throttled batches (HTTP 429) are retried after the delay the service asks
+    for, or with exponential backoff. Each queued operation carries a caller
+    key (the file's relative path); add/delete/flush return the keys that were
+    written and the keys that failed, so the caller can record progress only
+    for metadata that actually landed.
+    """
+
+    max_batch_size = 100  # Cosmos DB transactional batch limit
+
+    def __init__(self, container, partition_key_path, batch_size=100, max_retries=5, sleep=time.sleep):
+        self.container = container
+        self.partition_key_path = partition_key_path
+        self.batch_size = min(batch_size, self.max_batch_size)
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.pending = {}  # partition key value -> [(key, operation)]
+
+    def partition_key(self, document):
+        return document.get(self.partition_key_path)
+
+    def _sdk_partition_key(self, value):
+        # A document whose key field is null lives in the null partition
+        if value is None and NullPartitionKeyValue is not None:
+            return NullPartitionKeyValue
+        return value
+
+    def _queue(self, key, partition_key, operation):
+        group = self.pending.setdefault(partition_key, [])
+        group.append((key, operation))
+        if len(group) >= self.batch_size:
+            return self._flush_group(partition_key)
+        return [], []
+
+    def upsert(self, key, document):
+        return self._queue(key, self.partition_key(document), ("upsert", (document,)))
 
-def process_image(file_path, blob_service, cosmos_client):
-    """Process a single image: upload to blob and save metadata"""
+    def delete(self, key, document_id, partition_key):
+        return self._queue(key, partition_key, ("delete", (document_id,)))
+
+    def flush(self):
+        done, failed = [], []
+        for partition_key in list(self.pending):
+            group_done, group_failed = self._flush_group(partition_key)
+            done += group_done
+            failed += group_failed
+        return done, failed
+
+    def _flush_group(self, partition_key):
+        group = self.pending.pop(partition_key, [])
+        keys = [key for key, _ in group]
+        operations = [operation for _, operation in group]
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.container.execute_item_batch(operations, partition_key=self._sdk_partition_key(partition_key))
+                return keys, []
+            except Exception as e:
+                if getattr(e, "status_code", None) != 429 or attempt == self.max_retries:
+                    print(f"⚠️  Failed to write {len(operations)} Cosmos DB record(s): {e}")
+                    return [], keys
+                self.sleep(self._retry_delay(e, attempt))
+        return [], keys
+
+    @staticmethod
+    def _retry_delay(error, attempt):
+        headers = getattr(error, "headers", None) or {}
+        retry_after_ms = headers.get("x-ms-retry-after-ms")
+        if retry_after_ms:
+            return float(retry_after_ms) / 1000
+        return min(0.1 * 2 ** attempt, 10)
+
+def partition_key_path(cosmos_container):
+    """Top-level document field the container is partitioned on"""
+    return cosmos_container.read()["partitionKey"]["paths"][0].lstrip("/")
+
+def process_image(relative, record, previous, container_client, report):
+    """
+    Process a single image: upload to blob and prepare its metadata document.
+
+    Returns (manifest record, Cosmos document), or None on failure.
+    """
+    file_path = root / relative
     try:
-        # Upload to blob storage
-        container_client = blob_service.get_container_client(os.getenv("CONTAINER", "media"))
-        blob_result = upload_to_blob(container_client, file_path)
-        
+        started = time.monotonic()
+        blob_result = upload_to_blob(container_client, file_path, record["blob_name"], record["sha256"])
+
         # Prepare metadata
-        stats = file_path.stat()
         title = file_path.stem.replace("_", " ").replace("-", " ").title()
-        
+
         image_data = {
             "title": title,
             "description": f"Professional artwork - {title}",
             "blob_name": blob_result["blob_name"],
             "file_name": file_path.name,
             "content_type": mime[file_path.suffix.lower()],
-            "size": stats.st_size,
+            "size": record["size"],
             "is_featured": False  # Could add logic to mark some as featured
         }
-        
-        # Save to Cosmos DB (if available)
-        cosmos_id = None
-        if cosmos_client:
-            cosmos_id = save_to_cosmos(cosmos_client, image_data)
-        
-        print(f"✅ {file_path.name}")
-        if cosmos_id:
-            print(f"   🆔 Database ID: {cosmos_id}")
-        print(f"   📍 URL: {blob_result['url']}")
-        
-        return True
-        
+        image_data["width"], image_data["height"] = image_size(file_path)
+
+        # Reuse the document of an earlier upload of the same file
+        document = build_document(image_data, (previous or {}).get("cosmos_id"))
+        result = {**record, "cosmos_id": document["id"]}
+
+        # A file edited while it was uploading is left out of the manifest,
+        # so the next run hashes and uploads it again
+        stats = file_path.stat()
+        if (stats.st_size, stats.st_mtime_ns) != (record["size"], record["mtime_ns"]):
+            report(f"⚠️  {relative} changed during upload; it will be synced on the next run")
+            return None
+
+        elapsed = time.monotonic() - started
+        lines = [f"✅ {relative} ({record['size'] / 1e6:.1f} MB in {elapsed:.1f}s, "
+                 f"{record['size'] / 1e6 / max(elapsed, 1e-6):.1f} MB/s)"]
+        lines.append(f"   📍 URL: {blob_result['url']}")
+        report("\n".join(lines))
+
+        return result, document
+
     except Exception as e:
-        print(f"❌ Failed to process {file_path.name}: {e}")
-        return False
+        report(f"❌ Failed to process {relative}: {e}")
+        return None
+
+def upload_all(uploads, local, manifest, container_client, cosmos_writer):
+    """
+    Upload files on a bounded worker pool. Metadata documents are handed to
+    the Cosmos batch writer, and a file is written to the manifest (so a
+    restarted run skips it) once its metadata has been stored too.
+
+    Returns (succeeded, total bytes uploaded).
+    """
+    lock = threading.Lock()
+    succeeded = 0
+    total_bytes = 0
+    waiting = {}  # relative path -> manifest record whose metadata is still buffered
+
+    def report(message):
+        with lock:
+            print(message, flush=True)
+
+    def settle(done, failed):
+        nonlocal succeeded, total_bytes
+        for relative in done:
+            result = waiting.pop(relative)
+            succeeded += 1
+            total_bytes += result["size"]
+            manifest[relative] = result
+        for relative in failed:
+            waiting.pop(relative)
+            report(f"❌ Metadata for {relative} was not saved; it will be retried on the next run")
+        if done:
+            save_manifest(manifest)
+            report(f"   📊 {succeeded}/{len(uploads)} done")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                process_image, relative, local[relative], manifest.get(relative),
+                container_client, report
+            ): relative
+            for relative in uploads
+        }
+        for future in as_completed(futures):
+            outcome = future.result()
+            if outcome is None:
+                continue
+            relative = futures[future]
+            result, document = outcome
+            waiting[relative] = result
+            if cosmos_writer:
+                result["cosmos_pk"] = cosmos_writer.partition_key(document)
+                settle(*cosmos_writer.upsert(relative, document))
+            else:
+                settle([relative], [])
+
+    if cosmos_writer:
+        settle(*cosmos_writer.flush())
+
+    return succeeded, total_bytes
+
+def delete_moved(moved, container_client):
+    """Remove blobs left under an old name once their file is uploaded under the new one"""
+    for blob_name in moved:
+        try:
+            container_client.delete_blob(blob_name)
+            print(f"🗑️  {blob_name} (moved)")
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404:
+                print(f"❌ Failed to delete {blob_name}: {e}")
+
+def delete_removed(deletes, manifest, container_client, cosmos_writer):
+    """Propagate local deletions; returns the number of files removed"""
+    removed = 0
+
+    def settle(done, failed):
+        nonlocal removed
+        for relative in done:
+            del manifest[relative]
+            removed += 1
+            print(f"🗑️  {relative}")
+        if done:
+            save_manifest(manifest)
+
+    for relative in deletes:
+        record = manifest[relative]
+        try:
+            container_client.delete_blob(record["blob_name"])
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404:
+                print(f"❌ Failed to delete {record['blob_name']}: {e}")
+                continue
+        if cosmos_writer and record.get("cosmos_id"):
+            settle(*cosmos_writer.delete(relative, record["cosmos_id"], record.get("cosmos_pk")))
+        else:
+            settle([relative], [])
+
+    if cosmos_writer:
+        settle(*cosmos_writer.flush())
+    return removed
 
-def main():
+def main(argv=None):
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Sync WATCH_DIR to Azure Blob Storage")
+    parser.add_argument("--dry-run", action="store_true", help="print the sync plan without changing anything")
+    args = parser.parse_args(argv)
+
     print(f"🎨 Kihoko Portfolio Upload - {dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
+
     # Validate environment
     required_vars = ["AZURE_CONN_STR", "CONTAINER"]
     missing = [var for var in required_vars if not os.getenv(var)]
@@ -168,47 +473,80 @@ def main():
         print(f"❌ Missing environment variables: {', '.join(missing)}")
         print("💡 Check your .env file")
         return 1
-    
-    # Load last run timestamp
-    last_run = load_last_run()
-    print(f"📅 Last run: {last_run.strftime('%Y-%m-%d %H:%M:%S') if last_run != dt.datetime.min else 'Never'}")
-    
-    # Find new images
-    new_images = find_new_images(last_run)
-    if not new_images:
-        print("📁 No new images found")
-        save_last_run()  # Update timestamp even if no files
-        return 0
-    
-    print(f"📸 Found {len(new_images)} new image(s)")
-    
-    # Initialize Azure clients
+
+    manifest = load_manifest()
+    local = scan_local(manifest)
+    if local is None:
+        return 1
+
+    # Initialize Azure clients once; they are shared by every worker
     try:
-        blob_service = BlobServiceClient.from_connection_string(os.getenv("AZURE_CONN_STR"))
-        
+        blob_service = BlobServiceClient.from_connection_string(
+            os.getenv("AZURE_CONN_STR"),
+            max_single_put_size=single_put_limit,
+            max_block_size=4 * 1024 * 1024
+        )
+        container_client = blob_service.get_container_client(os.getenv("CONTAINER", "media"))
+        remote = list_remote(container_client)
+
         # Cosmos DB is optional
-        cosmos_client = None
-        if os.getenv("COSMOS_CONN_STR"):
+        cosmos_writer = None
+        if os.getenv("COSMOS_CONN_STR") and not args.dry_run:
             cosmos_client = CosmosClient.from_connection_string(os.getenv("COSMOS_CONN_STR"))
-        else:
+            database = cosmos_client.get_database_client(os.getenv("COSMOS_DATABASE", "kihokodb"))
+            cosmos_container = database.get_container_client("images")
+            cosmos_writer = CosmosBatchWriter(
+                cosmos_container,
+                partition_key_path(cosmos_container),
+                batch_size=int(os.getenv("COSMOS_BATCH_SIZE", "100"))
+            )
+        elif not os.getenv("COSMOS_CONN_STR"):
             print("ℹ️  No Cosmos DB connection - uploading to blob storage only")
-            
+
     except Exception as e:
         print(f"❌ Failed to initialize Azure clients: {e}")
         return 1
-    
-    # Process each image
-    success_count = 0
-    for image_path in new_images:
-        if process_image(image_path, blob_service, cosmos_client):
-            success_count += 1
-    
-    # Update state
-    if success_count > 0:
-        save_last_run()
-        print(f"🎉 Successfully uploaded {success_count}/{len(new_images)} images")
-    
-    return 0 if success_count == len(new_images) else 1
+
+    uploads, deletes = plan_sync(local, manifest, remote)
+    moved = moved_blobs(local, manifest)
+    if args.dry_run or uploads or deletes or moved:
+        print_plan(uploads, deletes, local, manifest, remote, moved)
+    if args.dry_run:
+        return 0
+
+    # Files already in sync (e.g. uploaded by an interrupted run) join the
+    # manifest; removed files whose blob another file now uses just leave it
+    for relative, record in local.items():
+        if relative not in uploads:
+            manifest[relative] = {**manifest.get(relative, {}), **record}
+    for relative in [r for r in manifest if r not in local and r not in deletes]:
+        del manifest[relative]
+    save_manifest(manifest)
+
+    if not uploads and not deletes and not moved:
+        print("📁 Everything is in sync")
+        return 0
+
+    # Upload in parallel
+    run_started = time.monotonic()
+    success_count, total_bytes = upload_all(
+        uploads, local, manifest, container_client, cosmos_writer
+    )
+    elapsed = time.monotonic() - run_started
+    if uploads:
+        print(f"📈 {total_bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+              f"({total_bytes / 1e6 / max(elapsed, 1e-6):.1f} MB/s, {success_count / max(elapsed, 1e-6):.2f} files/s)")
+
+    removed = delete_removed(deletes, manifest, container_client, cosmos_writer)
+    if success_count == len(uploads):
+        delete_moved(moved, container_client)
+
+    if success_count == len(uploads) and removed == len(deletes):
+        print(f"🎉 Synced {success_count} upload(s) and {removed} deletion(s)")
+        return 0
+
+    print(f"⚠️  Uploaded {success_count}/{len(uploads)}, deleted {removed}/{len(deletes)}; rerun to retry the rest")
+    return 1
 
 if __name__ == "__main__":
-    exit(main()) 
\ No newline at end of file
+    sys.exit(main())